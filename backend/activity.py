@@ -0,0 +1,76 @@
+"""Журнал действий в проекте (лента активности).
+
+Маршруты изменения данных вызывают record_activity(): событие только
+добавляется в буфер сессии (session.info), без запроса к базе. Перед
+коммитом весь буфер записывается одним INSERT (executemany) на шард, в
+той же транзакции, что и само изменение: откат транзакции отменяет и
+события. Таблица только пополняется - строки не меняются и не удаляются,
+лента читается keyset-пагинацией по (project_id, id).
+"""
+from datetime import datetime
+
+from flask import has_request_context
+from flask_login import current_user
+from sqlalchemy import event, insert
+
+from models import db, Activity
+from sharding import shard_for_project, use_shard
+
+
+def _id(value):
+    """id объекта модели (после flush) или само значение"""
+    return getattr(value, 'id', value)
+
+
+def record_activity(project_id, type, entity=None, actor=None, **payload):
+    """Добавить событие в журнал проекта (запись - при коммите сессии).
+
+    entity и actor - id или объект модели: id берется после flush, поэтому
+    можно передать только что созданный объект. По умолчанию actor -
+    текущий пользователь запроса.
+    """
+    if actor is None and has_request_context() and current_user.is_authenticated:
+        actor = current_user.id
+    db.session.info.setdefault('activity', []).append(
+        (project_id, type, entity, actor, payload, datetime.utcnow())
+    )
+
+
+def init_activity(db):
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'before_commit')
+    def write_activity(session):
+        pending = session.info.pop('activity', None)
+        if not pending:
+            return
+        # id новых объектов (карточки, комментарии), на которые ссылаются события
+        session.flush()
+        by_shard = {}
+        for project_id, type, entity, actor, payload, created_at in pending:
+            project_id = _id(project_id)
+            by_shard.setdefault(shard_for_project(project_id), []).append({
+                'project_id': project_id,
+                'actor_id': _id(actor),
+                'type': type,
+                'entity_id': _id(entity),
+                'payload': payload,
+                'created_at': created_at,
+            })
+        for shard, rows in by_shard.items():
+            with use_shard(shard):
+                session.execute(insert(Activity.__table__), rows)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def discard_activity(session):
+        session.info.pop('activity', None)
+
+
+def project_activity(project_id, limit, before_id=None, types=None):
+    """События проекта от новых к старым (limit + 1 строк для page())"""
+    query = Activity.query.filter(Activity.project_id == project_id)
+    if before_id is not None:
+        query = query.filter(Activity.id < before_id)
+    if types:
+        query = query.filter(Activity.type.in_(types))
+    return query.order_by(Activity.id.desc()).limit(limit + 1).all()
@@ -4,12 +4,51 @@ from flask_cors import CORS
 from models import db, User, Project, ProjectMember, Invitation, Board, BoardList, Card, Label, CardLabel, CardAssignee, Checklist, ChecklistItem, Comment, UserRole, Notification
 from config import Config
 from models import Mention
+import hmac
 import uuid
 from datetime import datetime, timedelta
 import json
 import os
 from sqlalchemy import text 
 from flask_cors import CORS
+from models import ArchivedCard
+from archive import archive_cards, find_archived_card, restore_card, run_archive_job
+from jobs import register_job, start_jobs
+from notifications import mark_all_read, run_prune_job
+from schema import upgrade_schema
+from ratelimit import init_rate_limiting
+import metrics
+from encoding import init_compression, payload_response, compact_board, compact_project
+from database import init_database
+from routing import init_routing, read_only
+from replication import sync_replica
+from cache import init_cache, cached_payload, cache_generation, store_payload
+from identity import init_identity_cache
+from mention_index import init_mention_index
+from deadlines import init_deadline_scheduler
+from softdelete import (
+    init_soft_delete, soft_delete_list, soft_delete_card, undelete_list, undelete_card,
+    find_deleted, undo_deadline, run_purge_job, UndoExpired
+)
+from board_templates import UnknownTemplate, get_template, list_templates, apply_template
+from cloning import clone_board
+from dashboard import build_dashboard, resolve_sections
+from my_work import assigned_cards
+from activity import init_activity, record_activity, project_activity
+from reports import init_flow_reports, flow_report
+from concurrency import (
+    InvalidVersion, VersionConflict, check_version, with_etag, conflict_response, stale_write_response
+)
+from sqlalchemy.orm.exc import StaleDataError
+from writes import init_write_coordination, init_write_retries
+from pagination import InvalidCursor, decode_cursor, page, page_limit
+from hashing import HashingUnavailable
+from tokens import (
+    TokenError, issue_tokens, decode_token, redeem_refresh_token, run_token_prune_job,
+    identity_from_access_token, bearer_token
+)
+from batching import batch_load
+from sharding import init_sharding, init_shards, use_shard, for_each_shard, shard_for_project, select_project_shard, select_entity_shard
 
 from models import (
     db, User, Project, ProjectMember, Invitation, 
@@ -23,7 +62,8 @@ CORS(app,
      supports_credentials=True,
      origins=["http://localhost:3000", "http://127.0.0.1:3000", "http://172.17.64.1:3000"],
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization"]
+     allow_headers=["Content-Type", "Authorization", "If-Match"],
+     expose_headers=["ETag"]
 )
 
 # Инициализация базы данных
@@ -33,14 +73,33 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Пользователь запроса берется из кэша процесса, без запроса к базе
+load_identity = init_identity_cache(app, db, User)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return load_identity(int(user_id))
+
+# Аутентификация по заголовку Authorization: Bearer <access token>
+@login_manager.request_loader
+def load_user_from_token(request):
+    token = bearer_token(request)
+    if not token:
+        return None
+    try:
+        return identity_from_access_token(token)
+    except TokenError:
+        return None
 
 # Создаем таблицы при запуске
 with app.app_context():
     try:
+        init_database(app)
         db.create_all()
+        upgrade_schema()
+        init_shards(db)
+        if app.config['REPLICA_SYNC_ENABLED']:
+            sync_replica()
         print("✅ Database tables created successfully!")
         
         # Выводим список созданных таблиц
@@ -83,8 +142,33 @@ def handle_preflight():
     if request.method == "OPTIONS":
         response = jsonify({'status': 'preflight'})
         response.headers.add('Access-Control-Allow-Methods', 'GET, POST, PUT, DELETE, OPTIONS')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Authorization, If-Match')
         return response
+
+# Ограничение частоты запросов и сброс нагрузки
+init_rate_limiting(app)
+
+# Сжатие больших ответов (gzip/brotli)
+init_compression(app)
+
+# Чтение с реплики и "читай свои записи"
+init_routing(app)
+
+# Выбор шарда проекта по параметрам URL
+init_sharding(app)
+
+# Кэш сериализованных ответов с инвалидацией при коммите
+init_cache(app, db)
+init_soft_delete(db)
+
+# Журнал действий в проектах: события пишутся пачкой перед коммитом
+init_activity(db)
+
+# Очередь писателей процесса и учет ошибок блокировки SQLite
+init_write_coordination(app, db)
+
+# Отчеты о потоке задач с кэшем дневных сводок
+flow_cache = init_flow_reports(app)
     
 # API Routes
 
@@ -118,8 +202,17 @@ def register():
         
         print(f"✅ User {user.username} created successfully")
         login_user(user)
-        return jsonify(user.to_dict())
         
+        response = user.to_dict()
+        if data.get('issue_tokens'):
+            response['tokens'] = issue_tokens(user)
+            db.session.commit()
+        return jsonify(response)
+        
+    except HashingUnavailable as e:
+        print(f"⏳ {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, try again later'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"❌ Registration error: {str(e)}")
         db.session.rollback()
@@ -134,17 +227,85 @@ def login():
         user = User.query.filter_by(username=data['username']).first()
         
         if user and user.check_password(data['password']):
+            # Хеш со старыми параметрами прозрачно пересчитываем при входе
+            if user.password_needs_rehash():
+                user.rehash_password(data['password'])
+                db.session.commit()
+                print(f"🔑 Password hash upgraded for {user.username}")
+            
             login_user(user)
             print(f"✅ User {user.username} logged in successfully")
-            return jsonify(user.to_dict())
+            
+            response = user.to_dict()
+            if data.get('issue_tokens'):
+                response['tokens'] = issue_tokens(user)
+                db.session.commit()
+            return jsonify(response)
         
         print("❌ Invalid credentials")
         return jsonify({'error': 'Invalid credentials'}), 401
         
+    except HashingUnavailable as e:
+        print(f"⏳ {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, try again later'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"❌ Login error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+# Токены для API-клиентов (без cookie-сессии)
+@app.route('/api/token', methods=['POST'])
+def create_token():
+    try:
+        data = request.get_json()
+        
+        user = User.query.filter_by(username=data['username']).first()
+        if not user or not user.check_password(data['password']):
+            return jsonify({'error': 'Invalid credentials'}), 401
+        
+        tokens = issue_tokens(user)
+        db.session.commit()
+        return jsonify(tokens)
+        
+    except HashingUnavailable as e:
+        print(f"⏳ {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, try again later'}), 503, {'Retry-After': '1'}
+    except Exception as e:
+        print(f"❌ Token error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/token/refresh', methods=['POST'])
+def refresh_token():
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            claims = decode_token(data.get('refresh_token', ''), 'refresh')
+        except TokenError as e:
+            return jsonify({'error': str(e)}), 401
+        
+        # При обновлении проверяем, что пользователь все еще существует
+        user = User.query.get(claims['sub'])
+        if not user:
+            return jsonify({'error': 'User not found'}), 401
+        
+        # Обмененный токен больше не действует (ротация)
+        try:
+            redeem_refresh_token(user, claims)
+        except TokenError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 401
+        
+        tokens = issue_tokens(user)
+        db.session.commit()
+        return jsonify(tokens)
+        
+    except Exception as e:
+        print(f"❌ Token refresh error: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/logout', methods=['POST'])
 @login_required
 def logout():
@@ -177,11 +338,15 @@ def health_check():
 # Projects endpoints
 @app.route('/api/projects', methods=['GET'])
 @login_required
+@read_only
 def get_projects():
     try:
         # Получаем проекты, где пользователь является участником
         memberships = ProjectMember.query.filter_by(user_id=current_user.id).all()
-        projects = [membership.project.to_dict() for membership in memberships]
+        projects = []
+        for membership in memberships:
+            with use_shard(shard_for_project(membership.project_id)):
+                projects.append(membership.project.to_dict())
         
         return jsonify(projects)
     except Exception as e:
@@ -195,6 +360,11 @@ def create_project():
         data = request.get_json()
         print(f"📝 Creating project: {data['name']}")
         
+        try:
+            template = get_template(data.get('template'))
+        except UnknownTemplate as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Создаем проект
         project = Project(
             name=data['name'],
@@ -206,6 +376,7 @@ def create_project():
         db.session.flush()  # Получаем ID проекта до коммита
         
         print(f"📊 Project created with ID: {project.id}")
+        select_project_shard(project.id)
         
         # ИСПРАВЛЕНО: используем project_id вместо project
         board = Board(
@@ -219,16 +390,9 @@ def create_project():
         
         print(f"📋 Board created with ID: {board.id}")
         
-        # Создаем стандартные списки для доски
-        default_lists = ['To Do', 'In Progress', 'Done']
-        for i, list_name in enumerate(default_lists):
-            board_list = BoardList(
-                name=list_name,
-                position=i,
-                board_id=board.id  # Явно устанавливаем board_id
-            )
-            db.session.add(board_list)
-            print(f"✅ Created list: {list_name} for board {board.id}")
+        # Списки (и метки) из шаблона доски - одним INSERT на таблицу
+        apply_template(board.id, project.id, template)
+        print(f"✅ Created lists {template['lists']} for board {board.id}")
         
         # Добавляем создателя как администратора проекта
         membership = ProjectMember(
@@ -237,6 +401,7 @@ def create_project():
             role=UserRole.ADMIN
         )
         db.session.add(membership)
+        record_activity(project.id, 'project.created', project, name=project.name)
         
         db.session.commit()
         
@@ -250,6 +415,60 @@ def create_project():
         db.session.rollback()
         return jsonify({'error': 'Failed to create project', 'details': str(e)}), 500
 
+@app.route('/api/board-templates')
+@login_required
+def get_board_templates():
+    return jsonify(list_templates())
+
+@app.route('/api/projects/<int:project_id>/clone', methods=['POST'])
+@login_required
+def clone_project(project_id):
+    """Новый проект с копией доски: списки, метки, карточки и чеклисты"""
+    try:
+        if not has_project_access(project_id, UserRole.MEMBER):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        source = Project.query.get_or_404(project_id)
+        data = request.get_json(silent=True) or {}
+        
+        project = Project(
+            name=data.get('name') or f"{source.name} (copy)",
+            description=data.get('description', source.description),
+            creator_id=current_user.id
+        )
+        db.session.add(project)
+        db.session.flush()
+        
+        db.session.add(ProjectMember(
+            project_id=project.id,
+            user_id=current_user.id,
+            role=UserRole.ADMIN
+        ))
+        
+        with use_shard(shard_for_project(project_id)):
+            source_board = Board.query.filter_by(project_id=project_id).first()
+        
+        select_project_shard(project.id)
+        board = Board(
+            name=source_board.name if source_board else f"{project.name} Board",
+            description=source_board.description if source_board else project.description,
+            project_id=project.id
+        )
+        db.session.add(board)
+        db.session.flush()
+        
+        copied = clone_board(source_board, project.id, board.id, current_user.id) if source_board else {}
+        record_activity(project.id, 'project.cloned', project, name=project.name, source_project_id=project_id)
+        db.session.commit()
+        
+        print(f"✅ Project {source.name} cloned as {project.name}: {copied}")
+        return jsonify(dict(project.to_dict(), copied=copied))
+        
+    except Exception as e:
+        print(f"❌ Error cloning project: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to clone project'}), 500
+
 # Invitations endpoints
 @app.route('/api/invitations', methods=['GET'])
 @login_required
@@ -259,6 +478,8 @@ def get_invitations():
             invited_user_id=current_user.id,
             status='pending'
         ).all()
+        for relationship in (Invitation.project, Invitation.invited_user, Invitation.invited_by):
+            batch_load(invitations, relationship)
         
         return jsonify([invitation.to_dict() for invitation in invitations])
     except Exception as e:
@@ -275,6 +496,11 @@ def create_board(project_id):
         
         data = request.get_json()
         
+        try:
+            template = get_template(data.get('template'))
+        except UnknownTemplate as e:
+            return jsonify({'error': str(e)}), 400
+        
         board = Board(
             name=data['name'],
             description=data.get('description', ''),
@@ -282,16 +508,11 @@ def create_board(project_id):
         )
         
         db.session.add(board)
+        db.session.flush()
         
-        # Создаем стандартные списки
-        default_lists = ['To Do', 'In Progress', 'Done']
-        for i, list_name in enumerate(default_lists):
-            board_list = BoardList(
-                name=list_name,
-                position=i,
-                board=board
-            )
-            db.session.add(board_list)
+        # Создаем списки из шаблона
+        apply_template(board.id, project_id, template)
+        record_activity(project_id, 'board.created', board, name=board.name)
         
         db.session.commit()
         
@@ -310,8 +531,16 @@ def get_project(project_id):
         if not has_project_access(project_id):
             return jsonify({'error': 'Access denied'}), 403
         
+        cached = cached_payload(f'project:{project_id}')
+        if cached:
+            return payload_response(cached[1], compact_project)
+        
+        # Поколение кэша - до загрузки данных (см. cache_generation)
+        generation = cache_generation(project_id)
         project = Project.query.get_or_404(project_id)
-        return jsonify(project.to_dict())
+        payload = project.to_dict()
+        store_payload(f'project:{project_id}', project_id, generation, payload)
+        return payload_response(payload, compact_project)
     except Exception as e:
         print(f"❌ Error getting project: {str(e)}")
         return jsonify({'error': 'Failed to get project'}), 500
@@ -329,6 +558,7 @@ def get_project_members(project_id):
         ).filter(
             ProjectMember.role != UserRole.VIEWER
         ).all()
+        batch_load(members, ProjectMember.user)
         
         return jsonify([member.to_dict() for member in members])
     except Exception as e:
@@ -338,15 +568,28 @@ def get_project_members(project_id):
 # Boards endpoints
 @app.route('/api/boards/<int:board_id>')
 @login_required
+@read_only
 def get_board(board_id):
     try:
+        # Из кэша: доступ проверяем по сохраненному project_id, не загружая доску
+        cached = cached_payload(f'board:{board_id}')
+        if cached:
+            if not has_project_access(cached[0]):
+                return jsonify({'error': 'Access denied'}), 403
+            return payload_response(cached[1], compact_board)
+        
+        # Поколение кэша - до загрузки данных (см. cache_generation); проект доски не меняется
+        project_id = db.session.query(Board.project_id).filter(Board.id == board_id).scalar()
+        generation = cache_generation(project_id)
         board = Board.query.get_or_404(board_id)
         
         # Проверяем доступ к проекту доски
         if not has_project_access(board.project_id):
             return jsonify({'error': 'Access denied'}), 403
         
-        return jsonify(board.to_dict())
+        payload = board.to_dict()
+        store_payload(f'board:{board_id}', board.project_id, generation, payload)
+        return payload_response(payload, compact_board)
     except Exception as e:
         print(f"❌ Error getting board: {str(e)}")
         return jsonify({'error': 'Failed to get board'}), 500
@@ -368,10 +611,54 @@ def get_project_boards(project_id):
 
 @app.route('/api/users')
 @login_required
+@read_only
 def get_users():
+    """Справочник пользователей постранично.
+    
+    Параметры: q - префикс username или email (без учета регистра),
+    project_id - только участники проекта, limit, cursor - курсор
+    следующей страницы, fields=compact - только id, username и аватар.
+    """
     try:
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users])
+        limit = page_limit(default=20, maximum=100)
+        prefix = request.args.get('q', '').strip().lower()
+        project_id = request.args.get('project_id', type=int)
+        compact = request.args.get('fields') == 'compact'
+        
+        username_key = db.func.lower(User.username)
+        query = User.query
+        
+        if project_id is not None:
+            if not has_project_access(project_id):
+                return jsonify({'error': 'Access denied'}), 403
+            query = query.join(ProjectMember, ProjectMember.user_id == User.id).filter(
+                ProjectMember.project_id == project_id
+            )
+        
+        if prefix:
+            # Диапазон по индексам lower(username) / lower(email) вместо LIKE '%...%'
+            upper_bound = prefix + '\uffff'
+            email_key = db.func.lower(User.email)
+            query = query.filter(db.or_(
+                db.and_(username_key >= prefix, username_key < upper_bound),
+                db.and_(email_key >= prefix, email_key < upper_bound)
+            ))
+        
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after_username, after_id = decode_cursor(cursor, 2)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            query = query.filter(db.tuple_(username_key, User.id) > db.tuple_(after_username, after_id))
+        
+        users = query.order_by(username_key, User.id).limit(limit + 1).all()
+        users, next_cursor = page(users, limit, key=lambda user: (user.username.lower(), user.id))
+        
+        return jsonify({
+            'users': [user.to_compact_dict() if compact else user.to_dict() for user in users],
+            'next_cursor': next_cursor
+        })
     except Exception as e:
         print(f"❌ Error getting users: {str(e)}")
         return jsonify({'error': 'Failed to get users'}), 500
@@ -403,6 +690,7 @@ def create_card(list_id):
             card.due_date = datetime.fromisoformat(data['due_date'])
         
         db.session.add(card)
+        record_activity(board_list.board.project_id, 'card.created', card, title=card.title, list_id=list_id)
         db.session.commit()
         
         return jsonify(card.to_dict())
@@ -424,6 +712,11 @@ def update_card(card_id):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
+        try:
+            check_version(card, data)
+        except VersionConflict as e:
+            return conflict_response(e.entity, e.status)
+        from_list_id = card.list_id
         
         # Обновляем поля карточки
         if 'title' in data:
@@ -437,11 +730,24 @@ def update_card(card_id):
         if 'position' in data:
             card.position = data['position']
         
+        project_id = card.list.board.project_id
+        if card.list_id != from_list_id:
+            record_activity(project_id, 'card.moved', card, from_list_id=from_list_id,
+                            to_list_id=card.list_id, position=card.position)
+        else:
+            changed = [field for field in ('title', 'description', 'due_date', 'position') if field in data]
+            if changed:
+                record_activity(project_id, 'card.updated', card, fields=changed)
+        
         card.updated_at = datetime.utcnow()
         db.session.commit()
         
-        return jsonify(card.to_dict())
+        return with_etag(jsonify(card.to_dict()), card)
         
+    except InvalidVersion as e:
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        return stale_write_response(Card, card_id)
     except Exception as e:
         print(f"❌ Error updating card: {str(e)}")
         db.session.rollback()
@@ -449,15 +755,31 @@ def update_card(card_id):
     
 @app.route('/api/cards/<int:card_id>')
 @login_required
+@read_only
 def get_card(card_id):
     try:
+        cached = cached_payload(f'card:{card_id}')
+        if cached:
+            if not has_project_access(cached[0]):
+                return jsonify({'error': 'Access denied'}), 403
+            response = jsonify(cached[1])
+            response.headers['ETag'] = f'"{cached[1]["version"]}"'
+            return response
+        
+        # Поколение кэша - до загрузки данных (см. cache_generation); проект карточки не меняется
+        generation = cache_generation(db.session.query(Board.project_id).join(
+            BoardList, BoardList.board_id == Board.id
+        ).join(Card, Card.list_id == BoardList.id).filter(Card.id == card_id).scalar())
         card = Card.query.get_or_404(card_id)
         
         # Проверяем доступ к проекту карточки
-        if not has_project_access(card.list.board.project_id):
+        project_id = card.list.board.project_id
+        if not has_project_access(project_id):
             return jsonify({'error': 'Access denied'}), 403
         
-        return jsonify(card.to_dict())
+        payload = card.to_dict()
+        store_payload(f'card:{card_id}', project_id, generation, payload)
+        return with_etag(jsonify(payload), card)
     except Exception as e:
         print(f"❌ Error getting card: {str(e)}")
         return jsonify({'error': 'Failed to get card'}), 500
@@ -547,6 +869,8 @@ def add_comment(card_id):
             else:
                 print(f"🔴 User {username} not found")
         
+        record_activity(card.list.board.project_id, 'comment.added', comment, card_id=card.id,
+                        mentioned_user_ids=[user.id for user in mentioned_users])
         db.session.commit()
         print(f"✅ Comment added successfully with {len(mentioned_users)} mentions")
         
@@ -593,6 +917,7 @@ def create_label(project_id):
         )
         
         db.session.add(label)
+        record_activity(project_id, 'label.created', label, name=label.name, color=label.color)
         db.session.commit()
         
         return jsonify(label.to_dict())
@@ -606,16 +931,49 @@ def create_label(project_id):
 @login_required
 def get_assigned_cards_count():
     try:
-        # Находим все карточки, где пользователь назначен
-        assigned_cards_count = CardAssignee.query.filter_by(
-            user_id=current_user.id
-        ).count()
+        # Находим все карточки, где пользователь назначен (во всех шардах)
+        assigned_cards_count = 0
+        for _ in for_each_shard():
+            assigned_cards_count += CardAssignee.query.join(
+                Card, Card.id == CardAssignee.card_id
+            ).filter(CardAssignee.user_id == current_user.id, Card.deleted_at.is_(None)).count()
         
         return jsonify({'count': assigned_cards_count})
     except Exception as e:
         print(f"❌ Error getting assigned cards count: {str(e)}")
         return jsonify({'error': 'Failed to get assigned cards count'}), 500
     
+@app.route('/api/user/cards')
+@login_required
+@read_only
+def get_my_cards():
+    """Карточки, назначенные текущему пользователю, по всем его проектам.
+    
+    Фильтры: overdue=1, due_within=<дней>, project_id, list_id;
+    пагинация: limit, cursor.
+    """
+    try:
+        filters = {
+            'overdue': request.args.get('overdue') in ('1', 'true'),
+            'due_within': request.args.get('due_within', type=int),
+            'project_id': request.args.get('project_id', type=int),
+            'list_id': request.args.get('list_id', type=int)
+        }
+        if filters['project_id'] is not None and not has_project_access(filters['project_id']):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        try:
+            cards, next_cursor = assigned_cards(
+                current_user.id, filters, page_limit(default=50, maximum=200), request.args.get('cursor')
+            )
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({'cards': cards, 'next_cursor': next_cursor})
+    except Exception as e:
+        print(f"❌ Error getting assigned cards: {str(e)}")
+        return jsonify({'error': 'Failed to get assigned cards'}), 500
+    
 @app.route('/api/cards/<int:card_id>/labels', methods=['POST'])
 @login_required
 def add_label_to_card(card_id):
@@ -639,6 +997,7 @@ def add_label_to_card(card_id):
         
         card_label = CardLabel(card_id=card_id, label_id=label.id)
         db.session.add(card_label)
+        record_activity(label.project_id, 'card.label_added', card, label_id=label.id)
         db.session.commit()
         
         return jsonify({'message': 'Label added successfully'})
@@ -660,6 +1019,7 @@ def remove_label_from_card(card_id, label_id):
         card_label = CardLabel.query.filter_by(card_id=card_id, label_id=label_id).first_or_404()
         
         db.session.delete(card_label)
+        record_activity(card.list.board.project_id, 'card.label_removed', card, label_id=label_id)
         db.session.commit()
         
         return jsonify({'message': 'Label removed successfully'})
@@ -691,6 +1051,7 @@ def create_checklist(card_id):
         )
         
         db.session.add(checklist)
+        record_activity(card.list.board.project_id, 'checklist.created', checklist, card_id=card_id, title=checklist.title)
         db.session.commit()
         
         return jsonify(checklist.to_dict())
@@ -710,14 +1071,24 @@ def update_checklist(checklist_id):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
         data = request.get_json()
+        try:
+            check_version(checklist, data)
+        except VersionConflict as e:
+            return conflict_response(e.entity, e.status)
         
         if 'title' in data:
             checklist.title = data['title']
+            record_activity(checklist.card.list.board.project_id, 'checklist.updated', checklist,
+                            card_id=checklist.card_id, title=checklist.title)
         
         db.session.commit()
         
-        return jsonify(checklist.to_dict())
+        return with_etag(jsonify(checklist.to_dict()), checklist)
         
+    except InvalidVersion as e:
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        return stale_write_response(Checklist, checklist_id)
     except Exception as e:
         print(f"❌ Error updating checklist: {str(e)}")
         db.session.rollback()
@@ -732,11 +1103,22 @@ def delete_checklist(checklist_id):
         if not has_project_access(checklist.card.list.board.project_id, UserRole.MEMBER):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
+        try:
+            check_version(checklist)
+        except VersionConflict as e:
+            return conflict_response(e.entity, e.status)
+        
+        record_activity(checklist.card.list.board.project_id, 'checklist.deleted', checklist.id,
+                        card_id=checklist.card_id, title=checklist.title)
         db.session.delete(checklist)
         db.session.commit()
         
         return jsonify({'message': 'Checklist deleted successfully'})
         
+    except InvalidVersion as e:
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        return stale_write_response(Checklist, checklist_id)
     except Exception as e:
         print(f"❌ Error deleting checklist: {str(e)}")
         db.session.rollback()
@@ -763,6 +1145,8 @@ def create_checklist_item(checklist_id):
         )
         
         db.session.add(checklist_item)
+        record_activity(checklist.card.list.board.project_id, 'checklist_item.created', checklist_item,
+                        card_id=checklist.card_id, checklist_id=checklist_id)
         db.session.commit()
         
         return jsonify(checklist_item.to_dict())
@@ -788,6 +1172,11 @@ def update_checklist_item(item_id):
         if 'completed' in data:
             checklist_item.completed = data['completed']
         
+        changed = [field for field in ('text', 'completed') if field in data]
+        if changed:
+            record_activity(checklist_item.checklist.card.list.board.project_id, 'checklist_item.updated',
+                            checklist_item, card_id=checklist_item.checklist.card_id,
+                            fields=changed, completed=checklist_item.completed)
         db.session.commit()
         
         return jsonify(checklist_item.to_dict())
@@ -806,6 +1195,8 @@ def delete_checklist_item(item_id):
         if not has_project_access(checklist_item.checklist.card.list.board.project_id, UserRole.MEMBER):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
+        record_activity(checklist_item.checklist.card.list.board.project_id, 'checklist_item.deleted',
+                        checklist_item.id, card_id=checklist_item.checklist.card_id)
         db.session.delete(checklist_item)
         db.session.commit()
         
@@ -839,6 +1230,7 @@ def create_list(board_id):
         )
         
         db.session.add(board_list)
+        record_activity(board.project_id, 'list.created', board_list, name=board_list.name)
         db.session.commit()
         
         return jsonify(board_list.to_dict())
@@ -858,16 +1250,119 @@ def delete_list(list_id):
         if not has_project_access(board_list.board.project_id, UserRole.MEMBER):
             return jsonify({'error': 'Insufficient permissions'}), 403
         
-        # Удаляем список (каскадное удаление карточек должно быть настроено в моделях)
-        db.session.delete(board_list)
+        try:
+            check_version(board_list)
+        except VersionConflict as e:
+            return conflict_response(e.entity, e.status)
+        
+        # Мягкое удаление: список и карточки скрываются сразу, строки удалит фоновая очистка
+        cards_count = Card.query.filter_by(list_id=board_list.id).count()
+        deleted_at = soft_delete_list(board_list)
+        record_activity(board_list.board.project_id, 'list.deleted', board_list, name=board_list.name, count=cards_count)
         db.session.commit()
         
-        return jsonify({'message': 'List deleted successfully'})
+        return jsonify({
+            'message': 'List deleted successfully',
+            'undo_until': undo_deadline(deleted_at).isoformat()
+        })
         
+    except InvalidVersion as e:
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        return stale_write_response(BoardList, list_id)
     except Exception as e:
         print(f"❌ Error deleting list: {str(e)}")
         db.session.rollback()
         return jsonify({'error': 'Failed to delete list'}), 500
+
+@app.route('/api/lists/<int:list_id>/restore', methods=['POST'])
+@login_required
+def restore_list(list_id):
+    """Отменить удаление списка (в течение окна отмены)"""
+    try:
+        board_list = find_deleted(BoardList, list_id)
+        if not board_list:
+            return jsonify({'error': 'Deleted list not found'}), 404
+        
+        if not has_project_access(board_list.board.project_id, UserRole.MEMBER):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            undelete_list(board_list)
+        except UndoExpired as e:
+            return jsonify({'error': str(e)}), 410
+        cards_count = Card.query.filter_by(list_id=board_list.id).count()
+        record_activity(board_list.board.project_id, 'list.restored', board_list, name=board_list.name, count=cards_count)
+        db.session.commit()
+        
+        return jsonify(board_list.to_dict())
+        
+    except Exception as e:
+        print(f"❌ Error restoring list: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to restore list'}), 500
+
+@app.route('/api/cards/<int:card_id>', methods=['DELETE'])
+@login_required
+def delete_card(card_id):
+    try:
+        card = Card.query.get_or_404(card_id)
+        
+        if not has_project_access(card.list.board.project_id, UserRole.MEMBER):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            check_version(card)
+        except VersionConflict as e:
+            return conflict_response(e.entity, e.status)
+        
+        deleted_at = soft_delete_card(card)
+        record_activity(card.list.board.project_id, 'card.deleted', card, title=card.title, list_id=card.list_id)
+        db.session.commit()
+        
+        return jsonify({
+            'message': 'Card deleted successfully',
+            'undo_until': undo_deadline(deleted_at).isoformat()
+        })
+        
+    except InvalidVersion as e:
+        return jsonify({'error': str(e)}), 400
+    except StaleDataError:
+        return stale_write_response(Card, card_id)
+    except Exception as e:
+        print(f"❌ Error deleting card: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to delete card'}), 500
+
+@app.route('/api/cards/<int:card_id>/restore', methods=['POST'])
+@login_required
+def restore_deleted_card(card_id):
+    """Отменить удаление карточки (в течение окна отмены)"""
+    try:
+        card = find_deleted(Card, card_id)
+        if not card:
+            return jsonify({'error': 'Deleted card not found'}), 404
+        
+        board_list = BoardList.query.get(card.list_id)
+        if not board_list:
+            return jsonify({'error': 'List of the card is deleted'}), 409
+        
+        if not has_project_access(board_list.board.project_id, UserRole.MEMBER):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            undelete_card(card)
+        except UndoExpired as e:
+            return jsonify({'error': str(e)}), 410
+        record_activity(board_list.board.project_id, 'card.restored', card, title=card.title, list_id=card.list_id)
+        db.session.commit()
+        
+        return jsonify(card.to_dict())
+        
+    except Exception as e:
+        print(f"❌ Error restoring card: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to restore card'}), 500
     
 # Assignees removal endpoint
 @app.route('/api/cards/<int:card_id>/assignees/<int:user_id>', methods=['DELETE'])
@@ -882,6 +1377,7 @@ def remove_assignee(card_id, user_id):
         assignee = CardAssignee.query.filter_by(card_id=card_id, user_id=user_id).first_or_404()
         
         db.session.delete(assignee)
+        record_activity(card.list.board.project_id, 'card.unassigned', card, user_id=user_id)
         db.session.commit()
         
         return jsonify({'message': 'Assignee removed successfully'})
@@ -915,6 +1411,7 @@ def assign_user_to_card(card_id):
         
         assignee = CardAssignee(card_id=card_id, user_id=user.id)
         db.session.add(assignee)
+        record_activity(card.list.board.project_id, 'card.assigned', card, user_id=user.id)
         db.session.commit()
         
         return jsonify({'message': 'User assigned successfully'})
@@ -937,6 +1434,16 @@ def debug_routes():
             })
     return jsonify(sorted(routes, key=lambda x: x['path']))
 
+# Счетчики процесса (rate limiting и т.п.): для вошедших пользователей
+# или сборщика метрик с токеном METRICS_TOKEN в заголовке X-Metrics-Token
+@app.route('/api/metrics')
+def get_metrics():
+    token = app.config['METRICS_TOKEN']
+    provided = request.headers.get('X-Metrics-Token', '')
+    if not current_user.is_authenticated and not (token and hmac.compare_digest(provided.encode(), token.encode())):
+        return jsonify({'error': 'Authentication required'}), 401
+    return jsonify(metrics.snapshot())
+
 # Invitations endpoints - создание приглашения
 @app.route('/api/projects/<int:project_id>/invitations', methods=['POST'])
 @login_required
@@ -963,6 +1470,7 @@ def create_invitation(project_id):
         )
         
         db.session.add(invitation)
+        record_activity(project_id, 'invitation.created', invitation, role=invitation.role.value)
         db.session.commit()
         
         # Формируем ссылку для приглашения
@@ -1042,6 +1550,8 @@ def accept_invitation(token):
         invitation.invited_user_id = current_user.id
         
         db.session.add(membership)
+        record_activity(invitation.project_id, 'member.joined', current_user.id,
+                        role=invitation.role.value, invitation_id=invitation.id)
         db.session.commit()
         
         print(f"✅ User {current_user.username} accepted invitation to project {invitation.project_id}")
@@ -1075,6 +1585,7 @@ def view_project_by_token(token):
         
         # Получаем проект
         project = Project.query.get_or_404(invitation.project_id)
+        select_project_shard(project.id)
         
         # Получаем доску проекта
         board = Board.query.filter_by(project_id=project.id).first()
@@ -1140,6 +1651,8 @@ def register_and_accept_invitation(token):
         invitation.invited_user_id = user.id
         
         db.session.add(membership)
+        record_activity(invitation.project_id, 'member.joined', user.id, actor=user.id,
+                        role=invitation.role.value, invitation_id=invitation.id)
         db.session.commit()
         
         # Логиним пользователя
@@ -1153,6 +1666,10 @@ def register_and_accept_invitation(token):
             'project_id': invitation.project_id
         })
         
+    except HashingUnavailable as e:
+        print(f"⏳ {e}")
+        db.session.rollback()
+        return jsonify({'error': 'Server is busy, try again later'}), 503, {'Retry-After': '1'}
     except Exception as e:
         print(f"❌ Error in register-accept: {str(e)}")
         import traceback
@@ -1176,6 +1693,7 @@ def create_assignment_notification():
             return jsonify({'error': 'card_id and assigned_user_id are required'}), 400
         
         # Находим карточку и пользователей
+        select_entity_shard(card_id)
         card = Card.query.get_or_404(card_id)
         assigned_user = User.query.get_or_404(assigned_user_id)
         
@@ -1234,6 +1752,7 @@ def create_assignment_notification():
 
 @app.route('/api/notifications', methods=['GET'])
 @login_required
+@read_only
 def get_user_notifications():
     """Получить уведомления текущего пользователя"""
     try:
@@ -1271,8 +1790,35 @@ def mark_notification_read(notification_id):
         db.session.rollback()
         return jsonify({'error': 'Failed to mark notification as read'}), 500
 
+@app.route('/api/notifications/read-all', methods=['POST'])
+@login_required
+def mark_all_notifications_read():
+    """Отметить все уведомления прочитанными (опционально по проекту, типу или дате)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        project_id = data.get('project_id')
+        before = datetime.fromisoformat(data['before']) if data.get('before') else None
+        
+        updated = mark_all_read(
+            current_user.id,
+            project_id=int(project_id) if project_id is not None else None,
+            notification_type=data.get('type'),
+            before=before
+        )
+        
+        return jsonify({'message': 'Notifications marked as read', 'updated': updated})
+        
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameters: {e}'}), 400
+    except Exception as e:
+        print(f"❌ Error marking all notifications as read: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to mark notifications as read'}), 500
+
 @app.route('/api/notifications/unread-count', methods=['GET'])
 @login_required
+@read_only
 def get_unread_notifications_count():
     """Получить количество непрочитанных уведомлений"""
     try:
@@ -1288,8 +1834,19 @@ def get_unread_notifications_count():
         return jsonify({'error': 'Failed to get unread count'}), 500
 
 # Поиск пользователей проекта для упоминаний
+def load_mentionable_users(project_id):
+    """Все участники проекта, кроме viewer (для индекса упоминаний)"""
+    users = User.query.join(ProjectMember, ProjectMember.user_id == User.id).filter(
+        ProjectMember.project_id == project_id,
+        ProjectMember.role != UserRole.VIEWER
+    ).all()
+    return [user.to_dict() for user in users]
+
+mention_index = init_mention_index(app, db, ProjectMember, User, load_mentionable_users)
+
 @app.route('/api/projects/<int:project_id>/users/search')
 @login_required
+@read_only
 def search_project_users(project_id):
     try:
         if not has_project_access(project_id):
@@ -1297,6 +1854,12 @@ def search_project_users(project_id):
         
         query = request.args.get('q', '')
         
+        # Быстрый путь: индекс участников проекта в памяти
+        index = mention_index.get(project_id)
+        if index is not None:
+            return jsonify(index.search(query, limit=10))
+        
+        # Индекс еще строится - ищем в базе
         # Если запрос пустой (просто @), возвращаем всех пользователей
         if not query:
             # Ищем всех пользователей проекта (исключая viewer)
@@ -1312,7 +1875,7 @@ def search_project_users(project_id):
                 ProjectMember.user.has(User.username.ilike(f'%{query}%'))
             ).limit(10).all()
         
-        users = [member.user.to_dict() for member in members]
+        users = [user.to_dict() for user in batch_load(members, ProjectMember.user)]
         return jsonify(users)
         
     except Exception as e:
@@ -1334,6 +1897,7 @@ def create_mention_notification():
             return jsonify({'error': 'comment_id and mentioned_user_id are required'}), 400
         
         # Находим комментарий и пользователей
+        select_entity_shard(comment_id)
         comment = Comment.query.get_or_404(comment_id)
         mentioned_user = User.query.get_or_404(mentioned_user_id)
         
@@ -1391,23 +1955,217 @@ def create_mention_notification():
 # Получение упоминаний для пользователя
 @app.route('/api/user/mentions')
 @login_required
+@read_only
 def get_user_mentions():
     """Получить упоминания текущего пользователя"""
     try:
-        mentions = Mention.query.filter_by(
-            mentioned_user_id=current_user.id
-        ).order_by(Mention.created_at.desc()).limit(50).all()
+        # Упоминания лежат в шардах проектов: собираем из каждого и сливаем по дате
+        results = []
+        for _ in for_each_shard():
+            mentions = Mention.query.join(Comment).join(Card, Card.id == Comment.card_id).filter(
+                Mention.mentioned_user_id == current_user.id,
+                Card.deleted_at.is_(None)
+            ).order_by(Mention.created_at.desc()).limit(50).all()
+            # Комментарии, их авторы и упоминания - по запросу на отношение, а не на строку
+            comments = batch_load(mentions, Mention.comment)
+            batch_load(comments, Comment.author)
+            batch_load(mentions + batch_load(comments, Comment.mentions), Mention.mentioned_user)
+            
+            results.extend({
+                'id': mention.id,
+                'comment': mention.comment.to_dict(),
+                'mentioned_user': mention.mentioned_user.to_dict(),
+                'created_at': mention.created_at.isoformat()
+            } for mention in mentions)
         
-        return jsonify([{
-            'id': mention.id,
-            'comment': mention.comment.to_dict(),
-            'mentioned_user': mention.mentioned_user.to_dict(),
-            'created_at': mention.created_at.isoformat()
-        } for mention in mentions])
+        results.sort(key=lambda mention: mention['created_at'], reverse=True)
+        return jsonify(results[:50])
         
     except Exception as e:
         print(f"❌ Error getting mentions: {str(e)}")
         return jsonify({'error': 'Failed to get mentions'}), 500
+
+# Сводка для главной страницы
+@app.route('/api/dashboard')
+@login_required
+@read_only
+def get_dashboard():
+    """Проекты, счетчики, приглашения и упоминания одним запросом.
+    
+    sections - какие разделы вернуть (по умолчанию все основные),
+    exclude - какие разделы пропустить; оба параметра через запятую.
+    """
+    try:
+        try:
+            sections = resolve_sections(request.args.get('sections'), request.args.get('exclude'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(build_dashboard(current_user.id, sections))
+        
+    except Exception as e:
+        print(f"❌ Error getting dashboard: {str(e)}")
+        return jsonify({'error': 'Failed to get dashboard'}), 500
+
+# Архив карточек
+@app.route('/api/lists/<int:list_id>/archive', methods=['POST'])
+@login_required
+def archive_list_cards(list_id):
+    """Архивировать карточки списка, не менявшиеся N дней"""
+    try:
+        board_list = BoardList.query.get_or_404(list_id)
+        
+        if not has_project_access(board_list.board.project_id, UserRole.ADMIN):
+            return jsonify({'error': 'Only project admins can archive cards'}), 403
+        
+        data = request.get_json(silent=True) or {}
+        try:
+            older_than_days = int(data.get('older_than_days', app.config['ARCHIVE_CARD_AGE_DAYS']))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'older_than_days must be an integer'}), 400
+        if older_than_days < 0:
+            return jsonify({'error': 'older_than_days must not be negative'}), 400
+        
+        archived = archive_cards([list_id], older_than_days)
+        print(f"📦 Archived {archived} cards from list {list_id}")
+        if archived:
+            record_activity(board_list.board.project_id, 'list.cards_archived', board_list, count=archived)
+            db.session.commit()
+        
+        return jsonify({'archived': archived})
+        
+    except Exception as e:
+        print(f"❌ Error archiving cards: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to archive cards'}), 500
+
+@app.route('/api/projects/<int:project_id>/activity')
+@login_required
+@read_only
+def get_project_activity(project_id):
+    """Лента действий проекта от новых к старым.
+    
+    Параметры: type - типы событий через запятую (card.moved,comment.added),
+    limit, cursor - курсор следующей страницы.
+    """
+    try:
+        if not has_project_access(project_id):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        limit = page_limit(default=50, maximum=200)
+        types = [name.strip() for name in request.args.get('type', '').split(',') if name.strip()]
+        
+        before_id = None
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                before_id, = decode_cursor(cursor, 1)
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+        
+        events = project_activity(project_id, limit, before_id=before_id, types=types)
+        events, next_cursor = page(events, limit, key=lambda event: (event.id,))
+        
+        return jsonify({
+            'activity': [event.to_dict() for event in events],
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        print(f"❌ Error getting project activity: {str(e)}")
+        return jsonify({'error': 'Failed to get project activity'}), 500
+
+@app.route('/api/projects/<int:project_id>/reports/flow')
+@login_required
+@read_only
+def get_flow_report(project_id):
+    """CFD, время в списках, cycle/lead time и недельная пропускная способность.
+    
+    Параметры: days - период CFD и распределений (по умолчанию 30),
+    weeks - число недель пропускной способности, done_list_id - итоговый
+    список (по умолчанию последний список доски).
+    """
+    try:
+        if not has_project_access(project_id):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        days = max(1, min(request.args.get('days', 30, type=int), 365))
+        weeks = max(1, min(request.args.get('weeks', 12, type=int), 104))
+        done_list_id = request.args.get('done_list_id', type=int)
+        
+        try:
+            report = flow_report(flow_cache, project_id, days=days, weeks=weeks, done_list_id=done_list_id)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify(report)
+    except Exception as e:
+        print(f"❌ Error building flow report: {str(e)}")
+        return jsonify({'error': 'Failed to build flow report'}), 500
+
+@app.route('/api/projects/<int:project_id>/archive/cards')
+@login_required
+def get_archived_cards(project_id):
+    """Список архивных карточек проекта"""
+    try:
+        if not has_project_access(project_id):
+            return jsonify({'error': 'Access denied'}), 403
+        
+        limit = min(int(request.args.get('limit', 50)), 200)
+        archived_cards = ArchivedCard.query.filter_by(
+            project_id=project_id
+        ).order_by(ArchivedCard.archived_at.desc()).limit(limit).all()
+        
+        return jsonify([card.to_dict() for card in archived_cards])
+        
+    except Exception as e:
+        print(f"❌ Error getting archived cards: {str(e)}")
+        return jsonify({'error': 'Failed to get archived cards'}), 500
+
+@app.route('/api/archive/cards/<int:card_id>/restore', methods=['POST'])
+@login_required
+def restore_archived_card(card_id):
+    """Вернуть карточку из архива"""
+    try:
+        archived = find_archived_card(card_id)
+        if not archived:
+            return jsonify({'error': 'Archived card not found'}), 404
+        
+        project_id = archived.project_id
+        if not has_project_access(project_id, UserRole.MEMBER):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        
+        try:
+            card = restore_card(archived)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 409
+        
+        record_activity(project_id, 'card.unarchived', card, title=card.title, list_id=card.list_id)
+        db.session.commit()
+        
+        print(f"✅ Card {card_id} restored from archive")
+        return jsonify(card.to_dict())
+        
+    except Exception as e:
+        print(f"❌ Error restoring card: {str(e)}")
+        db.session.rollback()
+        return jsonify({'error': 'Failed to restore card'}), 500
+
+# Повтор запросов на запись, упавших на блокировке базы (после регистрации всех маршрутов)
+init_write_retries(app, db)
+
+# Фоновые задачи
+register_job('archive', app.config['ARCHIVE_INTERVAL_SECONDS'], run_archive_job)
+register_job('prune_notifications', app.config['NOTIFICATION_PRUNE_INTERVAL_SECONDS'], run_prune_job)
+register_job('prune_refresh_tokens', app.config['TOKEN_PRUNE_INTERVAL_SECONDS'], run_token_prune_job)
+register_job('purge_deleted', app.config['PURGE_INTERVAL_SECONDS'], run_purge_job)
+if app.config['REPLICA_SYNC_ENABLED']:
+    register_job('replica_sync', app.config['REPLICA_SYNC_INTERVAL_SECONDS'], sync_replica)
+if app.config['DEADLINE_REMINDERS_ENABLED']:
+    deadline_scheduler = init_deadline_scheduler(app, db)
+    register_job('deadline_reminders', app.config['DEADLINE_TICK_SECONDS'], deadline_scheduler.tick)
+
+if app.config['BACKGROUND_JOBS_ENABLED']:
+    start_jobs(app)
         
 # Запуск приложения
 if __name__ == '__main__':
@@ -0,0 +1,226 @@
+"""Перенос старых карточек и уведомлений в архивные (холодные) таблицы.
+
+Карточка архивируется вместе со всеми зависимыми строками: они
+сериализуются в JSON-снимок ArchivedCard.payload и удаляются из рабочих
+таблиц. Вся работа идет пачками по ARCHIVE_BATCH_SIZE строк, каждая
+пачка в отдельной короткой транзакции.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, insert, delete
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    db, Board, BoardList, Card, CardAssignee, CardLabel, Checklist, ChecklistItem,
+    Comment, Mention, Notification, ArchivedCard, ArchivedNotification
+)
+from sharding import for_each_shard
+from cache import invalidate_project
+
+
+def _serialize_row(row):
+    return {key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in row.items()}
+
+
+def _deserialize_row(model, data):
+    row = {}
+    for column in model.__table__.columns:
+        if column.name not in data:
+            continue
+        value = data[column.name]
+        if value is not None and isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        row[column.name] = value
+    return row
+
+
+def _select_rows(model, column, ids):
+    if not ids:
+        return []
+    result = db.session.execute(select(model.__table__).where(column.in_(ids)))
+    return [dict(row._mapping) for row in result]
+
+
+def delete_card_rows(card_ids, checklist_ids=None, comment_ids=None):
+    """Удалить карточки со всеми зависимыми строками набором DELETE ... WHERE IN,
+    снизу вверх по зависимостям, без загрузки объектов (коммит - за вызывающим)"""
+    if checklist_ids is None:
+        checklist_ids = db.session.execute(
+            select(Checklist.__table__.c.id).where(Checklist.card_id.in_(card_ids))
+        ).scalars().all()
+    if comment_ids is None:
+        comment_ids = db.session.execute(
+            select(Comment.__table__.c.id).where(Comment.card_id.in_(card_ids))
+        ).scalars().all()
+    db.session.execute(delete(Mention.__table__).where(Mention.comment_id.in_(comment_ids)))
+    db.session.execute(delete(ChecklistItem.__table__).where(ChecklistItem.checklist_id.in_(checklist_ids)))
+    for model in (Comment, Checklist, CardLabel, CardAssignee):
+        db.session.execute(delete(model.__table__).where(model.card_id.in_(card_ids)))
+    db.session.execute(delete(Card.__table__).where(Card.id.in_(card_ids)))
+
+
+def _archive_card_batch(card_ids):
+    """Переносит одну пачку карточек в архив. Возвращает количество карточек."""
+    cards = _select_rows(Card, Card.id, card_ids)
+    if not cards:
+        return 0
+
+    list_ids = {card['list_id'] for card in cards}
+    boards = dict(db.session.execute(
+        select(BoardList.id, BoardList.board_id).where(BoardList.id.in_(list_ids))
+    ).all())
+    projects = dict(db.session.execute(
+        select(Board.id, Board.project_id).where(Board.id.in_(set(boards.values())))
+    ).all())
+
+    # Зависимые строки: по одному IN-запросу на таблицу
+    children = {
+        'assignees': _select_rows(CardAssignee, CardAssignee.card_id, card_ids),
+        'labels': _select_rows(CardLabel, CardLabel.card_id, card_ids),
+        'checklists': _select_rows(Checklist, Checklist.card_id, card_ids),
+        'comments': _select_rows(Comment, Comment.card_id, card_ids),
+    }
+    checklist_ids = [row['id'] for row in children['checklists']]
+    comment_ids = [row['id'] for row in children['comments']]
+    children['checklist_items'] = _select_rows(ChecklistItem, ChecklistItem.checklist_id, checklist_ids)
+    children['mentions'] = _select_rows(Mention, Mention.comment_id, comment_ids)
+
+    checklist_card = {row['id']: row['card_id'] for row in children['checklists']}
+    comment_card = {row['id']: row['card_id'] for row in children['comments']}
+    card_of = {
+        'assignees': lambda row: row['card_id'],
+        'labels': lambda row: row['card_id'],
+        'checklists': lambda row: row['card_id'],
+        'comments': lambda row: row['card_id'],
+        'checklist_items': lambda row: checklist_card[row['checklist_id']],
+        'mentions': lambda row: comment_card[row['comment_id']],
+    }
+
+    payloads = {card['id']: {'card': _serialize_row(card), **{key: [] for key in children}} for card in cards}
+    for key, rows in children.items():
+        for row in rows:
+            payloads[card_of[key](row)][key].append(_serialize_row(row))
+
+    now = datetime.utcnow()
+    db.session.execute(insert(ArchivedCard.__table__), [{
+        'original_card_id': card['id'],
+        'title': card['title'],
+        'list_id': card['list_id'],
+        'board_id': boards[card['list_id']],
+        'project_id': projects[boards[card['list_id']]],
+        'archived_at': now,
+        'payload': payloads[card['id']],
+    } for card in cards])
+
+    delete_card_rows(card_ids, checklist_ids, comment_ids)
+    db.session.commit()
+    for project_id in set(projects.values()):
+        invalidate_project(project_id)
+    return len(cards)
+
+
+def archive_cards(list_ids, older_than_days, batch_size=None, max_batches=None):
+    """Архивировать карточки из списков list_ids, не менявшиеся older_than_days дней"""
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        card_ids = db.session.execute(
+            select(Card.id)
+            .where(Card.list_id.in_(list_ids), Card.updated_at < cutoff)
+            .order_by(Card.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not card_ids:
+            break
+        archived += _archive_card_batch(card_ids)
+        batches += 1
+    return archived
+
+
+def archive_notifications(retention_days, batch_size=None, max_batches=None):
+    """Перенести уведомления старше retention_days дней в архивную таблицу"""
+    batch_size = batch_size or current_app.config['ARCHIVE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    columns = [column.name for column in Notification.__table__.columns]
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(Notification.id)
+            .where(Notification.created_at < cutoff)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        # INSERT ... SELECT и DELETE по одной и той же пачке id в одной транзакции
+        db.session.execute(
+            insert(ArchivedNotification.__table__).from_select(
+                columns,
+                select(*[Notification.__table__.c[name] for name in columns]).where(Notification.id.in_(ids))
+            )
+        )
+        db.session.execute(delete(Notification.__table__).where(Notification.id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+        batches += 1
+    return archived
+
+
+def find_archived_card(card_id):
+    """Последняя архивная копия карточки card_id (или None)"""
+    return ArchivedCard.query.filter_by(original_card_id=card_id).order_by(
+        ArchivedCard.archived_at.desc(), ArchivedCard.id.desc()
+    ).first()
+
+
+def restore_card(archived):
+    """Вернуть карточку из архива в рабочие таблицы. Возвращает Card."""
+    card_id = archived.original_card_id
+    if not BoardList.query.get(archived.list_id):
+        raise ValueError('Original list no longer exists')
+    # Без AUTOINCREMENT id архивной карточки мог достаться новой (в т.ч. удаленной мягко)
+    if db.session.execute(select(Card.__table__.c.id).where(Card.__table__.c.id == card_id)).first():
+        raise ValueError('Card id is already taken by another card')
+
+    payload = archived.payload
+    card_row = _deserialize_row(Card, payload['card'])
+    # Восстановление - изменение карточки: со старым updated_at ее снова
+    # заархивировал бы ближайший запуск run_archive_job
+    card_row['updated_at'] = datetime.utcnow()
+    try:
+        db.session.execute(insert(Card.__table__), [card_row])
+        for key, model in (('assignees', CardAssignee), ('labels', CardLabel), ('checklists', Checklist),
+                           ('checklist_items', ChecklistItem), ('comments', Comment), ('mentions', Mention)):
+            if payload[key]:
+                db.session.execute(insert(model.__table__), [_deserialize_row(model, row) for row in payload[key]])
+    except IntegrityError:
+        # id зависимой строки (комментария, чеклиста) тоже мог быть выдан повторно
+        db.session.rollback()
+        raise ValueError('Archived rows collide with existing rows')
+    project_id = archived.project_id
+    db.session.delete(archived)
+    db.session.commit()
+    invalidate_project(project_id)
+    return Card.query.get(card_id)
+
+
+def run_archive_job():
+    """Периодическая задача: архивировать старые карточки и уведомления"""
+    config = current_app.config
+    max_batches = config['ARCHIVE_MAX_BATCHES_PER_RUN']
+    cards = 0
+    for _ in for_each_shard():
+        list_ids = db.session.execute(
+            select(BoardList.id).where(BoardList.name.in_(config['ARCHIVE_LIST_NAMES']))
+        ).scalars().all()
+        if list_ids:
+            cards += archive_cards(list_ids, config['ARCHIVE_CARD_AGE_DAYS'], max_batches=max_batches)
+
+    notifications = archive_notifications(config['NOTIFICATION_RETENTION_DAYS'], max_batches=max_batches)
+    if cards or notifications:
+        print(f"📦 Archived {cards} cards and {notifications} notifications")
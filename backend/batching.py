@@ -0,0 +1,88 @@
+"""Пакетная загрузка отношений для списков объектов.
+
+Сериализация списка через to_dict обращается к ленивым отношениям каждой
+строки - по запросу на строку (N+1). batch_load собирает ключи отношения
+со всех объектов и загружает связанные объекты одним запросом IN (пачками
+по IN_CHUNK_SIZE ключей), затем раскладывает их через set_committed_value -
+так, будто отношение загрузил сам ORM, без пометки изменений. Уже
+загруженные отношения и объекты из identity map сессии повторно не
+запрашиваются.
+
+    comments = batch_load(mentions, Mention.comment)
+    batch_load(comments, Comment.author)
+
+Поддерживаются many-to-one и one-to-many по одной колонке ключа. Запрос
+идет через обычную сессию, поэтому выбор шарда и скрытие мягко удаленных
+строк работают как при ленивой загрузке.
+"""
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.base import instance_state
+from sqlalchemy.orm.interfaces import MANYTOONE, ONETOMANY
+from sqlalchemy.orm.util import identity_key
+
+IN_CHUNK_SIZE = 500
+
+
+def _chunks(keys):
+    keys = sorted(keys)
+    for start in range(0, len(keys), IN_CHUNK_SIZE):
+        yield keys[start:start + IN_CHUNK_SIZE]
+
+
+def _related(instances, key):
+    """Связанные объекты всех instances (уже загруженные) без повторов"""
+    result = {}
+    for instance in instances:
+        value = getattr(instance, key)
+        for obj in (value if isinstance(value, list) else [value]):
+            if obj is not None:
+                result.setdefault(id(obj), obj)
+    return list(result.values())
+
+
+def batch_load(instances, relationship):
+    """Загрузить relationship (например, Invitation.project) у всех instances.
+
+    Возвращает связанные объекты без повторов - их можно передать в
+    следующий batch_load для вложенных отношений.
+    """
+    prop = relationship.property
+    if prop.direction not in (MANYTOONE, ONETOMANY) or len(prop.local_remote_pairs) != 1:
+        raise ValueError(f'Batch loading is not supported for {relationship}')
+
+    pending = [instance for instance in instances if prop.key in instance_state(instance).unloaded]
+    if not pending:
+        return _related(instances, prop.key)
+
+    (local_column, remote_column), = prop.local_remote_pairs
+    local_key = prop.parent.get_property_by_column(local_column).key
+    target = prop.mapper
+    remote_key = target.get_property_by_column(remote_column).key
+    session = object_session(pending[0])
+    keys = {getattr(instance, local_key) for instance in pending} - {None}
+
+    if prop.direction is MANYTOONE:
+        found = {}
+        # Ключ - первичный ключ цели: сначала ищем среди уже загруженных объектов
+        if tuple(target.primary_key) == (remote_column,):
+            for key in keys:
+                obj = session.identity_map.get(identity_key(target.class_, key))
+                if obj is not None:
+                    found[key] = obj
+        for chunk in _chunks(keys - found.keys()):
+            for obj in session.query(target.class_).filter(remote_column.in_(chunk)):
+                found[getattr(obj, remote_key)] = obj
+        for instance in pending:
+            set_committed_value(instance, prop.key, found.get(getattr(instance, local_key)))
+    else:
+        groups = {key: [] for key in keys}
+        order_by = prop.order_by or target.primary_key
+        for chunk in _chunks(keys):
+            for obj in session.query(target.class_).filter(remote_column.in_(chunk)).order_by(*order_by):
+                groups[getattr(obj, remote_key)].append(obj)
+        for instance in pending:
+            group = groups.get(getattr(instance, local_key), [])
+            set_committed_value(instance, prop.key, group if prop.uselist else (group[0] if group else None))
+
+    return _related(instances, prop.key)
@@ -0,0 +1,48 @@
+"""Шаблоны досок из конфигурации (BOARD_TEMPLATES).
+
+Списки и метки шаблона вставляются одним многострочным INSERT на таблицу.
+"""
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert
+
+from models import db, BoardList, Label
+
+
+class UnknownTemplate(ValueError):
+    pass
+
+
+def get_template(name=None):
+    templates = current_app.config['BOARD_TEMPLATES']
+    name = name or current_app.config['DEFAULT_BOARD_TEMPLATE']
+    if name not in templates:
+        raise UnknownTemplate(f'Unknown board template: {name}')
+    return templates[name]
+
+
+def list_templates():
+    return [{
+        'name': name,
+        'lists': template['lists'],
+        'labels': template.get('labels', [])
+    } for name, template in current_app.config['BOARD_TEMPLATES'].items()]
+
+
+def apply_template(board_id, project_id, template):
+    """Создать списки и метки шаблона для доски (коммит - за вызывающим)"""
+    now = datetime.utcnow()
+    db.session.execute(insert(BoardList.__table__), [{
+        'name': name,
+        'position': position,
+        'board_id': board_id,
+        'created_at': now
+    } for position, name in enumerate(template['lists'])])
+    if template.get('labels'):
+        db.session.execute(insert(Label.__table__), [{
+            'name': label['name'],
+            'color': label['color'],
+            'project_id': project_id,
+            'created_at': now
+        } for label in template['labels']])
@@ -0,0 +1,247 @@
+"""Кэш сериализованных ответов (доски, карточки, проекты).
+
+Бэкенды:
+- LRUCache   - в памяти процесса, ограничен по числу записей, с TTL;
+- RedisCache - внешний сервер с протоколом Redis (любой клиент с методами
+  get/set/delete/incr, например redis.Redis или фейк в тестах).
+
+Инвалидация через поколения: запись хранит номер поколения своего проекта
+(и глобального поколения, которое меняется при изменении пользователей).
+Любой коммит, затронувший данные проекта, увеличивает его поколение -
+старые записи перестают совпадать и вытесняются обычным образом.
+Поколение для записи читается до загрузки данных из базы (cache_generation):
+коммит, попавший между чтением данных и записью в кэш, делает эту запись
+устаревшей, а не помечает старые данные новым поколением.
+
+LRU-бэкенд хранит поколения в памяти процесса и не видит коммитов других
+воркеров, поэтому он допускается только при одном процессе
+(WORKER_PROCESSES); при нескольких воркерах нужен RedisCache, иначе кэш
+выключается.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import event
+
+import metrics
+from routing import reading_from_replica
+
+GLOBAL_SCOPE = 'global'
+
+
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                metrics.incr('cache.evictions')
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def generation(self, scope):
+        return self.generations.get(scope, 0)
+
+    def bump(self, scope):
+        with self.lock:
+            self.generations[scope] = self.generations.get(scope, 0) + 1
+
+
+class RedisCache:
+    def __init__(self, client, ttl, prefix='jira:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, ttl):
+        import redis
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value, separators=(',', ':')), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def generation(self, scope):
+        raw = self.client.get(f'{self.prefix}gen:{scope}')
+        return int(raw) if raw is not None else 0
+
+    def bump(self, scope):
+        self.client.incr(f'{self.prefix}gen:{scope}')
+
+
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    def get(self, key):
+        """Вернуть (project_id, payload) или None"""
+        entry = self.backend.get(key)
+        if entry is not None and (
+                entry['gen'] == self.backend.generation(entry['project_id'])
+                and entry['global_gen'] == self.backend.generation(GLOBAL_SCOPE)):
+            metrics.incr('cache.hits')
+            return entry['project_id'], entry['payload']
+        metrics.incr('cache.misses')
+        return None
+
+    def generation(self, project_id):
+        """Поколения (проекта, глобальное) - читать до загрузки данных"""
+        return self.backend.generation(project_id), self.backend.generation(GLOBAL_SCOPE)
+
+    def set(self, key, project_id, generation, payload):
+        self.backend.set(key, {
+            'project_id': project_id,
+            'gen': generation[0],
+            'global_gen': generation[1],
+            'payload': payload
+        })
+
+    def invalidate_project(self, project_id):
+        self.backend.bump(project_id)
+        metrics.incr('cache.invalidations')
+
+    def invalidate_all(self):
+        self.backend.bump(GLOBAL_SCOPE)
+        metrics.incr('cache.invalidations')
+
+
+def get_cache():
+    """Кэш ответов текущего приложения или None, если кэш выключен"""
+    return current_app.extensions.get('response_cache')
+
+
+def cached_payload(key):
+    """(project_id, payload) из кэша или None"""
+    cache = get_cache()
+    return cache.get(key) if cache is not None else None
+
+
+def cache_generation(project_id):
+    """Поколение кэша для store_payload; вызывать до загрузки данных из базы"""
+    cache = get_cache()
+    if cache is None or project_id is None:
+        return None
+    return cache.generation(project_id)
+
+
+def store_payload(key, project_id, generation, payload):
+    cache = get_cache()
+    # Данные с реплики могут отставать от основной базы - их не кэшируем,
+    # иначе устаревший ответ получит уже новое поколение
+    if cache is not None and generation is not None and not reading_from_replica():
+        cache.set(key, project_id, generation, payload)
+
+
+def invalidate_project(project_id):
+    cache = get_cache()
+    if cache is not None and project_id is not None:
+        cache.invalidate_project(project_id)
+
+
+def _project_id_of(session, obj):
+    """Проект, к данным которого относится объект модели (или GLOBAL_SCOPE / None).
+
+    Идем по внешним ключам через session.get: у только что созданных
+    объектов отношения (card.list и т.п.) еще не загружены.
+    """
+    from models import (User, Project, ProjectMember, Invitation, Label, Board, BoardList,
+                        Card, CardAssignee, CardLabel, Checklist, ChecklistItem, Comment, Mention)
+
+    def parent(model, parent_id):
+        return session.get(model, parent_id) if parent_id is not None else None
+
+    if obj is None:
+        return None
+    if isinstance(obj, User):
+        return GLOBAL_SCOPE
+    if isinstance(obj, Project):
+        return obj.id
+    if isinstance(obj, (ProjectMember, Invitation, Label, Board)):
+        return obj.project_id
+    if isinstance(obj, BoardList):
+        return _project_id_of(session, parent(Board, obj.board_id))
+    if isinstance(obj, Card):
+        return _project_id_of(session, parent(BoardList, obj.list_id))
+    if isinstance(obj, (CardAssignee, CardLabel, Checklist, Comment)):
+        return _project_id_of(session, parent(Card, obj.card_id))
+    if isinstance(obj, ChecklistItem):
+        return _project_id_of(session, parent(Checklist, obj.checklist_id))
+    if isinstance(obj, Mention):
+        return _project_id_of(session, parent(Comment, obj.comment_id))
+    return None
+
+
+def init_cache(app, db):
+    config = app.config
+    if not config['CACHE_ENABLED']:
+        return
+
+    if config['CACHE_BACKEND'] == 'redis':
+        backend = RedisCache.from_url(config['CACHE_REDIS_URL'], config['CACHE_TTL_SECONDS'])
+    elif config['WORKER_PROCESSES'] > 1:
+        # Запись через один воркер не сбросила бы кэш других: пользователь
+        # получал бы свои старые данные до истечения TTL
+        print(f"⚠️ Response cache disabled: the in-process LRU backend cannot be shared by "
+              f"{config['WORKER_PROCESSES']} workers, set CACHE_BACKEND=redis")
+        return
+    else:
+        backend = LRUCache(config['CACHE_MAX_ENTRIES'], config['CACHE_TTL_SECONDS'])
+    cache = ResponseCache(backend)
+    app.extensions['response_cache'] = cache
+
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'after_flush')
+    def collect_changed_projects(session, flush_context):
+        scopes = session.info.setdefault('cache_scopes', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            try:
+                scope = _project_id_of(session, obj)
+            except Exception:
+                scope = GLOBAL_SCOPE
+            if scope is not None:
+                scopes.add(scope)
+
+    @event.listens_for(session_class, 'after_commit')
+    def invalidate_changed_projects(session):
+        for scope in session.info.pop('cache_scopes', ()):
+            if scope == GLOBAL_SCOPE:
+                cache.invalidate_all()
+            else:
+                cache.invalidate_project(scope)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def forget_changed_projects(session):
+        session.info.pop('cache_scopes', None)
@@ -0,0 +1,137 @@
+"""Копирование доски проекта (списки, метки, карточки, чеклисты) в новый проект.
+
+Копия строится набором INSERT ... SELECT - по одному на таблицу - в одной
+транзакции, без загрузки объектов. Новые id получаются сдвигом старых:
+new_id = old_id + offset, где offset выбирается так, чтобы все новые id
+были больше уже выданных в таблице (с учетом sqlite_sequence). Внешние
+ключи пересчитываются тем же сдвигом родительской таблицы.
+
+Если исходный и новый проект лежат в разных шардах, INSERT ... SELECT
+между базами невозможен: строки читаются из исходного шарда и
+вставляются в целевой пачкой (executemany) с тем же пересчетом id.
+Комментарии, упоминания и назначения не копируются, пункты чеклистов
+копируются невыполненными.
+"""
+from datetime import datetime
+
+from sqlalchemy import select, insert, literal, text, func
+
+from models import db, BoardList, Card, CardLabel, Label, Checklist, ChecklistItem
+from sharding import shard_count, shard_for_project, use_shard
+
+
+def _next_id(table):
+    """Первый свободный id таблицы в текущей базе (шарде)"""
+    # Соединение сессии с базой этой таблицы (текущий шард), в той же транзакции
+    connection = db.session.connection(bind_arguments={'clause': select(table)})
+    max_id = connection.execute(select(func.max(table.c.id))).scalar() or 0
+    if connection.dialect.name == 'sqlite':
+        # AUTOINCREMENT не выдает повторно id удаленных строк (в т.ч. архивных карточек)
+        seq = connection.execute(
+            text('SELECT seq FROM sqlite_sequence WHERE name = :name'), {'name': table.name}
+        ).scalar()
+        max_id = max(max_id, seq or 0)
+    return max_id + 1
+
+
+class _Plan:
+    """Описание копирования одной таблицы"""
+
+    def __init__(self, model, where, columns, parents=None, overrides=None):
+        self.table = model.__table__
+        self.where = where
+        self.columns = columns              # копируемые как есть
+        self.parents = parents or {}        # колонка внешнего ключа -> таблица-родитель
+        self.overrides = overrides or {}    # колонка -> новое значение-константа
+
+
+def _plans(source_board_id, source_project_id, new_project_id, user_id, now):
+    lists = BoardList.__table__
+    cards = Card.__table__
+    labels = Label.__table__
+    checklists = Checklist.__table__
+
+    live_lists = select(lists.c.id).where(lists.c.board_id == source_board_id, lists.c.deleted_at.is_(None))
+    live_cards = select(cards.c.id).where(cards.c.list_id.in_(live_lists), cards.c.deleted_at.is_(None))
+    source_checklists = select(checklists.c.id).where(checklists.c.card_id.in_(live_cards))
+    stamps = {'created_at': now}
+
+    return [
+        _Plan(BoardList, lists.c.id.in_(live_lists), ['name', 'position'],
+              overrides=dict(stamps)),
+        _Plan(Label, labels.c.project_id == source_project_id, ['name', 'color'],
+              overrides=dict(stamps, project_id=new_project_id)),
+        _Plan(Card, cards.c.id.in_(live_cards), ['title', 'description', 'position', 'due_date'],
+              parents={'list_id': lists},
+              overrides=dict(stamps, updated_at=now, created_by_id=user_id)),
+        _Plan(CardLabel, CardLabel.__table__.c.card_id.in_(live_cards), [],
+              parents={'card_id': cards, 'label_id': labels}),
+        _Plan(Checklist, checklists.c.id.in_(source_checklists), ['title', 'position'],
+              parents={'card_id': cards}, overrides=dict(stamps)),
+        _Plan(ChecklistItem, ChecklistItem.__table__.c.checklist_id.in_(source_checklists), ['text', 'position'],
+              parents={'checklist_id': checklists}, overrides=dict(stamps, completed=False)),
+    ]
+
+
+def clone_board(source_board, new_project_id, new_board_id, user_id):
+    """Скопировать содержимое source_board на доску new_board_id (коммит - за вызывающим).
+
+    Вызывать после flush новой доски: в SQLite эта запись уже держит
+    блокировку записи целевой базы, поэтому выбранные сдвиги id не
+    займет параллельная вставка. Возвращает {имя таблицы: число строк}.
+    """
+    source_project_id = source_board.project_id
+    source_shard = shard_for_project(source_project_id)
+    target_shard = shard_for_project(new_project_id)
+    now = datetime.utcnow()
+    plans = _plans(source_board.id, source_project_id, new_project_id, user_id, now)
+
+    offsets = {}
+    counts = {}
+    same_database = not shard_count() or source_shard == target_shard
+
+    for plan in plans:
+        table = plan.table
+        with use_shard(source_shard):
+            bounds = db.session.execute(
+                select(func.min(table.c.id), func.count(table.c.id)).where(plan.where)
+            ).one()
+        min_id, count = bounds
+        counts[table.name] = count
+        if not count:
+            offsets[table.name] = 0
+            continue
+        with use_shard(target_shard):
+            offset = _next_id(table) - min_id
+        offsets[table.name] = offset
+
+        def mapped(column):
+            """Выражение для новой строки: сдвинутый id / внешний ключ / константа"""
+            if column == 'id':
+                return table.c.id + offset
+            if column == 'board_id':
+                return literal(new_board_id)
+            if column in plan.parents:
+                return table.c[column] + offsets[plan.parents[column].name]
+            if column in plan.overrides:
+                return literal(plan.overrides[column], table.c[column].type)
+            return table.c[column]
+
+        names = ['id'] + plan.columns + list(plan.parents) + list(plan.overrides)
+        if table is BoardList.__table__:
+            names.append('board_id')
+
+        if same_database:
+            with use_shard(target_shard):
+                db.session.execute(insert(table).from_select(
+                    names, select(*[mapped(name).label(name) for name in names]).where(plan.where)
+                ))
+        else:
+            with use_shard(source_shard):
+                rows = db.session.execute(
+                    select(*[mapped(name).label(name) for name in names]).where(plan.where)
+                ).mappings().all()
+            with use_shard(target_shard):
+                db.session.execute(insert(table), [dict(row) for row in rows])
+
+    return counts
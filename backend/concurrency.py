@@ -0,0 +1,83 @@
+"""Оптимистическая блокировка карточек, списков и чеклистов.
+
+У версионируемых моделей (VersionedMixin) каждый UPDATE идет с условием
+WHERE version = <прочитанная версия> и увеличивает version, поэтому
+блокировка записи между запросами клиента не нужна.
+
+Клиент передает версию, которую он видел: заголовком If-Match (значение
+ETag из ответа) или полем version в теле. Если версия устарела, запись не
+выполняется: 412 для If-Match, 409 для поля version. Если запись
+параллельного запроса проскочила между чтением и UPDATE, flush бросает
+StaleDataError - это тоже 409. Ответ конфликта содержит текущее
+состояние объекта, чтобы клиент мог слить изменения и повторить запрос.
+Без версии в запросе проверка не выполняется (старые клиенты).
+"""
+from flask import request, jsonify
+
+from models import db
+
+
+class InvalidVersion(ValueError):
+    pass
+
+
+class VersionConflict(Exception):
+    def __init__(self, entity, status):
+        super().__init__('Version conflict')
+        self.entity = entity
+        self.status = status
+
+
+def etag(entity):
+    return f'"{entity.version}"'
+
+
+def expected_version(data=None):
+    """Версия из If-Match или поля version тела и код ответа при ее несовпадении.
+
+    Возвращает (version, status) или (None, None), если версия не передана.
+    """
+    header = request.headers.get('If-Match')
+    if header and header.strip() != '*':
+        value = header.strip()
+        if value.startswith('W/'):
+            value = value[2:]
+        value = value.strip('"')
+        try:
+            return int(value), 412
+        except ValueError:
+            raise InvalidVersion('Invalid If-Match header')
+    if data and data.get('version') is not None:
+        try:
+            return int(data['version']), 409
+        except (TypeError, ValueError):
+            raise InvalidVersion('Invalid version')
+    return None, None
+
+
+def check_version(entity, data=None):
+    """VersionConflict, если клиент видел не текущую версию объекта"""
+    version, status = expected_version(data)
+    if version is not None and version != entity.version:
+        raise VersionConflict(entity, status)
+
+
+def with_etag(response, entity):
+    response.headers['ETag'] = etag(entity)
+    return response
+
+
+def conflict_response(entity, status=409):
+    """Ответ конфликта версий с текущим состоянием объекта (или None, если он удален)"""
+    payload = {'error': 'Version conflict', 'current': entity.to_dict() if entity else None}
+    response = jsonify(payload)
+    response.status_code = status
+    if entity:
+        with_etag(response, entity)
+    return response
+
+
+def stale_write_response(model, entity_id):
+    """Ответ на StaleDataError: откатить транзакцию и вернуть свежее состояние"""
+    db.session.rollback()
+    return conflict_response(db.session.get(model, entity_id, populate_existing=True))
@@ -1,8 +1,161 @@
 import os
+import tempfile
 from datetime import timedelta
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-2023'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///jira.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
\ No newline at end of file
+    # Реплика для чтения (маршруты @read_only); пусто - все запросы в основную базу
+    READ_REPLICA_URL = os.environ.get('READ_REPLICA_URL')
+    # Шардирование данных проектов: список URL баз-шардов; пусто - одна база
+    SHARD_DATABASE_URLS = [url.strip() for url in os.environ.get('SHARD_DATABASE_URLS', '').split(',') if url.strip()]
+    SHARD_ID_SPAN = 10 ** 12
+    SQLALCHEMY_BINDS = dict(
+        {'replica': READ_REPLICA_URL} if READ_REPLICA_URL else {},
+        **{f'shard{i}': url for i, url in enumerate(SHARD_DATABASE_URLS)}
+    )
+    # Сколько секунд после своей записи пользователь читает из основной базы
+    READ_YOUR_WRITES_SECONDS = float(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    # Сколько пользователей помнить в памяти процесса (без Redis)
+    READ_YOUR_WRITES_MAX_USERS = int(os.environ.get('READ_YOUR_WRITES_MAX_USERS', 10000))
+    # Локальная замена репликации: копирование основного SQLite-файла в файл реплики
+    REPLICA_SYNC_ENABLED = os.environ.get('REPLICA_SYNC_ENABLED', '0') == '1'
+    REPLICA_SYNC_INTERVAL_SECONDS = int(os.environ.get('REPLICA_SYNC_INTERVAL_SECONDS', 2))
+    # Токены доступа для API-клиентов (см. tokens.py): короткий access и долгий refresh
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=int(os.environ.get('JWT_ACCESS_TOKEN_MINUTES', 15)))
+    JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_DAYS', 30)))
+    # Удаление записей истекших refresh-токенов
+    TOKEN_PRUNE_INTERVAL_SECONDS = int(os.environ.get('TOKEN_PRUNE_INTERVAL_SECONDS', 3600))
+
+    # Фоновые задачи (архивация и т.п.)
+    BACKGROUND_JOBS_ENABLED = os.environ.get('BACKGROUND_JOBS_ENABLED', '1') == '1'
+    JOBS_LOCK_FILE = os.environ.get('JOBS_LOCK_FILE') or os.path.join(tempfile.gettempdir(), 'analogue-jira-jobs.lock')
+
+    # Архивация карточек и уведомлений
+    ARCHIVE_LIST_NAMES = [name.strip() for name in os.environ.get('ARCHIVE_LIST_NAMES', 'Done').split(',') if name.strip()]
+    ARCHIVE_CARD_AGE_DAYS = int(os.environ.get('ARCHIVE_CARD_AGE_DAYS', 30))
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    ARCHIVE_MAX_BATCHES_PER_RUN = int(os.environ.get('ARCHIVE_MAX_BATCHES_PER_RUN', 20))
+    ARCHIVE_INTERVAL_SECONDS = int(os.environ.get('ARCHIVE_INTERVAL_SECONDS', 3600))
+
+    # Очистка прочитанных уведомлений
+    NOTIFICATION_PRUNE_DAYS = int(os.environ.get('NOTIFICATION_PRUNE_DAYS', 30))
+    NOTIFICATION_PRUNE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_PRUNE_BATCH_SIZE', 1000))
+    NOTIFICATION_PRUNE_MAX_BATCHES = int(os.environ.get('NOTIFICATION_PRUNE_MAX_BATCHES', 50))
+    NOTIFICATION_PRUNE_INTERVAL_SECONDS = int(os.environ.get('NOTIFICATION_PRUNE_INTERVAL_SECONDS', 3600))
+
+    # Ограничение частоты запросов: параметры token bucket по классам маршрутов
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+    RATE_LIMITS = {
+        'poll': {'rate': 0.5, 'burst': 10},    # счетчики, опрашиваемые каждой вкладкой
+        'board': {'rate': 2, 'burst': 20},     # загрузка доски
+    }
+    RATE_LIMIT_ROUTE_CLASSES = {
+        'get_unread_notifications_count': 'poll',
+        'get_assigned_cards_count': 'poll',
+        'get_board': 'board',
+    }
+    RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', 100000))
+    # Общий лимит одновременных запросов действует на процесс. Воркер gunicorn
+    # (gthread) обрабатывает не больше GUNICORN_THREADS запросов сразу, поэтому
+    # по умолчанию лимит равен числу его потоков, а четверть слотов (минимум
+    # один) зарезервирована под запись
+    WORKER_THREADS = int(os.environ.get('GUNICORN_THREADS', 4))
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', WORKER_THREADS))
+    WRITE_RESERVED_SLOTS = int(os.environ.get('WRITE_RESERVED_SLOTS', max(1, WORKER_THREADS // 4)))
+    WRITE_SLOT_WAIT_SECONDS = float(os.environ.get('WRITE_SLOT_WAIT_SECONDS', 5))
+
+    # Токен сборщика метрик для /api/metrics (без него - только для вошедших)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+    # Сжатие ответов
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1') == '1'
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 5))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+    # PRAGMA для каждого нового соединения SQLite
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # читатели не блокируют писателя
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    }
+
+    # Координация записи: очередь писателей процесса и повтор запросов при блокировке базы
+    WRITE_SERIALIZE = os.environ.get('WRITE_SERIALIZE', '1') == '1'
+    WRITE_LOCK_TIMEOUT_SECONDS = float(os.environ.get('WRITE_LOCK_TIMEOUT_SECONDS', 10))
+    WRITE_RETRY_ATTEMPTS = int(os.environ.get('WRITE_RETRY_ATTEMPTS', 4))
+    WRITE_RETRY_BASE_DELAY = float(os.environ.get('WRITE_RETRY_BASE_DELAY', 0.05))
+    WRITE_RETRY_MAX_DELAY = float(os.environ.get('WRITE_RETRY_MAX_DELAY', 1.0))
+    # Общий бюджет запроса на ожидание блокировок и повторы (меньше таймаута воркера gunicorn)
+    WRITE_RETRY_MAX_TOTAL_SECONDS = float(os.environ.get('WRITE_RETRY_MAX_TOTAL_SECONDS', 15))
+
+    # Кэш сериализованных досок, карточек и проектов. Бэкенд lru - только
+    # для одного процесса (WORKER_PROCESSES; gunicorn.conf.py выставляет
+    # GUNICORN_WORKERS), при нескольких воркерах нужен redis
+    WORKER_PROCESSES = int(os.environ.get('GUNICORN_WORKERS', 1))
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '1') == '1'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')  # lru | redis
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 2000))
+    CACHE_TTL_SECONDS = int(os.environ.get('CACHE_TTL_SECONDS', 60))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Кэш пользователей для load_user
+    IDENTITY_CACHE_TTL_SECONDS = int(os.environ.get('IDENTITY_CACHE_TTL_SECONDS', 60))
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+
+    # Хеширование паролей: параметры и пул процессов
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_OFFLOAD = os.environ.get('PASSWORD_HASH_OFFLOAD', '1') == '1'
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_CONCURRENCY = int(os.environ.get('PASSWORD_HASH_MAX_CONCURRENCY', 4))
+    PASSWORD_HASH_TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 5))
+
+    # Индекс участников проектов для автодополнения @упоминаний
+    MENTION_INDEX_MAX_PROJECTS = int(os.environ.get('MENTION_INDEX_MAX_PROJECTS', 1000))
+    # Сброс после коммита виден только своему процессу; другие воркеры - по TTL
+    MENTION_INDEX_TTL_SECONDS = int(os.environ.get('MENTION_INDEX_TTL_SECONDS', 30))
+    MENTION_INDEX_BUILD_WORKERS = int(os.environ.get('MENTION_INDEX_BUILD_WORKERS', 2))
+    MENTION_INDEX_MAX_PENDING = int(os.environ.get('MENTION_INDEX_MAX_PENDING', 32))
+
+    # Напоминания о сроках карточек
+    DEADLINE_REMINDERS_ENABLED = os.environ.get('DEADLINE_REMINDERS_ENABLED', '1') == '1'
+    # За сколько часов до срока напоминать исполнителям
+    DEADLINE_REMINDER_OFFSETS_HOURS = [float(hours) for hours in os.environ.get('DEADLINE_REMINDER_OFFSETS_HOURS', '24,1').split(',') if hours.strip()]
+    # В очереди держим напоминания на ближайшие N часов; остальное подхватит перестроение
+    DEADLINE_HORIZON_HOURS = int(os.environ.get('DEADLINE_HORIZON_HOURS', 48))
+    DEADLINE_TICK_SECONDS = int(os.environ.get('DEADLINE_TICK_SECONDS', 30))
+    DEADLINE_REBUILD_SECONDS = int(os.environ.get('DEADLINE_REBUILD_SECONDS', 600))
+    DEADLINE_BATCH_SIZE = int(os.environ.get('DEADLINE_BATCH_SIZE', 500))
+    # Записи об отправленных напоминаниях хранятся после срока карточки столько часов
+    DEADLINE_REMINDER_RETENTION_HOURS = int(os.environ.get('DEADLINE_REMINDER_RETENTION_HOURS', 24))
+    DEADLINE_PRUNE_MAX_BATCHES = int(os.environ.get('DEADLINE_PRUNE_MAX_BATCHES', 50))
+    # Аренда лидерства в базе (несколько воркеров и серверов)
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', 120))
+
+    # Мягкое удаление списков и карточек: окно отмены и фоновая очистка
+    SOFT_DELETE_UNDO_SECONDS = int(os.environ.get('SOFT_DELETE_UNDO_SECONDS', 3600))
+    PURGE_BATCH_SIZE = int(os.environ.get('PURGE_BATCH_SIZE', 500))
+    PURGE_MAX_BATCHES_PER_RUN = int(os.environ.get('PURGE_MAX_BATCHES_PER_RUN', 20))
+    PURGE_INTERVAL_SECONDS = int(os.environ.get('PURGE_INTERVAL_SECONDS', 300))
+
+    # Отчеты о потоке задач: сводки скольких проектов держать в памяти процесса
+    FLOW_CACHE_MAX_PROJECTS = int(os.environ.get('FLOW_CACHE_MAX_PROJECTS', 50))
+
+    # Шаблоны досок: списки (и метки), создаваемые вместе с проектом или доской
+    BOARD_TEMPLATES = {
+        'basic': {'lists': ['To Do', 'In Progress', 'Done']},
+        'kanban': {'lists': ['Backlog', 'To Do', 'In Progress', 'Review', 'Done']},
+        'bug_tracking': {
+            'lists': ['Reported', 'Confirmed', 'In Progress', 'Fixed', 'Done'],
+            'labels': [
+                {'name': 'Critical', 'color': '#DC2626'},
+                {'name': 'Major', 'color': '#F59E0B'},
+                {'name': 'Minor', 'color': '#10B981'},
+            ],
+        },
+    }
+    DEFAULT_BOARD_TEMPLATE = os.environ.get('DEFAULT_BOARD_TEMPLATE', 'basic')
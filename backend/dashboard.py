@@ -0,0 +1,153 @@
+"""Сводка для главной страницы одним запросом.
+
+Каждый раздел считается минимальным числом агрегирующих запросов
+(для данных в шардах - по одному запросу на шард) и отдается в
+компактном виде, без вложенных досок и полных профилей пользователей.
+"""
+from sqlalchemy.orm import aliased, joinedload
+
+from models import db, User, Project, ProjectMember, Invitation, Board, Card, CardAssignee, Comment, Mention, Notification
+from sharding import for_each_shard, shard_for_project, use_shard
+
+DEFAULT_SECTIONS = ('projects', 'assigned_count', 'unread_count', 'invitations', 'mentions')
+# Необязательные разделы: включаются только явным sections=...
+OPTIONAL_SECTIONS = ('notifications',)
+
+MENTIONS_LIMIT = 10
+NOTIFICATIONS_LIMIT = 50
+
+
+def resolve_sections(sections=None, exclude=None):
+    """Разделы ответа из параметров sections / exclude (строки через запятую)"""
+    def parse(value):
+        return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+    known = DEFAULT_SECTIONS + OPTIONAL_SECTIONS
+    requested = parse(sections) or list(DEFAULT_SECTIONS)
+    unknown = [name for name in requested + parse(exclude) if name not in known]
+    if unknown:
+        raise ValueError(f"Unknown dashboard sections: {', '.join(unknown)}")
+    excluded = set(parse(exclude))
+    return [name for name in requested if name not in excluded]
+
+
+def _projects(user_id):
+    # Подзапрос по отдельному алиасу, чтобы он не скоррелировал с членством пользователя
+    members = aliased(ProjectMember)
+    member_count = db.select(db.func.count(members.id)).where(
+        members.project_id == Project.id
+    ).scalar_subquery()
+
+    rows = db.session.query(
+        Project.id, Project.name, Project.description, Project.updated_at, member_count
+    ).join(ProjectMember, ProjectMember.project_id == Project.id).filter(
+        ProjectMember.user_id == user_id
+    ).order_by(ProjectMember.id).all()
+
+    # Доски лежат в шардах проектов: один GROUP BY на шард
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(shard_for_project(row.id), []).append(row.id)
+    board_counts = {}
+    for shard, project_ids in by_shard.items():
+        with use_shard(shard):
+            board_counts.update(db.session.query(
+                Board.project_id, db.func.count(Board.id)
+            ).filter(Board.project_id.in_(project_ids)).group_by(Board.project_id).all())
+
+    return [{
+        'id': row.id,
+        'name': row.name,
+        'description': row.description,
+        'updated_at': row.updated_at.isoformat(),
+        'member_count': row[4],
+        'board_count': board_counts.get(row.id, 0)
+    } for row in rows]
+
+
+def _assigned_count(user_id):
+    count = 0
+    for _ in for_each_shard():
+        count += db.session.query(db.func.count(CardAssignee.id)).join(
+            Card, Card.id == CardAssignee.card_id
+        ).filter(CardAssignee.user_id == user_id, Card.deleted_at.is_(None)).scalar()
+    return count
+
+
+def _unread_count(user_id):
+    return db.session.query(db.func.count(Notification.id)).filter(
+        Notification.user_id == user_id,
+        Notification.read_at.is_(None)
+    ).scalar()
+
+
+def _invitations(user_id):
+    invitations = Invitation.query.options(
+        joinedload(Invitation.project), joinedload(Invitation.invited_by)
+    ).filter(
+        Invitation.invited_user_id == user_id,
+        Invitation.status == 'pending'
+    ).all()
+
+    return [{
+        'id': invitation.id,
+        'project_id': invitation.project_id,
+        'project_name': invitation.project.name,
+        'invited_by': invitation.invited_by.to_compact_dict(),
+        'role': invitation.role.value,
+        'created_at': invitation.created_at.isoformat(),
+        'expires_at': invitation.expires_at.isoformat() if invitation.expires_at else None
+    } for invitation in invitations]
+
+
+def _mentions(user_id):
+    rows = []
+    for _ in for_each_shard():
+        rows.extend(db.session.query(
+            Mention.id, Mention.created_at, Comment.id.label('comment_id'),
+            Comment.card_id, Comment.text, Comment.author_id
+        ).join(Comment, Comment.id == Mention.comment_id).join(
+            Card, Card.id == Comment.card_id
+        ).filter(
+            Mention.mentioned_user_id == user_id,
+            Card.deleted_at.is_(None)
+        ).order_by(Mention.created_at.desc()).limit(MENTIONS_LIMIT).all())
+    rows.sort(key=lambda row: row.created_at, reverse=True)
+    rows = rows[:MENTIONS_LIMIT]
+
+    # Пользователи в основной базе: авторы одним запросом по IN
+    author_ids = {row.author_id for row in rows}
+    authors = {
+        user.id: user.to_compact_dict()
+        for user in User.query.filter(User.id.in_(author_ids)).all()
+    } if author_ids else {}
+
+    return [{
+        'id': row.id,
+        'comment_id': row.comment_id,
+        'card_id': row.card_id,
+        'text': row.text,
+        'author': authors.get(row.author_id),
+        'created_at': row.created_at.isoformat()
+    } for row in rows]
+
+
+def _notifications(user_id):
+    notifications = Notification.query.filter_by(
+        user_id=user_id
+    ).order_by(Notification.created_at.desc()).limit(NOTIFICATIONS_LIMIT).all()
+    return [notification.to_dict() for notification in notifications]
+
+
+_BUILDERS = {
+    'projects': _projects,
+    'assigned_count': _assigned_count,
+    'unread_count': _unread_count,
+    'invitations': _invitations,
+    'mentions': _mentions,
+    'notifications': _notifications,
+}
+
+
+def build_dashboard(user_id, sections):
+    return {name: _BUILDERS[name](user_id) for name in sections}
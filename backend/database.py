@@ -0,0 +1,35 @@
+"""Настройка подключений к базе данных.
+
+Для SQLite каждое новое соединение получает PRAGMA из SQLITE_PRAGMAS
+(WAL, busy_timeout и т.д.). Соединения не переживают fork: после
+форка воркера нужно вызвать dispose_engines().
+"""
+from sqlalchemy import event
+
+from models import db
+
+
+def configure_engine(engine, pragmas):
+    if engine.dialect.name != 'sqlite' or getattr(engine, '_pragmas_configured', False):
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+    engine._pragmas_configured = True
+
+
+def init_database(app):
+    """Настроить все движки приложения (вызывать внутри app_context)"""
+    for engine in db.engines.values():
+        configure_engine(engine, app.config['SQLITE_PRAGMAS'])
+
+
+def dispose_engines():
+    """Закрыть унаследованные от родителя соединения (после fork)"""
+    for engine in db.engines.values():
+        engine.dispose()
@@ -0,0 +1,242 @@
+"""Напоминания исполнителям о приближении срока карточки.
+
+Планировщик держит в min-куче моменты отправки (due_date - offset) на
+ближайшие DEADLINE_HORIZON_HOURS. Куча строится запросом по индексу
+card(due_date) при старте и раз в DEADLINE_REBUILD_SECONDS (так
+подхватываются карточки, измененные в других воркерах), а между
+перестроениями дополняется после коммитов, изменивших срок карточки.
+Каждый тик снимает с кучи наступившие записи - всю таблицу карточек
+не сканирует.
+
+Перед отправкой срок карточки перечитывается: запись, устаревшая после
+переноса срока, отбрасывается. Отправленные напоминания записываются в
+deadline_reminder, поэтому перестроение и смена лидера не дают дублей.
+Записи о сроках, прошедших больше DEADLINE_REMINDER_RETENTION_HOURS назад,
+удаляются при каждом перестроении кучи: по ним напоминания уже не
+планируются. Так же уходят и записи удаленных карточек - после их срока.
+Тик выполняет только процесс, держащий аренду 'deadline_reminders' в
+базе (см. jobs.acquire_lease).
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect, select, delete
+
+import metrics
+from jobs import acquire_lease
+from models import db, Project, Board, BoardList, Card, CardAssignee, Notification, DeadlineReminder
+from sharding import for_each_shard, shard_for_id, use_shard
+
+LEASE_NAME = 'deadline_reminders'
+
+
+class DeadlineScheduler:
+    def __init__(self, app):
+        config = app.config
+        self.offsets = sorted({int(hours * 60) for hours in config['DEADLINE_REMINDER_OFFSETS_HOURS']})
+        self.horizon = timedelta(hours=config['DEADLINE_HORIZON_HOURS'])
+        self.rebuild_interval = config['DEADLINE_REBUILD_SECONDS']
+        self.batch_size = config['DEADLINE_BATCH_SIZE']
+        self.lease_seconds = config['SCHEDULER_LEASE_SECONDS']
+        self.retention = timedelta(hours=config['DEADLINE_REMINDER_RETENTION_HOURS'])
+        self.prune_max_batches = config['DEADLINE_PRUNE_MAX_BATCHES']
+        # Элементы кучи: (fire_at, card_id, offset_minutes, due_date)
+        self.heap = []
+        self.active = False
+        self.next_rebuild = 0
+        self.lock = threading.Lock()
+
+    def _entries(self, card_id, due_date, now):
+        """Записи для карточки: будущие напоминания в пределах горизонта и
+        одно (ближайшее к сроку) из уже наступивших, если срок еще не прошел"""
+        if due_date is None or due_date <= now:
+            return []
+        entries = []
+        overdue_offset = None
+        for offset in self.offsets:
+            fire_at = due_date - timedelta(minutes=offset)
+            if fire_at <= now:
+                overdue_offset = offset if overdue_offset is None else min(overdue_offset, offset)
+            elif fire_at <= now + self.horizon:
+                entries.append((fire_at, card_id, offset, due_date))
+        if overdue_offset is not None:
+            entries.append((now, card_id, overdue_offset, due_date))
+        return entries
+
+    def schedule(self, card_id, due_date):
+        """Добавить напоминания карточки (после создания или смены срока)"""
+        if not self.active:
+            return
+        entries = self._entries(card_id, due_date, datetime.utcnow())
+        with self.lock:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    def rebuild(self):
+        """Заново заполнить кучу карточками со сроком в пределах горизонта"""
+        now = datetime.utcnow()
+        until = now + self.horizon + timedelta(minutes=max(self.offsets, default=0))
+        entries = []
+        for _ in for_each_shard():
+            rows = db.session.query(Card.id, Card.due_date).filter(
+                Card.due_date > now,
+                Card.due_date <= until
+            ).all()
+            for card_id, due_date in rows:
+                entries.extend(self._entries(card_id, due_date, now))
+        heapq.heapify(entries)
+        with self.lock:
+            self.heap = entries
+            self.active = True
+        self.next_rebuild = time.monotonic() + self.rebuild_interval
+        metrics.observe('deadlines.heap_size', len(entries))
+
+    def prune(self):
+        """Удалить записи об отправке для давно прошедших сроков пачками. Возвращает число строк."""
+        cutoff = datetime.utcnow() - self.retention
+        deleted = 0
+        for _ in range(self.prune_max_batches):
+            ids = db.session.execute(
+                select(DeadlineReminder.id)
+                .where(DeadlineReminder.due_date < cutoff)
+                .order_by(DeadlineReminder.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(delete(DeadlineReminder.__table__).where(DeadlineReminder.id.in_(ids)))
+            db.session.commit()
+            deleted += len(ids)
+            if len(ids) < self.batch_size:
+                break
+        if deleted:
+            print(f"🧹 Pruned {deleted} deadline reminder records")
+        return deleted
+
+    def _pop_due(self, now):
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self.heap))
+        return due
+
+    def tick(self):
+        if not acquire_lease(LEASE_NAME, self.lease_seconds):
+            # Лидерство у другого процесса: наша куча устареет, при возврате - перестроение
+            self.active = False
+            return
+        if not self.active or time.monotonic() >= self.next_rebuild:
+            self.rebuild()
+            self.prune()
+
+        now = datetime.utcnow()
+        while True:
+            entries = self._pop_due(now)
+            if not entries:
+                break
+            sent = self._send(entries)
+            metrics.incr('deadlines.sent', sent)
+
+    def _send(self, entries):
+        """Отправить пачку напоминаний одной транзакцией. Возвращает число уведомлений."""
+        wanted = {}
+        for _, card_id, offset, due_date in entries:
+            wanted.setdefault(card_id, set()).add((offset, due_date))
+
+        # Актуальные данные карточек - по одному запросу на шард
+        by_shard = {}
+        for card_id in wanted:
+            by_shard.setdefault(shard_for_id(card_id), []).append(card_id)
+        cards = {}
+        assignees = {}
+        for shard, card_ids in by_shard.items():
+            with use_shard(shard):
+                for row in db.session.query(
+                    Card.id, Card.title, Card.due_date, Board.id.label('board_id'), Board.project_id
+                ).join(BoardList, BoardList.id == Card.list_id).join(
+                    Board, Board.id == BoardList.board_id
+                ).filter(Card.id.in_(card_ids)).all():
+                    cards[row.id] = row
+                for card_id, user_id in db.session.query(CardAssignee.card_id, CardAssignee.user_id).filter(
+                        CardAssignee.card_id.in_(card_ids)).all():
+                    assignees.setdefault(card_id, []).append(user_id)
+
+        project_names = dict(db.session.query(Project.id, Project.name).filter(
+            Project.id.in_({card.project_id for card in cards.values()})
+        ).all()) if cards else {}
+
+        already_sent = set(db.session.query(
+            DeadlineReminder.card_id, DeadlineReminder.user_id,
+            DeadlineReminder.offset_minutes, DeadlineReminder.due_date
+        ).filter(DeadlineReminder.card_id.in_(list(cards))).all()) if cards else set()
+
+        notifications = []
+        reminders = []
+        for card_id, pending in wanted.items():
+            card = cards.get(card_id)
+            if card is None:
+                continue
+            for offset, due_date in pending:
+                # Срок перенесли после постановки в очередь - запись устарела
+                if card.due_date != due_date:
+                    continue
+                for user_id in assignees.get(card_id, ()):
+                    key = (card_id, user_id, offset, due_date)
+                    if key in already_sent:
+                        continue
+                    already_sent.add(key)
+                    reminders.append({
+                        'card_id': card_id, 'user_id': user_id,
+                        'offset_minutes': offset, 'due_date': due_date
+                    })
+                    notifications.append({
+                        'user_id': user_id,
+                        'type': 'deadline',
+                        'title': "Приближается срок карточки",
+                        'message': f'Срок карточки "{card.title}" истекает {due_date:%d.%m.%Y %H:%M}',
+                        'data': {
+                            'card_id': card_id,
+                            'card_title': card.title,
+                            'project_id': card.project_id,
+                            'project_name': project_names.get(card.project_id),
+                            'board_id': card.board_id,
+                            'due_date': due_date.isoformat(),
+                            'offset_minutes': offset
+                        }
+                    })
+
+        if notifications:
+            db.session.execute(db.insert(Notification), notifications)
+            db.session.execute(db.insert(DeadlineReminder), reminders)
+            db.session.commit()
+            print(f"⏰ Sent {len(notifications)} deadline reminders")
+        return len(notifications)
+
+
+def init_deadline_scheduler(app, db):
+    scheduler = DeadlineScheduler(app)
+    app.extensions['deadline_scheduler'] = scheduler
+
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'after_flush')
+    def collect_due_dates(session, flush_context):
+        changes = None
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Card) and (obj in session.new or inspect(obj).attrs.due_date.history.has_changes()):
+                if changes is None:
+                    changes = session.info.setdefault('deadline_changes', {})
+                changes[obj.id] = obj.due_date
+
+    @event.listens_for(session_class, 'after_commit')
+    def schedule_due_dates(session):
+        for card_id, due_date in session.info.pop('deadline_changes', {}).items():
+            scheduler.schedule(card_id, due_date)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def forget_due_dates(session):
+        session.info.pop('deadline_changes', None)
+
+    return scheduler
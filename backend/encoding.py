@@ -0,0 +1,173 @@
+"""Компактные форматы ответов и сжатие.
+
+Форматы выбираются по заголовку Accept (или параметру ?format=):
+- application/json                      - как раньше (to_dict);
+- application/vnd.jira.compact+json     - колоночный JSON: пользователи и
+  метки вынесены в общие таблицы, карточки - строками значений;
+- application/x-msgpack                 - тот же компактный вид в MessagePack
+  (если установлен пакет msgpack).
+
+Сжатие gzip/brotli применяется к любому ответу больше COMPRESSION_MIN_SIZE.
+"""
+import gzip
+import json
+
+from flask import request, current_app, Response, jsonify
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPACT_JSON = 'application/vnd.jira.compact+json'
+MSGPACK = 'application/x-msgpack'
+
+USER_FIELDS = ['id', 'username', 'email', 'avatar_url', 'created_at']
+LABEL_FIELDS = ['id', 'name', 'color', 'project_id', 'created_at']
+CARD_FIELDS = ['id', 'title', 'description', 'position', 'due_date', 'created_by',
+               'created_at', 'updated_at', 'assignees', 'labels', 'checklists', 'comments', 'version']
+COMMENT_FIELDS = ['id', 'text', 'author', 'created_at', 'updated_at', 'mentions']
+
+
+class _Tables:
+    """Таблицы уникальных пользователей и меток"""
+
+    def __init__(self):
+        self.users = {}
+        self.labels = {}
+
+    def user(self, user):
+        if user is None:
+            return None
+        self.users.setdefault(user['id'], [user.get(field) for field in USER_FIELDS])
+        return user['id']
+
+    def label(self, label):
+        self.labels.setdefault(label['id'], [label.get(field) for field in LABEL_FIELDS])
+        return label['id']
+
+
+def _compact_card(card, tables):
+    comments = [[
+        comment['id'], comment['text'], tables.user(comment['author']),
+        comment['created_at'], comment['updated_at'],
+        [tables.user(user) for user in comment['mentions']]
+    ] for comment in card['comments']]
+    return [
+        card['id'], card['title'], card['description'], card['position'], card['due_date'],
+        tables.user(card['created_by']), card['created_at'], card['updated_at'],
+        [tables.user(user) for user in card['assignees']],
+        [tables.label(label) for label in card['labels']],
+        card['checklists'], comments, card['version']
+    ]
+
+
+def compact_board(board):
+    """Преобразовать Board.to_dict() в колоночный вид без повторов"""
+    tables = _Tables()
+    lists = [{
+        'id': board_list['id'],
+        'name': board_list['name'],
+        'position': board_list['position'],
+        'version': board_list['version'],
+        'created_at': board_list['created_at'],
+        'cards': [_compact_card(card, tables) for card in board_list['cards']]
+    } for board_list in board['lists']]
+
+    compact = {key: value for key, value in board.items() if key != 'lists'}
+    compact.update({
+        'format': 'compact-v1',
+        'fields': {
+            'user': USER_FIELDS,
+            'label': LABEL_FIELDS,
+            'card': CARD_FIELDS,
+            'comment': COMMENT_FIELDS,
+        },
+        'users': list(tables.users.values()),
+        'labels': list(tables.labels.values()),
+        'lists': lists
+    })
+    return compact
+
+
+def compact_project(project):
+    """Project.to_dict() с досками в компактном виде"""
+    compact = dict(project)
+    compact['boards'] = [compact_board(board) for board in project['boards']]
+    return compact
+
+
+def negotiated_format():
+    requested = request.args.get('format')
+    if requested == 'msgpack' and msgpack is not None:
+        return MSGPACK
+    if requested == 'compact':
+        return COMPACT_JSON
+
+    available = [COMPACT_JSON, 'application/json']
+    if msgpack is not None:
+        available.insert(0, MSGPACK)
+    best = request.accept_mimetypes.best_match(available, default='application/json')
+    # Без явного запроса компактного формата отдаем обычный JSON
+    if best != 'application/json' and request.accept_mimetypes[best] <= request.accept_mimetypes['application/json']:
+        return 'application/json'
+    return best
+
+
+def payload_response(payload, compact=None):
+    """Ответ в формате, выбранном клиентом. compact - функция преобразования payload."""
+    mimetype = negotiated_format()
+    if mimetype == 'application/json' or compact is None:
+        return jsonify(payload)
+
+    body = compact(payload)
+    if mimetype == MSGPACK:
+        data = msgpack.packb(body, use_bin_type=True)
+    else:
+        data = json.dumps(body, ensure_ascii=False, separators=(',', ':'))
+    response = Response(data, mimetype=mimetype)
+    response.headers['Vary'] = 'Accept'
+    return response
+
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def init_compression(app):
+    @app.after_request
+    def compress_response(response):
+        config = current_app.config
+        if (not config['COMPRESSION_ENABLED']
+                or response.direct_passthrough
+                or response.status_code < 200 or response.status_code >= 300
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.headers.add('Vary', 'Accept-Encoding')
+        if (response.content_length or 0) < config['COMPRESSION_MIN_SIZE']:
+            return response
+
+        encoding = _accepted_encoding()
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if encoding == 'br':
+            data = brotli.compress(data, quality=config['COMPRESSION_BROTLI_QUALITY'])
+        else:
+            data = gzip.compress(data, compresslevel=config['COMPRESSION_GZIP_LEVEL'])
+
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        return response
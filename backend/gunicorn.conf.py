@@ -0,0 +1,63 @@
+"""Конфигурация gunicorn для production.
+
+Запуск (из каталога backend):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Значения по умолчанию рассчитаны на наши 8-ядерные хосты: 8 процессов
+(по одному на ядро) по 4 потока = 32 одновременных запроса. Потоки
+покрывают ожидание SQLite/сети, процессы - CPU (сериализация, хеширование).
+Все параметры переопределяются переменными окружения GUNICORN_*.
+Лимит одновременных запросов приложения (MAX_CONCURRENT_REQUESTS) действует
+на воркер и по умолчанию равен GUNICORN_THREADS.
+
+Приложение загружается в мастер-процессе до fork (preload_app), поэтому
+код и данные модулей разделяются воркерами через copy-on-write. Соединения
+с базой после fork пересоздаются в post_fork.
+
+Перезапуск без простоя:
+    kill -HUP <master-pid>    # новые воркеры, старые дорабатывают запросы
+При preload_app HUP не перечитывает код; для выкладки новой версии:
+    kill -USR2 <master-pid>   # новый мастер с новым кодом
+    kill -QUIT <old-master-pid>
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+# Приложение (загружается после этого файла) сверяет с числом воркеров
+# выбор бэкенда кэша: кэш в памяти процесса не годится для нескольких воркеров
+os.environ['GUNICORN_WORKERS'] = str(workers)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Периодический перезапуск воркеров ограничивает рост памяти
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 500))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+
+# Фоновые задачи не должны стартовать в мастере при preload:
+# поток не переживает fork. Запускаем их в воркерах (см. post_fork).
+_jobs_enabled = os.environ.get('BACKGROUND_JOBS_ENABLED', '1') == '1'
+os.environ['BACKGROUND_JOBS_ENABLED'] = '0'
+
+
+def post_fork(server, worker):
+    from app import app
+    from database import dispose_engines
+    from jobs import start_jobs
+
+    with app.app_context():
+        # Соединения, открытые мастером при импорте, нельзя использовать после fork
+        dispose_engines()
+
+    if _jobs_enabled:
+        start_jobs(app)
@@ -0,0 +1,100 @@
+"""Хеширование паролей в отдельном пуле процессов.
+
+PBKDF2 занимает CPU на сотни миллисекунд; в потоке запроса всплеск логинов
+занимает все потоки воркера. Здесь хеширование выполняется в пуле из
+PASSWORD_HASH_WORKERS процессов, одновременно - не более
+PASSWORD_HASH_MAX_CONCURRENCY задач на процесс сервера. Если слот не
+освободился за PASSWORD_HASH_TIMEOUT_SECONDS, бросается HashingUnavailable
+(маршруты отвечают 503).
+
+Процессы пула запускаются через forkserver, а не fork: fork многопоточного
+воркера gunicorn копирует блокировки, захваченные другими потоками, и
+процесс пула может навсегда зависнуть на них. Процессы пула, как при
+spawn, импортируют главный модуль программы, поэтому он должен запускать
+сервер только под if __name__ == '__main__' (см. run.py).
+"""
+import multiprocessing
+import os
+import threading
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+import metrics
+
+
+class HashingUnavailable(Exception):
+    pass
+
+
+_pool = None
+_pool_pid = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _mp_context():
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    # Сам сервер forkserver по умолчанию импортирует __main__; ему нужен только werkzeug
+    context.set_forkserver_preload(['werkzeug.security'])
+    return context
+
+
+def _get_pool():
+    """Пул и семафор текущего процесса (после fork создаются заново)"""
+    global _pool, _pool_pid, _slots
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            config = current_app.config
+            _pool = ProcessPoolExecutor(max_workers=config['PASSWORD_HASH_WORKERS'], mp_context=_mp_context())
+            _pool_pid = os.getpid()
+            _slots = threading.BoundedSemaphore(config['PASSWORD_HASH_MAX_CONCURRENCY'])
+        return _pool, _slots
+
+
+def _run(func, *args):
+    config = current_app.config
+    if not config['PASSWORD_HASH_OFFLOAD']:
+        return func(*args)
+
+    pool, slots = _get_pool()
+    timeout = config['PASSWORD_HASH_TIMEOUT_SECONDS']
+    if not slots.acquire(timeout=timeout):
+        metrics.incr('password_hash.rejected')
+        raise HashingUnavailable('Password hashing is overloaded')
+
+    # Слот освобождается, когда задача реально завершилась, а не по таймауту ожидания
+    future = pool.submit(func, *args)
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        metrics.incr('password_hash.timeouts')
+        raise HashingUnavailable('Password hashing timed out')
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method):
+    """Полная запись метода, как ее сохраняет werkzeug ('scrypt' -> 'scrypt:32768:8:1').
+
+    Параметры по умолчанию знает только werkzeug, поэтому берем префикс
+    хеша пустого пароля (один раз на метод).
+    """
+    return generate_password_hash('', method, salt_length=1).split('$', 1)[0]
+
+
+def needs_rehash(password_hash):
+    """Хеш создан с другими параметрами, чем текущий PASSWORD_HASH_METHOD"""
+    return password_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
@@ -0,0 +1,104 @@
+"""Кэш пользователей для Flask-Login.
+
+load_user вызывается на каждый аутентифицированный запрос. Вместо
+запроса к таблице user возвращаем легкий UserIdentity из кэша процесса.
+Запись живет IDENTITY_CACHE_TTL_SECONDS и сбрасывается после коммита,
+изменившего или удалившего пользователя (в других воркерах - по TTL).
+"""
+import threading
+import time
+
+from flask_login import UserMixin
+from sqlalchemy import event
+
+import metrics
+
+
+class UserIdentity(UserMixin):
+    """Неизменяемый снимок полей User, достаточный для current_user"""
+
+    def __init__(self, id, username, email, avatar_url, created_at):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.avatar_url = avatar_url
+        self.created_at = created_at
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.avatar_url, user.created_at)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'email': self.email,
+            'avatar_url': self.avatar_url,
+            'created_at': self.created_at.isoformat()
+        }
+
+
+class IdentityCache:
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        item = self.entries.get(user_id)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def set(self, identity):
+        with self.lock:
+            if len(self.entries) >= self.max_entries:
+                now = time.monotonic()
+                for user_id, (expires_at, _) in list(self.entries.items()):
+                    if expires_at < now:
+                        del self.entries[user_id]
+                if len(self.entries) >= self.max_entries:
+                    self.entries.clear()
+            self.entries[identity.id] = (time.monotonic() + self.ttl, identity)
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+
+def init_identity_cache(app, db, user_model):
+    cache = IdentityCache(app.config['IDENTITY_CACHE_TTL_SECONDS'], app.config['IDENTITY_CACHE_MAX_ENTRIES'])
+    app.extensions['identity_cache'] = cache
+
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'after_flush')
+    def collect_changed_users(session, flush_context):
+        changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, user_model)]
+        if changed:
+            session.info.setdefault('changed_user_ids', set()).update(changed)
+
+    @event.listens_for(session_class, 'after_commit')
+    def invalidate_changed_users(session):
+        for user_id in session.info.pop('changed_user_ids', ()):
+            cache.invalidate(user_id)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def forget_changed_users(session):
+        session.info.pop('changed_user_ids', None)
+
+    def load_identity(user_id):
+        identity = cache.get(user_id)
+        if identity is not None:
+            metrics.incr('identity_cache.hits')
+        else:
+            metrics.incr('identity_cache.misses')
+            user = db.session.get(user_model, user_id)
+            if user is None:
+                return None
+            identity = UserIdentity.from_user(user)
+            cache.set(identity)
+        return identity
+
+    return load_identity
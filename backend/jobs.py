@@ -0,0 +1,135 @@
+"""Простой планировщик периодических фоновых задач.
+
+Все задачи выполняются в одном daemon-потоке процесса, каждая внутри
+контекста приложения. Задача должна сама ограничивать объем работы
+за один запуск (пачками), чтобы не держать блокировку записи SQLite.
+
+При нескольких воркерах поток запускается в каждом, но задачи выполняет
+только тот процесс, который держит файловую блокировку JOBS_LOCK_FILE.
+Задачам, которые нельзя выполнять параллельно и на разных серверах,
+нужна еще аренда в базе - acquire_lease().
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SchedulerLease
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка не нужна, сервер однопроцессный
+    fcntl = None
+
+_jobs = []
+_started = False
+_lock = threading.Lock()
+_leader_file = None
+
+
+class PeriodicJob:
+    def __init__(self, name, interval, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = time.monotonic() + interval
+
+    def run(self, app):
+        with app.app_context():
+            try:
+                self.func()
+            except Exception as e:
+                print(f"❌ Background job {self.name} failed: {e}")
+                db.session.rollback()
+            finally:
+                db.session.remove()
+        self.next_run = time.monotonic() + self.interval
+
+
+def register_job(name, interval, func):
+    """Зарегистрировать функцию, вызываемую раз в interval секунд"""
+    _jobs.append(PeriodicJob(name, interval, func))
+
+
+_holders = {}
+
+
+def lease_holder():
+    """Идентификатор процесса для аренды (после fork у воркера свой)"""
+    pid = os.getpid()
+    if pid not in _holders:
+        _holders[pid] = f'{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}'
+    return _holders[pid]
+
+
+def acquire_lease(name, ttl_seconds, holder=None):
+    """Взять или продлить аренду name в базе. True - аренда наша до now + ttl.
+
+    Аренду можно взять, если она наша или истекла; строка создается при
+    первом обращении (одновременную вставку отсекает первичный ключ).
+    """
+    holder = holder or lease_holder()
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    updated = SchedulerLease.query.filter(
+        SchedulerLease.name == name,
+        db.or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now)
+    ).update({SchedulerLease.holder: holder, SchedulerLease.expires_at: expires_at}, synchronize_session=False)
+    if updated:
+        db.session.commit()
+        return True
+    if db.session.get(SchedulerLease, name) is not None:
+        db.session.rollback()
+        return False
+    try:
+        db.session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+        db.session.commit()
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _is_leader(app):
+    """Попытаться взять файловую блокировку планировщика (без ожидания)"""
+    global _leader_file
+    if fcntl is None or _leader_file is not None:
+        return True
+    lock_path = app.config['JOBS_LOCK_FILE']
+    lock_file = open(lock_path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _leader_file = lock_file
+    print(f"⏰ Process {os.getpid()} runs background jobs")
+    return True
+
+
+def _loop(app):
+    while True:
+        if not _is_leader(app):
+            time.sleep(30)
+            continue
+        now = time.monotonic()
+        for job in list(_jobs):
+            if job.next_run <= now:
+                job.run(app)
+        time.sleep(1)
+
+
+def start_jobs(app):
+    """Запустить поток фоновых задач (один раз на процесс)"""
+    global _started
+    with _lock:
+        if _started or not _jobs:
+            return
+        _started = True
+    thread = threading.Thread(target=_loop, args=(app,), name='background-jobs', daemon=True)
+    thread.start()
+    print(f"⏰ Background jobs started: {[job.name for job in _jobs]}")
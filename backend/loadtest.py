@@ -0,0 +1,355 @@
+"""Нагрузочный тест: одновременная работа пользователей с досками.
+
+Запускается против работающего сервера (только стандартная библиотека):
+
+    python run.py                                   # или gunicorn -c gunicorn.conf.py wsgi:app
+    python loadtest.py --users 20 --iterations 200 --seed 1
+    python loadtest.py --scenario drag_heavy --duration 60 --json out.json
+
+Подготовка создает пользователей, проекты (по --users-per-project
+участников), карточки с чеклистами и приглашает участников. Затем
+каждый виртуальный пользователь в своем потоке (со своими cookie)
+выполняет действия сценария с весами и паузами "на размышление".
+
+Последовательность действий каждого пользователя определяется --seed,
+поэтому прогоны с --iterations сравнимы между коммитами (с --duration
+число действий зависит от скорости сервера). Имена пользователей
+получают метку прогона (--run-tag), чтобы прогоны не конфликтовали в
+одной базе; на выбор действий она не влияет.
+
+Отчет: пропускная способность, p50/p95/p99 и доля ошибок по каждому
+виду запроса, а также ожидание блокировок базы по разнице счетчиков
+/api/metrics (db.*) до и после прогона (читаются от имени первого
+виртуального пользователя). Счетчики - одного процесса:
+для точных цифр запускайте сервер с одним воркером. Лимиты частоты
+запросов отдают 429 - для проверки пропускной способности базы
+отключите их: RATE_LIMIT_ENABLED=0.
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = 'loadtest-password'
+
+# Сценарии: веса действий и пауза между действиями пользователя (секунды)
+SCENARIOS = {
+    'board_team': {
+        'weights': {'poll_unread': 40, 'open_board': 25, 'drag_card': 15, 'comment': 10, 'toggle_item': 10},
+        'think_time': (0.2, 1.0),
+    },
+    'drag_heavy': {
+        'weights': {'poll_unread': 20, 'open_board': 10, 'drag_card': 50, 'comment': 5, 'toggle_item': 15},
+        'think_time': (0.05, 0.3),
+    },
+    'readers': {
+        'weights': {'poll_unread': 60, 'open_board': 38, 'drag_card': 1, 'comment': 1},
+        'think_time': (0.1, 0.5),
+    },
+}
+
+
+class Recorder:
+    """Время ответа и статусы по видам запросов (потокобезопасно)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def add(self, name, status, seconds):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not 200 <= status < 400:
+                self.errors[name][status] += 1
+
+
+class Client:
+    """HTTP-клиент одного пользователя со своими cookie"""
+
+    def __init__(self, base_url, recorder=None, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, method, path, body=None, name=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method)
+        request.add_header('Accept', 'application/json')
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        except (urllib.error.URLError, OSError):
+            status, raw = 0, b''
+        if self.recorder is not None and name:
+            self.recorder.add(name, status, time.perf_counter() - started)
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = None
+        return status, payload
+
+
+def _check(status, payload, what):
+    if not 200 <= status < 300:
+        raise RuntimeError(f'{what} failed: HTTP {status} {payload}')
+    return payload
+
+
+class VirtualUser:
+    def __init__(self, index, username, client, rng):
+        self.index = index
+        self.username = username
+        self.client = client
+        self.rng = rng
+        self.project = None     # {'board_id', 'lists', 'cards', 'items', 'usernames'}
+
+    # Действия сценария
+    def poll_unread(self):
+        self.client.request('GET', '/api/notifications/unread-count', name='GET unread-count')
+
+    def open_board(self):
+        self.client.request('GET', f"/api/boards/{self.project['board_id']}", name='GET board')
+
+    def drag_card(self):
+        card_id = self.rng.choice(self.project['cards'])
+        list_id = self.rng.choice(self.project['lists'])
+        self.client.request('PUT', f'/api/cards/{card_id}', {
+            'list_id': list_id, 'position': self.rng.randint(0, 20)
+        }, name='PUT card (drag)')
+
+    def comment(self):
+        card_id = self.rng.choice(self.project['cards'])
+        mentioned = self.rng.choice(self.project['usernames'])
+        self.client.request('POST', f'/api/cards/{card_id}/comments', {
+            'text': f'@{mentioned} load test comment {self.rng.randint(0, 10 ** 6)}'
+        }, name='POST comment')
+
+    def toggle_item(self):
+        if not self.project['items']:
+            return
+        item_id = self.rng.choice(self.project['items'])
+        self.client.request('PUT', f'/api/checklists/items/{item_id}', {
+            'completed': self.rng.random() < 0.5
+        }, name='PUT checklist item')
+
+
+def _register(base_url, username):
+    client = Client(base_url)
+    _check(*client.request('POST', '/api/register', {
+        'username': username, 'email': f'{username}@loadtest.local', 'password': PASSWORD
+    }), f'register {username}')
+    return client
+
+
+def setup(args):
+    """Пользователи, проекты с карточками и чеклистами, членство в проектах"""
+    setup_rng = random.Random(args.seed)
+    usernames = [f'{args.run_tag}_u{index}' for index in range(args.users)]
+    print(f"👥 Registering {args.users} users...")
+    with ThreadPoolExecutor(max_workers=min(8, args.users)) as pool:
+        clients = list(pool.map(lambda name: _register(args.base_url, name), usernames))
+
+    users = []
+    for index, (username, client) in enumerate(zip(usernames, clients)):
+        users.append(VirtualUser(index, username, client, random.Random(args.seed * 1000003 + index)))
+
+    groups = [users[start:start + args.users_per_project] for start in range(0, len(users), args.users_per_project)]
+    for number, members in enumerate(groups):
+        owner = members[0]
+        project = _check(*owner.client.request('POST', '/api/projects', {
+            'name': f'{args.run_tag} project {number}', 'template': 'kanban'
+        }), 'create project')
+        board = project['boards'][0]
+        lists = [board_list['id'] for board_list in board['lists']]
+
+        cards, items = [], []
+        for card_number in range(args.cards):
+            card = _check(*owner.client.request('POST', f'/api/lists/{setup_rng.choice(lists)}/cards', {
+                'title': f'Card {card_number}', 'description': 'load test'
+            }), 'create card')
+            cards.append(card['id'])
+            if card_number % 2 == 0:
+                checklist = _check(*owner.client.request('POST', f"/api/cards/{card['id']}/checklists", {
+                    'title': 'Steps'
+                }), 'create checklist')
+                for step in range(3):
+                    item = _check(*owner.client.request('POST', f"/api/checklists/{checklist['id']}/items", {
+                        'text': f'Step {step}'
+                    }), 'create checklist item')
+                    items.append(item['id'])
+
+        for member in members[1:]:
+            invitation = _check(*owner.client.request('POST', f"/api/projects/{project['id']}/invitations", {
+                'role': 'member'
+            }), 'create invitation')
+            token = invitation['invite_url'].rsplit('/', 1)[1]
+            _check(*member.client.request('POST', f'/api/invitations/{token}/accept'), 'accept invitation')
+
+        shared = {
+            'board_id': board['id'], 'lists': lists, 'cards': cards, 'items': items,
+            'usernames': [member.username for member in members]
+        }
+        for member in members:
+            member.project = shared
+    print(f"📋 Prepared {len(groups)} projects with {args.cards} cards each")
+    return users
+
+
+def run_user(user, scenario, deadline, iterations):
+    actions = list(scenario['weights'])
+    weights = [scenario['weights'][action] for action in actions]
+    low, high = scenario['think_time']
+    done = 0
+    while (iterations is None or done < iterations) and (deadline is None or time.monotonic() < deadline):
+        getattr(user, user.rng.choices(actions, weights)[0])()
+        done += 1
+        time.sleep(user.rng.uniform(low, high))
+
+
+def _percentile(values, percent):
+    """Перцентиль по ближайшему рангу (values отсортированы)"""
+    if not values:
+        return None
+    rank = max(1, math.ceil(percent / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def _db_metrics(client):
+    """Счетчики сервера; /api/metrics требует входа, поэтому - клиентом виртуального пользователя"""
+    status, payload = client.request('GET', '/api/metrics')
+    return _check(status, payload, 'Reading /api/metrics')
+
+
+def _db_delta(before, after):
+    counters = {
+        name: value - before['counters'].get(name, 0)
+        for name, value in after['counters'].items() if name.startswith('db.')
+    }
+    timings = {}
+    for name, stats in after['timings'].items():
+        if not name.startswith('db.'):
+            continue
+        previous = before['timings'].get(name, {'count': 0, 'sum': 0.0})
+        count = stats['count'] - previous['count']
+        total = stats['sum'] - previous['sum']
+        timings[name] = {
+            'count': count,
+            'total_ms': round(total * 1000, 1),
+            'avg_ms': round(total / count * 1000, 2) if count else 0.0,
+            'max_ms': round(stats['max'] * 1000, 1),   # максимум за все время процесса
+        }
+    return {'counters': counters, 'timings': timings}
+
+
+def build_report(recorder, elapsed, db):
+    endpoints = {}
+    total = errors = 0
+    for name in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[name])
+        failed = sum(recorder.errors[name].values())
+        total += len(values)
+        errors += failed
+        endpoints[name] = {
+            'requests': len(values),
+            'rps': round(len(values) / elapsed, 2),
+            **{f'p{p}_ms': round(_percentile(values, p) * 1000, 1) for p in (50, 95, 99)},
+            'error_rate': round(failed / len(values), 4),
+            'errors': {str(status): count for status, count in sorted(recorder.errors[name].items())},
+        }
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'endpoints': endpoints,
+        'db': db,
+    }
+
+
+def print_report(report):
+    print(f"\n⏱️  {report['requests']} requests in {report['elapsed_seconds']}s: "
+          f"{report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}")
+    print(f"{'endpoint':<22}{'req':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>9}  statuses")
+    for name, stats in report['endpoints'].items():
+        statuses = ', '.join(f'{status}: {count}' for status, count in stats['errors'].items())
+        print(f"{name:<22}{stats['requests']:>7}{stats['rps']:>9}{stats['p50_ms']:>9}{stats['p95_ms']:>9}"
+              f"{stats['p99_ms']:>9}{stats['error_rate']:>9.2%}  {statuses}")
+    print("\n🔒 Database locks (server process):")
+    for name, value in sorted(report['db']['counters'].items()):
+        print(f"  {name}: {value}")
+    for name, stats in sorted(report['db']['timings'].items()):
+        print(f"  {name}: {stats['count']} waits, avg {stats['avg_ms']} ms, total {stats['total_ms']} ms")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Load test for concurrent board users')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='board_team')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--users-per-project', type=int, default=5)
+    parser.add_argument('--cards', type=int, default=30, help='cards per project')
+    parser.add_argument('--iterations', type=int, help='actions per user (comparable runs)')
+    parser.add_argument('--duration', type=float, help='seconds to run (default 30 without --iterations)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--run-tag', default=None, help='username prefix (default: lt<timestamp>)')
+    parser.add_argument('--json', dest='json_path', help='write the report to this file')
+    args = parser.parse_args(argv)
+    if args.iterations is None and args.duration is None:
+        args.duration = 30.0
+    args.run_tag = args.run_tag or f'lt{int(time.time())}'
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scenario = SCENARIOS[args.scenario]
+    recorder = Recorder()
+    users = setup(args)
+    # Подготовка не попадает в отчет
+    for user in users:
+        user.client.recorder = recorder
+
+    # Без name запросы метрик не попадают в отчет
+    metrics_client = users[0].client
+    before = _db_metrics(metrics_client)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    print(f"🚀 Running scenario '{args.scenario}' with {len(users)} users (seed {args.seed})")
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=run_user, args=(user, scenario, deadline, args.iterations), daemon=True)
+        for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    report = build_report(recorder, elapsed, _db_delta(before, _db_metrics(metrics_client)))
+    report.update({'scenario': args.scenario, 'users': args.users, 'seed': args.seed})
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"💾 Report saved to {args.json_path}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Индекс участников проекта для автодополнения @упоминаний.
+
+Для каждого проекта хранится отсортированный массив ключей (username и
+часть email до @ в нижнем регистре); поиск по префиксу - bisect, нечеткий
+поиск - по подпоследовательности символов. Индекс строится лениво
+небольшим пулом потоков (MENTION_INDEX_BUILD_WORKERS, в очереди - не больше
+MENTION_INDEX_MAX_PENDING проектов) при первом запросе; пока он не готов,
+маршрут использует запрос к базе. Индекс проекта сбрасывается после
+коммита, изменившего участников проекта или пользователей, в этом
+процессе; изменения через другие воркеры он увидит по истечении
+MENTION_INDEX_TTL_SECONDS.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event
+
+import metrics
+
+
+class ProjectUserIndex:
+    def __init__(self, users):
+        # users: список user.to_dict() участников проекта
+        self.users = {user['id']: user for user in users}
+        keys = []
+        for user in users:
+            keys.append((user['username'].lower(), user['id']))
+            local_part = user['email'].split('@', 1)[0].lower()
+            if local_part != user['username'].lower():
+                keys.append((local_part, user['id']))
+        keys.sort()
+        self.keys = [key for key, _ in keys]
+        self.user_ids = [user_id for _, user_id in keys]
+        self.by_username = sorted(users, key=lambda user: user['username'].lower())
+
+    def search(self, query, limit=10):
+        query = query.lower()
+        if not query:
+            return self.by_username[:limit]
+
+        found = OrderedDict()
+        position = bisect_left(self.keys, query)
+        while position < len(self.keys) and self.keys[position].startswith(query) and len(found) < limit:
+            found.setdefault(self.user_ids[position], self.users[self.user_ids[position]])
+            position += 1
+
+        if len(found) < limit:
+            for user in self._fuzzy(query):
+                if len(found) >= limit:
+                    break
+                found.setdefault(user['id'], user)
+        return list(found.values())
+
+    def _fuzzy(self, query):
+        """Пользователи, в имени которых символы запроса идут по порядку (меньше разрывов - выше)"""
+        scored = []
+        for user in self.by_username:
+            name = user['username'].lower()
+            position = -1
+            gaps = 0
+            for char in query:
+                found = name.find(char, position + 1)
+                if found < 0:
+                    break
+                gaps += found - position - 1
+                position = found
+            else:
+                scored.append((gaps, name, user))
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [user for _, _, user in scored]
+
+
+class MentionIndex:
+    def __init__(self, app, loader, max_projects, ttl, build_workers, max_pending):
+        self.app = app
+        self.loader = loader
+        self.max_projects = max_projects
+        self.ttl = ttl
+        self.build_workers = build_workers
+        self.max_pending = max_pending
+        self.indexes = OrderedDict()
+        self.building = set()
+        self.generation = 0
+        self.lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _submit(self, project_id):
+        # Потоки не переживают fork: пул создается в процессе, который строит индексы
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.build_workers, thread_name_prefix='mention-index')
+            self._executor_pid = os.getpid()
+        self._executor.submit(self._build, project_id, self.generation)
+
+    def get(self, project_id):
+        """Готовый индекс проекта или None (тогда построение запускается в фоне)"""
+        with self.lock:
+            entry = self.indexes.get(project_id)
+            if entry is not None:
+                expires_at, index = entry
+                if expires_at > time.monotonic():
+                    self.indexes.move_to_end(project_id)
+                    metrics.incr('mention_index.hits')
+                    return index
+                # Участников могли изменить через другой воркер - перестраиваем
+                del self.indexes[project_id]
+                metrics.incr('mention_index.expired')
+            metrics.incr('mention_index.cold')
+            if project_id not in self.building:
+                if len(self.building) >= self.max_pending:
+                    metrics.incr('mention_index.build_skipped')
+                    return None
+                self.building.add(project_id)
+                self._submit(project_id)
+        return None
+
+    def _build(self, project_id, generation):
+        try:
+            with self.app.app_context():
+                index = ProjectUserIndex(self.loader(project_id))
+            with self.lock:
+                # Если за время построения индекс сбросили, результат уже устарел
+                if generation == self.generation:
+                    self.indexes[project_id] = (time.monotonic() + self.ttl, index)
+                    while len(self.indexes) > self.max_projects:
+                        self.indexes.popitem(last=False)
+        except Exception as e:
+            print(f"❌ Error building mention index for project {project_id}: {e}")
+        finally:
+            with self.lock:
+                self.building.discard(project_id)
+
+    def invalidate(self, project_id=None):
+        with self.lock:
+            self.generation += 1
+            if project_id is None:
+                self.indexes.clear()
+            else:
+                self.indexes.pop(project_id, None)
+
+
+def init_mention_index(app, db, member_model, user_model, loader):
+    """loader(project_id) -> список user.to_dict() участников, которых можно упомянуть"""
+    config = app.config
+    index = MentionIndex(
+        app, loader, config['MENTION_INDEX_MAX_PROJECTS'], config['MENTION_INDEX_TTL_SECONDS'],
+        config['MENTION_INDEX_BUILD_WORKERS'], config['MENTION_INDEX_MAX_PENDING']
+    )
+    app.extensions['mention_index'] = index
+
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'after_flush')
+    def collect_membership_changes(session, flush_context):
+        changes = session.info.setdefault('mention_index_changes', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, member_model):
+                changes.add(obj.project_id)
+            elif isinstance(obj, user_model) and obj not in session.new:
+                changes.add(None)
+
+    @event.listens_for(session_class, 'after_commit')
+    def invalidate_mention_index(session):
+        changes = session.info.pop('mention_index_changes', set())
+        if None in changes:
+            index.invalidate()
+        else:
+            for project_id in changes:
+                index.invalidate(project_id)
+
+    @event.listens_for(session_class, 'after_rollback')
+    def forget_membership_changes(session):
+        session.info.pop('mention_index_changes', None)
+
+    return index
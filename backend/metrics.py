@@ -0,0 +1,31 @@
+"""Счетчики и простые гистограммы процесса (для /api/metrics)."""
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = {}
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, value):
+    """Учесть значение (например, время ожидания в секундах)"""
+    with _lock:
+        stats = _timings.get(name)
+        if stats is None:
+            stats = _timings[name] = {'count': 0, 'sum': 0.0, 'max': 0.0}
+        stats['count'] += 1
+        stats['sum'] += value
+        stats['max'] = max(stats['max'], value)
+
+
+def snapshot():
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'timings': {name: dict(stats) for name, stats in _timings.items()}
+        }
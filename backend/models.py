@@ -1,10 +1,30 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import declared_attr
+from hashing import hash_password, verify_password, needs_rehash
 from datetime import datetime
 import enum
+from routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Таблицы данных проекта: AUTOINCREMENT нужен, чтобы каждый шард выдавал id
+# из своего диапазона (см. sharding.py)
+SHARDED_TABLE_ARGS = {'sqlite_autoincrement': True}
+
+# Мягкое удаление: строки с deleted_at скрываются из всех ORM-запросов
+# (см. softdelete.py) и физически удаляются фоновой очисткой
+class SoftDeleteMixin:
+    deleted_at = db.Column(db.DateTime, nullable=True, index=True)
+
+# Оптимистическая блокировка: UPDATE ... WHERE version = <прочитанная версия>,
+# при несовпадении SQLAlchemy бросает StaleDataError (см. concurrency.py)
+class VersionedMixin:
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    @declared_attr
+    def __mapper_args__(cls):
+        return {'version_id_col': cls.version}
 
 class UserRole(enum.Enum):
     ADMIN = "admin"
@@ -18,12 +38,26 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     avatar_url = db.Column(db.String(200))
+    # Версия токенов: refresh-токены с другой версией отозваны (смена пароля, кража)
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
+        # Новый пароль отзывает все выданные refresh-токены
+        self.revoke_tokens()
+    
+    def rehash_password(self, password):
+        """Пересчитать хеш того же пароля с текущими параметрами (токены остаются)"""
+        self.password_hash = hash_password(password)
+    
+    def revoke_tokens(self):
+        self.token_version = (self.token_version or 0) + 1
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        return needs_rehash(self.password_hash)
     
     def to_dict(self):
         return {
@@ -33,6 +67,17 @@ class User(UserMixin, db.Model):
             'avatar_url': self.avatar_url,
             'created_at': self.created_at.isoformat()
         }
+    
+    def to_compact_dict(self):
+        return {
+            'id': self.id,
+            'username': self.username,
+            'avatar_url': self.avatar_url
+        }
+
+# Поиск пользователей по префиксу без учета регистра идет по этим индексам
+db.Index('ix_user_username_lower', db.func.lower(User.username))
+db.Index('ix_user_email_lower', db.func.lower(User.email))
 
 # Модель проекта
 class Project(db.Model):
@@ -114,6 +159,8 @@ class Invitation(db.Model):
 
 # Модель доски
 class Board(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -136,7 +183,9 @@ class Board(db.Model):
         }
 
 # Модель списка на доске
-class BoardList(db.Model):
+class BoardList(SoftDeleteMixin, VersionedMixin, db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     position = db.Column(db.Integer, default=0)
@@ -151,13 +200,21 @@ class BoardList(db.Model):
             'id': self.id,
             'name': self.name,
             'position': self.position,
+            'version': self.version,
             'board_id': self.board_id,
             'created_at': self.created_at.isoformat(),
             'cards': [card.to_dict() for card in self.cards] if self.cards else []
         }
 
 # Модель карточки (задачи)
-class Card(db.Model):
+class Card(SoftDeleteMixin, VersionedMixin, db.Model):
+    __table_args__ = (
+        # Выборки "мои задачи" по сроку (просрочено, срок в ближайшие N дней)
+        db.Index('ix_card_due_date', 'due_date', 'id'),
+        db.Index('ix_card_list', 'list_id', 'position'),
+        SHARDED_TABLE_ARGS,
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
@@ -183,6 +240,7 @@ class Card(db.Model):
             'position': self.position,
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'list_id': self.list_id,
+            'version': self.version,
             'created_by': self.created_by.to_dict() if self.created_by else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
@@ -194,6 +252,12 @@ class Card(db.Model):
 
 # Модель назначенных пользователей на карточку
 class CardAssignee(db.Model):
+    __table_args__ = (
+        # Карточки, назначенные пользователю
+        db.Index('ix_card_assignee_user', 'user_id', 'card_id'),
+        SHARDED_TABLE_ARGS,
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -203,6 +267,8 @@ class CardAssignee(db.Model):
 
 # Модель меток
 class Label(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False)
     color = db.Column(db.String(7), nullable=False)  # HEX color
@@ -224,12 +290,16 @@ class Label(db.Model):
 
 # Связующая таблица карточка-метка
 class CardLabel(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
     label_id = db.Column(db.Integer, db.ForeignKey('label.id'), nullable=False)
 
 # Модель чеклиста
-class Checklist(db.Model):
+class Checklist(VersionedMixin, db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
@@ -245,6 +315,7 @@ class Checklist(db.Model):
             'title': self.title,
             'card_id': self.card_id,
             'position': self.position,
+            'version': self.version,
             'created_at': self.created_at.isoformat(),
             'items': [item.to_dict() for item in self.items],
             'completed_count': len([item for item in self.items if item.completed]),
@@ -253,6 +324,8 @@ class Checklist(db.Model):
 
 # Модель элемента чеклиста
 class ChecklistItem(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.String(200), nullable=False)
     completed = db.Column(db.Boolean, default=False)
@@ -271,6 +344,8 @@ class ChecklistItem(db.Model):
         }
 
 class Mention(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('comment.id'), nullable=False)
     mentioned_user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -282,6 +357,8 @@ class Mention(db.Model):
     
 # Модель комментария
 class Comment(db.Model):
+    __table_args__ = SHARDED_TABLE_ARGS
+    
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
@@ -305,6 +382,11 @@ class Comment(db.Model):
         }
         
 class Notification(db.Model):
+    __table_args__ = (
+        # Счетчик непрочитанных и "прочитать все" фильтруют по (user_id, read_at)
+        db.Index('ix_notification_user_read', 'user_id', 'read_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # card_assignment, deadline, etc.
@@ -329,3 +411,97 @@ class Notification(db.Model):
             'is_read': self.read_at is not None
         }
         
+
+# Журнал действий в проекте (только добавление, см. activity.py)
+class Activity(db.Model):
+    __table_args__ = (
+        # Лента проекта: keyset-пагинация по (project_id, id)
+        db.Index('ix_activity_project', 'project_id', 'id'),
+        SHARDED_TABLE_ARGS,
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, nullable=False)
+    actor_id = db.Column(db.Integer, nullable=True)
+    type = db.Column(db.String(50), nullable=False)  # card.created, card.moved, comment.added, ...
+    entity_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'actor_id': self.actor_id,
+            'type': self.type,
+            'entity_id': self.entity_id,
+            'payload': self.payload or {},
+            'created_at': self.created_at.isoformat()
+        }
+
+# Выданные refresh-токены: каждый обменивается на новую пару только один раз
+class RefreshToken(db.Model):
+    jti = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    issued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    used_at = db.Column(db.DateTime, nullable=True)
+
+# Архив карточек (холодное хранилище)
+class ArchivedCard(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    # id исходной карточки: восстановление возвращает карточку под ним же.
+    # Без AUTOINCREMENT (старые базы) SQLite может выдать этот id новой
+    # карточке, поэтому архивных строк с одним original_card_id может быть несколько
+    original_card_id = db.Column(db.Integer, nullable=True, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    list_id = db.Column(db.Integer, nullable=False)
+    board_id = db.Column(db.Integer, nullable=False)
+    project_id = db.Column(db.Integer, nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Снимок строки карточки и всех зависимых строк (комментарии, чеклисты и т.д.)
+    payload = db.Column(db.JSON, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'id': self.original_card_id,
+            'archive_id': self.id,
+            'title': self.title,
+            'list_id': self.list_id,
+            'board_id': self.board_id,
+            'project_id': self.project_id,
+            'archived_at': self.archived_at.isoformat()
+        }
+
+# Архив уведомлений
+class ArchivedNotification(db.Model):
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text)
+    data = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime)
+    read_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Аренда лидерства фоновых задач: задачу выполняет процесс, держащий строку
+class SchedulerLease(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+# Отправленные напоминания о сроке (защита от повторной отправки)
+class DeadlineReminder(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('card_id', 'user_id', 'offset_minutes', 'due_date', name='uq_deadline_reminder'),
+        # Очистка записей о прошедших сроках
+        db.Index('ix_deadline_reminder_due_date', 'due_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    card_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    offset_minutes = db.Column(db.Integer, nullable=False)
+    due_date = db.Column(db.DateTime, nullable=False)
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
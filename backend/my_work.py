@@ -0,0 +1,109 @@
+"""Карточки, назначенные пользователю, по всем его проектам ("мои задачи").
+
+Порядок - по сроку (due_date, id), карточки без срока идут в конце
+(по id). Курсор хранит (due_date, id) последней карточки страницы;
+due_date = None означает, что выдача уже дошла до карточек без срока.
+Каждый шард отдает не больше limit + 1 кандидатов, результаты сливаются:
+id карточек в шардах не пересекаются, поэтому порядок общий.
+"""
+from datetime import datetime, timedelta
+
+from models import db, Project, ProjectMember, Board, BoardList, Card, CardAssignee
+from pagination import InvalidCursor, decode_cursor, encode_cursor
+from sharding import shard_for_project, use_shard
+
+
+def _user_projects(user_id, project_id=None):
+    query = db.session.query(Project.id, Project.name).join(
+        ProjectMember, ProjectMember.project_id == Project.id
+    ).filter(ProjectMember.user_id == user_id)
+    if project_id is not None:
+        query = query.filter(Project.id == project_id)
+    return dict(query.all())
+
+
+def _candidates(user_id, project_ids, filters, after, limit):
+    """До limit + 1 карточек текущего шарда после курсора after"""
+    query = db.session.query(
+        Card.id, Card.title, Card.due_date, Card.updated_at, Card.list_id,
+        BoardList.name.label('list_name'), Board.id.label('board_id'), Board.project_id
+    ).join(CardAssignee, CardAssignee.card_id == Card.id).join(
+        BoardList, BoardList.id == Card.list_id
+    ).join(Board, Board.id == BoardList.board_id).filter(
+        CardAssignee.user_id == user_id,
+        Board.project_id.in_(project_ids)
+    )
+
+    now = datetime.utcnow()
+    if filters.get('list_id') is not None:
+        query = query.filter(Card.list_id == filters['list_id'])
+    if filters.get('overdue'):
+        query = query.filter(Card.due_date < now)
+    if filters.get('due_within') is not None:
+        query = query.filter(Card.due_date < now + timedelta(days=filters['due_within']))
+
+    after_due, after_id = after if after is not None else (None, None)
+    rows = []
+    if after is None or after_due is not None:
+        dated = query.filter(Card.due_date.isnot(None))
+        if after_due is not None:
+            dated = dated.filter(db.or_(
+                Card.due_date > after_due,
+                db.and_(Card.due_date == after_due, Card.id > after_id)
+            ))
+        rows = dated.order_by(Card.due_date, Card.id).limit(limit + 1).all()
+
+    if len(rows) <= limit and not filters.get('overdue') and filters.get('due_within') is None:
+        undated = query.filter(Card.due_date.is_(None))
+        if after is not None and after_due is None:
+            undated = undated.filter(Card.id > after_id)
+        rows += undated.order_by(Card.id).limit(limit + 1 - len(rows)).all()
+    return rows
+
+
+def _sort_key(row):
+    # Сначала карточки со сроком, затем без срока
+    return (row.due_date is None, row.due_date or datetime.min, row.id)
+
+
+def assigned_cards(user_id, filters, limit, cursor=None):
+    """Страница карточек пользователя: (список сводок, курсор следующей страницы)"""
+    after = None
+    if cursor:
+        after_due, after_id = decode_cursor(cursor, 2)
+        try:
+            after = (datetime.fromisoformat(after_due) if after_due is not None else None, int(after_id))
+        except (TypeError, ValueError) as e:
+            raise InvalidCursor('Invalid cursor') from e
+
+    projects = _user_projects(user_id, filters.get('project_id'))
+    if not projects:
+        return [], None
+
+    by_shard = {}
+    for project_id in projects:
+        by_shard.setdefault(shard_for_project(project_id), []).append(project_id)
+
+    rows = []
+    for shard, project_ids in by_shard.items():
+        with use_shard(shard):
+            rows.extend(_candidates(user_id, project_ids, filters, after, limit))
+    rows.sort(key=_sort_key)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([last.due_date.isoformat() if last.due_date else None, last.id])
+
+    return [{
+        'id': row.id,
+        'title': row.title,
+        'due_date': row.due_date.isoformat() if row.due_date else None,
+        'updated_at': row.updated_at.isoformat(),
+        'list_id': row.list_id,
+        'list_name': row.list_name,
+        'board_id': row.board_id,
+        'project_id': row.project_id,
+        'project_name': projects[row.project_id]
+    } for row in rows], next_cursor
@@ -0,0 +1,66 @@
+"""Массовые операции над уведомлениями."""
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, delete
+
+from models import db, Notification
+
+
+def mark_all_read(user_id, project_id=None, notification_type=None, before=None):
+    """Отметить уведомления пользователя прочитанными одним UPDATE. Возвращает число строк."""
+    query = Notification.query.filter(
+        Notification.user_id == user_id,
+        Notification.read_at.is_(None)
+    )
+    if project_id is not None:
+        query = query.filter(Notification.data['project_id'].as_integer() == project_id)
+    if notification_type:
+        query = query.filter(Notification.type == notification_type)
+    if before is not None:
+        query = query.filter(Notification.created_at <= before)
+
+    updated = query.update({Notification.read_at: datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return updated
+
+
+def prune_read_notifications(retention_days, batch_size=None, max_batches=None, pause=0.05):
+    """Удалить прочитанные уведомления старше retention_days пачками.
+
+    Каждая пачка - отдельная короткая транзакция, между пачками делается
+    пауза, чтобы запросы пользователей успевали взять блокировку записи.
+    """
+    batch_size = batch_size or current_app.config['NOTIFICATION_PRUNE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.session.execute(
+            select(Notification.id)
+            .where(Notification.read_at.isnot(None), Notification.read_at < cutoff)
+            .order_by(Notification.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(Notification.__table__).where(Notification.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def run_prune_job():
+    """Периодическая задача: удаление старых прочитанных уведомлений"""
+    config = current_app.config
+    deleted = prune_read_notifications(
+        config['NOTIFICATION_PRUNE_DAYS'],
+        max_batches=config['NOTIFICATION_PRUNE_MAX_BATCHES']
+    )
+    if deleted:
+        print(f"🧹 Pruned {deleted} read notifications")
@@ -0,0 +1,46 @@
+"""Keyset-пагинация.
+
+Курсор - непрозрачная строка с ключом сортировки последней записи
+страницы; следующая страница выбирается условием (ключ) > (курсор) по
+индексу, без OFFSET.
+"""
+import base64
+import json
+
+from flask import request
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor, size):
+    """Список значений ключа из курсора (InvalidCursor при неверном формате)"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, UnicodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor('Invalid cursor')
+    return values
+
+
+def page_limit(default=20, maximum=100):
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def page(items, limit, key):
+    """Обрезать выборку из limit + 1 записей и вычислить курсор следующей страницы"""
+    has_more = len(items) > limit
+    items = items[:limit]
+    next_cursor = encode_cursor(key(items[-1])) if has_more else None
+    return items, next_cursor
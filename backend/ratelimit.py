@@ -0,0 +1,176 @@
+"""Ограничение частоты запросов и сброс нагрузки.
+
+- token bucket на пару (пользователь, класс маршрута) -> 429 + Retry-After;
+- общий лимит одновременных запросов: низкоприоритетные чтения (опрос
+  счетчиков, доска) отбрасываются с 503 раньше, чем начнут ждать записи.
+  Лимиты действуют в пределах процесса (воркера gunicorn), поэтому по
+  умолчанию выводятся из числа его потоков (GUNICORN_THREADS).
+
+Класс маршрута задается по имени endpoint в RATE_LIMIT_ROUTE_CLASSES,
+параметры классов - в RATE_LIMITS.
+"""
+import math
+import threading
+import time
+
+from flask import request, jsonify, g
+from flask_login import current_user
+
+import metrics
+
+WRITE_METHODS = {'POST', 'PUT', 'DELETE', 'PATCH'}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Взять токен. Возвращает 0 при успехе или сколько секунд ждать."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    def __init__(self, limits, max_buckets=100000):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def check(self, key, route_class):
+        limit = self.limits.get(route_class)
+        if not limit:
+            return 0
+        with self.lock:
+            bucket = self.buckets.get((key, route_class))
+            if bucket is None:
+                if len(self.buckets) >= self.max_buckets:
+                    self._evict_idle()
+                bucket = self.buckets[(key, route_class)] = TokenBucket(limit['rate'], limit['burst'])
+            return bucket.take()
+
+    def _evict_idle(self):
+        # Полные бакеты ничем не отличаются от новых - их можно выбросить
+        now = time.monotonic()
+        for bucket_key, bucket in list(self.buckets.items()):
+            if bucket.tokens + (now - bucket.updated) * bucket.rate >= bucket.burst:
+                del self.buckets[bucket_key]
+        if len(self.buckets) < self.max_buckets:
+            return
+        # Все бакеты заняты активными клиентами: выбрасываем давно не обновлявшиеся,
+        # с запасом в 10%, чтобы не сортировать словарь на каждом новом ключе
+        keep = int(self.max_buckets * 0.9)
+        oldest = sorted(self.buckets, key=lambda bucket_key: self.buckets[bucket_key].updated)
+        for bucket_key in oldest[:len(oldest) - keep]:
+            del self.buckets[bucket_key]
+
+
+class ConcurrencyLimiter:
+    """Общий лимит одновременных запросов с резервом мест для записи"""
+
+    def __init__(self, max_concurrent, write_reserved, write_wait):
+        self.max_concurrent = max_concurrent
+        # Хотя бы один слот остается чтению
+        self.write_reserved = min(write_reserved, max_concurrent - 1)
+        self.write_wait = write_wait
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, priority):
+        with self.condition:
+            if priority == 'write':
+                # Запись ждет освобождения слота, но не дольше write_wait
+                deadline = time.monotonic() + self.write_wait
+                while self.in_flight >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+            else:
+                limit = self.max_concurrent - self.write_reserved
+                if priority == 'low':
+                    # Фоновые опросы отбрасываются первыми - уже на половине лимита чтения
+                    limit = max(1, (limit + 1) // 2)
+                if self.in_flight >= limit:
+                    return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+
+def _route_class(app):
+    return app.config['RATE_LIMIT_ROUTE_CLASSES'].get(request.endpoint)
+
+
+def _priority(route_class):
+    if request.method in WRITE_METHODS:
+        return 'write'
+    if route_class in ('poll', 'board'):
+        return 'low'
+    return 'normal'
+
+
+def _client_key():
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return f'ip:{request.remote_addr}'
+
+
+def init_rate_limiting(app):
+    if not app.config['RATE_LIMIT_ENABLED']:
+        return
+
+    limiter = RateLimiter(app.config['RATE_LIMITS'], app.config['RATE_LIMIT_MAX_BUCKETS'])
+    concurrency = ConcurrencyLimiter(
+        app.config['MAX_CONCURRENT_REQUESTS'],
+        app.config['WRITE_RESERVED_SLOTS'],
+        app.config['WRITE_SLOT_WAIT_SECONDS']
+    )
+
+    @app.before_request
+    def apply_rate_limits():
+        if request.method == 'OPTIONS' or request.endpoint is None:
+            return None
+
+        route_class = _route_class(app)
+        if route_class:
+            retry_after = limiter.check(_client_key(), route_class)
+            if retry_after:
+                metrics.incr(f'ratelimit.throttled.{route_class}')
+                response = jsonify({'error': 'Too many requests'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response
+
+        priority = _priority(route_class)
+        if not concurrency.acquire(priority):
+            metrics.incr(f'ratelimit.shed.{priority}')
+            response = jsonify({'error': 'Server is busy, try again later'})
+            response.status_code = 503
+            response.headers['Retry-After'] = '1'
+            return response
+
+        g.concurrency_slot = True
+        metrics.incr(f'ratelimit.admitted.{priority}')
+        return None
+
+    @app.teardown_request
+    def release_concurrency_slot(exc):
+        if g.pop('concurrency_slot', False):
+            concurrency.release()
+
+    app.extensions['rate_limiter'] = limiter
+    app.extensions['concurrency_limiter'] = concurrency
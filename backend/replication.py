@@ -0,0 +1,35 @@
+"""Локальная замена репликации: копирует основной SQLite-файл в файл реплики.
+
+Используется для разработки и тестов маршрутизации чтения: в production
+реплику поддерживает внешний механизм. Копирование идет через
+sqlite3 backup API, поэтому согласовано даже при идущих записях.
+"""
+import sqlite3
+
+from flask import current_app
+from sqlalchemy.engine import make_url
+
+from models import db
+from routing import REPLICA_BIND
+
+
+def _sqlite_path(engine):
+    url = make_url(str(engine.url))
+    if url.get_backend_name() != 'sqlite' or not url.database:
+        raise ValueError(f'Replication stand-in supports only file SQLite databases, got {url}')
+    return url.database
+
+
+def sync_replica():
+    """Скопировать основную базу в реплику"""
+    replica_engine = db.engines.get(REPLICA_BIND)
+    if replica_engine is None:
+        return
+
+    source = sqlite3.connect(_sqlite_path(db.engine))
+    target = sqlite3.connect(_sqlite_path(replica_engine), timeout=current_app.config['SQLITE_PRAGMAS']['busy_timeout'] / 1000)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
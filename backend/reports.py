@@ -0,0 +1,305 @@
+"""Отчеты о потоке задач проекта: накопительная диаграмма (CFD), время
+в списках, cycle time / lead time и недельная пропускная способность.
+
+Источник - журнал действий (activity.py): создание, перемещение,
+удаление и восстановление карточек, архивирование и возврат из архива,
+удаление и восстановление списков (вместе с их карточками). События проекта читаются одним
+запросом по индексу (project_id, id) в массивы NumPy и копятся в кэше
+процесса; при следующем вызове дочитываются только события с id больше
+последнего прочитанного (журнал только пополняется). Вместе с массивами
+инкрементально обновляются дневные сводки: чистое изменение числа
+карточек и число поступлений по каждому списку за каждый день UTC.
+
+Восстановление (из корзины, из архива, вместе со списком) меняет только
+чистое изменение: это возврат карточки, а не новое поступление, поэтому
+оно не входит в пропускную способность и не сдвигает момент завершения
+для cycle time / lead time. В записях list.deleted / list.restored,
+сделанных до появления в них числа карточек, count нет - такие события
+считаются пустыми.
+
+Все расчеты векторные: CFD - накопленная сумма дневных сводок,
+привязанная к текущему числу карточек в списках (так карточки,
+созданные до появления журнала, не дают отрицательных значений);
+распределения времени - по отсортированному по (карточка, время)
+потоку событий, без циклов по карточкам.
+"""
+import threading
+from collections import OrderedDict
+from itertools import chain
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import Integer, case, cast, func, select
+
+from models import db, Activity, Board, BoardList, Card
+
+DAY = 86400
+
+# Коды событий потока: колонки массива событий - (время, карточка, код, откуда, куда, количество)
+CREATED, MOVED, DELETED, RESTORED, ARCHIVED = range(5)
+_KINDS = {
+    'card.created': CREATED,
+    'card.moved': MOVED,
+    'card.deleted': DELETED,
+    'card.restored': RESTORED,
+    'card.unarchived': RESTORED,
+    'list.cards_archived': ARCHIVED,
+    'list.deleted': DELETED,
+    'list.restored': RESTORED,
+}
+# События списка целиком: карточки не указаны, количество - в count
+_LIST_KINDS = ('list.cards_archived', 'list.deleted', 'list.restored')
+TS, CARD, KIND, SOURCE, TARGET, QTY = range(6)
+
+PERCENTILES = (50, 85, 95)
+# Границы корзин гистограммы времени, в днях
+HISTOGRAM_DAYS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+
+def _payload(key):
+    return func.json_extract(Activity.payload, f'$.{key}')
+
+
+def _event_query(project_id, after_id):
+    """События потока проекта после after_id: время, карточка, код, откуда, куда, количество"""
+    kind = case({name: code for name, code in _KINDS.items()}, value=Activity.type)
+    source = case(
+        (Activity.type == 'card.moved', _payload('from_list_id')),
+        (Activity.type == 'card.deleted', _payload('list_id')),
+        (Activity.type.in_(('list.cards_archived', 'list.deleted')), Activity.entity_id),
+    )
+    target = case(
+        (Activity.type == 'card.moved', _payload('to_list_id')),
+        (Activity.type.in_(('card.created', 'card.restored', 'card.unarchived')), _payload('list_id')),
+        (Activity.type == 'list.restored', Activity.entity_id),
+    )
+    quantity = case((Activity.type.in_(_LIST_KINDS), func.coalesce(_payload('count'), 0)), else_=1)
+    card = case((Activity.type.in_(_LIST_KINDS), -1), else_=Activity.entity_id)
+    return select(
+        Activity.id,
+        cast(func.strftime('%s', Activity.created_at), Integer),
+        card, kind,
+        func.coalesce(source, -1), func.coalesce(target, -1), quantity
+    ).where(
+        Activity.project_id == project_id,
+        Activity.id > after_id,
+        Activity.type.in_(list(_KINDS))
+    ).order_by(Activity.id)
+
+
+class FlowRollup:
+    """События потока одного проекта и дневные сводки по спискам"""
+
+    def __init__(self):
+        self.last_id = 0
+        self.events = np.empty((0, 6), dtype=np.int64)
+        self.day0 = None
+        self.list_ids = np.empty(0, dtype=np.int64)               # отсортированы
+        self.net = np.zeros((0, 0), dtype=np.int64)               # [список, день]: приход минус уход
+        self.arrivals = np.zeros((0, 0), dtype=np.int64)          # [список, день]: поступления (без восстановлений)
+        self.lock = threading.Lock()
+
+    def refresh(self, project_id):
+        result = db.session.execute(_event_query(project_id, self.last_id))
+        # fromiter по плоскому потоку значений - без промежуточного списка строк
+        data = np.fromiter(chain.from_iterable(result), dtype=np.int64).reshape(-1, 7)
+        if not len(data):
+            return
+        self.last_id = int(data[-1, 0])
+        self._apply(data[:, 1:])
+
+    def _grow(self, list_ids, first_day, last_day):
+        """Расширить сводки на новые списки и дни"""
+        lists = np.union1d(self.list_ids, list_ids)
+        old_day0 = first_day if self.day0 is None else self.day0
+        day0 = min(old_day0, first_day)
+        shift = old_day0 - day0
+        ndays = max(last_day - day0 + 1, shift + self.net.shape[1])
+        rows = np.searchsorted(lists, self.list_ids)
+        for name in ('net', 'arrivals'):
+            old = getattr(self, name)
+            grown = np.zeros((len(lists), ndays), dtype=np.int64)
+            grown[rows, shift:shift + old.shape[1]] = old
+            setattr(self, name, grown)
+        self.list_ids = lists
+        self.day0 = day0
+
+    def _apply(self, events):
+        day = events[:, TS] // DAY
+        source, target, quantity = events[:, SOURCE], events[:, TARGET], events[:, QTY]
+        leaving = source >= 0
+        entering = target >= 0
+        self._grow(np.concatenate([source[leaving], target[entering]]), int(day.min()), int(day.max()))
+
+        columns = day - self.day0
+        np.add.at(self.net, (np.searchsorted(self.list_ids, source[leaving]), columns[leaving]), -quantity[leaving])
+        rows = np.searchsorted(self.list_ids, target[entering])
+        np.add.at(self.net, (rows, columns[entering]), quantity[entering])
+        arriving = events[entering, KIND] != RESTORED
+        np.add.at(self.arrivals, (rows[arriving], columns[entering][arriving]), quantity[entering][arriving])
+
+        self.events = np.concatenate([self.events, events])
+
+    def daily(self, matrix, list_ids, days):
+        """Строки сводки для list_ids по дням days (нули для отсутствующих)"""
+        result = np.zeros((len(list_ids), len(days)), dtype=np.int64)
+        if self.day0 is None:
+            return result
+        position = np.searchsorted(self.list_ids, list_ids)
+        known = (position < len(self.list_ids)) & (self.list_ids[np.minimum(position, len(self.list_ids) - 1)] == list_ids)
+        columns = days - self.day0
+        inside = (columns >= 0) & (columns < matrix.shape[1])
+        result[np.ix_(known, inside)] = matrix[np.ix_(position[known], columns[inside])]
+        return result
+
+
+class FlowCache:
+    """Сводки проектов в памяти процесса (LRU)"""
+
+    def __init__(self, max_projects):
+        self.max_projects = max_projects
+        self.rollups = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, project_id):
+        with self.lock:
+            rollup = self.rollups.get(project_id)
+            if rollup is None:
+                rollup = self.rollups[project_id] = FlowRollup()
+                while len(self.rollups) > self.max_projects:
+                    self.rollups.popitem(last=False)
+            else:
+                self.rollups.move_to_end(project_id)
+        return rollup
+
+
+def _distribution(seconds):
+    """Сводка распределения длительностей (в часах) и гистограмма по дням"""
+    if not len(seconds):
+        return {'count': 0, 'mean_hours': None, **{f'p{p}_hours': None for p in PERCENTILES}, 'histogram': []}
+    hours = seconds / 3600.0
+    values = np.percentile(hours, PERCENTILES)
+    counts, _ = np.histogram(seconds / DAY, bins=(0,) + HISTOGRAM_DAYS + (np.inf,))
+    return {
+        'count': int(len(seconds)),
+        'mean_hours': round(float(hours.mean()), 2),
+        **{f'p{p}_hours': round(float(value), 2) for p, value in zip(PERCENTILES, values)},
+        'histogram': [
+            {'max_days': bound, 'count': int(count)}
+            for bound, count in zip(HISTOGRAM_DAYS + (None,), counts)
+        ]
+    }
+
+
+def _first_by_card(cards, times, mask):
+    """Первое по времени событие каждой карточки среди mask (события отсортированы по карточке и времени)"""
+    unique, index = np.unique(cards[mask], return_index=True)
+    return unique, times[mask][index]
+
+
+def _durations(events, list_ids, done_list_id, since):
+    """Время в списках, cycle time и lead time для карточек, завершенных после since"""
+    events = events[events[:, CARD] >= 0]
+    # lexsort устойчив: события одной карточки в одну секунду остаются в порядке журнала
+    events = events[np.lexsort((events[:, TS], events[:, CARD]))]
+    cards, times = events[:, CARD], events[:, TS]
+
+    # Пребывание в списке: вход в список и следующее событие той же карточки, уводящее из него
+    same_card = cards[1:] == cards[:-1]
+    stay = same_card & (events[:-1, TARGET] >= 0) & (events[1:, SOURCE] == events[:-1, TARGET]) & (times[1:] >= since)
+    stay_lists = events[:-1, TARGET][stay]
+    stay_seconds = (times[1:] - times[:-1])[stay]
+    order = np.argsort(stay_lists, kind='stable')
+    stay_lists, stay_seconds = stay_lists[order], stay_seconds[order]
+    starts = np.searchsorted(stay_lists, list_ids, side='left')
+    ends = np.searchsorted(stay_lists, list_ids, side='right')
+    time_in_list = [
+        dict(list_id=int(list_id), **_distribution(stay_seconds[start:end]))
+        for list_id, start, end in zip(list_ids, starts, ends)
+    ]
+
+    # Завершение - первое попадание в итоговый список (возврат из корзины или архива - не завершение)
+    done_cards, done_times = _first_by_card(cards, times, (events[:, TARGET] == done_list_id) & (events[:, KIND] != RESTORED))
+    recent = done_times >= since
+    done_cards, done_times = done_cards[recent], done_times[recent]
+
+    created_cards, created_times = _first_by_card(cards, times, events[:, KIND] == CREATED)
+    _, done_index, created_index = np.intersect1d(done_cards, created_cards, assume_unique=True, return_indices=True)
+    lead = done_times[done_index] - created_times[created_index]
+
+    # Начало работы - первое перемещение карточки
+    started_cards, started_times = _first_by_card(cards, times, events[:, KIND] == MOVED)
+    _, done_index, started_index = np.intersect1d(done_cards, started_cards, assume_unique=True, return_indices=True)
+    cycle = done_times[done_index] - started_times[started_index]
+
+    return time_in_list, _distribution(cycle[cycle >= 0]), _distribution(lead[lead >= 0])
+
+
+def flow_report(cache, project_id, days=30, weeks=12, done_list_id=None, now=None):
+    """Отчет о потоке проекта. ValueError, если done_list_id не список доски проекта."""
+    board = Board.query.filter_by(project_id=project_id).first()
+    lists = BoardList.query.filter_by(board_id=board.id).order_by(BoardList.position).all() if board else []
+    list_ids = np.array([board_list.id for board_list in lists], dtype=np.int64)
+    if done_list_id is None:
+        done_list_id = lists[-1].id if lists else None
+    elif done_list_id not in list_ids:
+        raise ValueError('done_list_id is not a list of the project board')
+
+    rollup = cache.get(project_id)
+    with rollup.lock:
+        rollup.refresh(project_id)
+        current = dict(db.session.query(Card.list_id, func.count(Card.id)).filter(
+            Card.list_id.in_(list_ids.tolist())
+        ).group_by(Card.list_id).all())
+
+        now = now or datetime.utcnow()
+        today = (now - datetime(1970, 1, 1)).days
+        history = np.arange(today - days + 1, today + 1)
+
+        # CFD: текущее число минус изменения после конца каждого дня
+        net = rollup.daily(rollup.net, list_ids, history)
+        after_day = np.cumsum(net[:, ::-1], axis=1)[:, ::-1] - net
+        counts = np.array([current.get(int(list_id), 0) for list_id in list_ids], dtype=np.int64)
+        cfd = np.maximum(counts[:, None] - after_day, 0)
+
+        # Пропускная способность: поступления в итоговый список по неделям (с понедельника)
+        this_week = (today + 3) // 7
+        week_numbers = np.arange(this_week - weeks + 1, this_week + 1)
+        week_days = np.arange(week_numbers[0] * 7 - 3, today + 1)
+        throughput = np.zeros(weeks, dtype=np.int64)
+        if done_list_id is not None:
+            arrivals = rollup.daily(rollup.arrivals, np.array([done_list_id], dtype=np.int64), week_days)[0]
+            throughput = np.bincount((week_days + 3) // 7 - week_numbers[0], weights=arrivals, minlength=weeks).astype(np.int64)
+
+        since = int((today - days + 1) * DAY)
+        time_in_list, cycle_time, lead_time = _durations(rollup.events, list_ids, done_list_id, since)
+        total_events = len(rollup.events)
+
+    epoch = datetime(1970, 1, 1)
+    return {
+        'project_id': project_id,
+        'lists': [{'id': board_list.id, 'name': board_list.name} for board_list in lists],
+        'done_list_id': done_list_id,
+        'cfd': {
+            'dates': [(epoch + timedelta(days=int(day))).date().isoformat() for day in history],
+            'series': [
+                {'list_id': int(list_id), 'counts': row.tolist()}
+                for list_id, row in zip(list_ids, cfd)
+            ]
+        },
+        'time_in_list': time_in_list,
+        'cycle_time': cycle_time,
+        'lead_time': lead_time,
+        'throughput': [
+            {'week_start': (epoch + timedelta(days=int(week) * 7 - 3)).date().isoformat(), 'count': int(count)}
+            for week, count in zip(week_numbers, throughput)
+        ],
+        'events': total_events,
+        'generated_at': now.isoformat()
+    }
+
+
+def init_flow_reports(app):
+    cache = FlowCache(app.config['FLOW_CACHE_MAX_PROJECTS'])
+    app.extensions['flow_reports'] = cache
+    return cache
@@ -0,0 +1,145 @@
+"""Маршрутизация запросов между основной базой и репликой для чтения.
+
+Маршруты, помеченные @read_only, читают через движок 'replica' (если он
+настроен в SQLALCHEMY_BINDS). Все записи и flush идут в основную базу.
+После успешной записи пользователь READ_YOUR_WRITES_SECONDS секунд читает
+из основной базы, чтобы видеть свои изменения до синхронизации реплики.
+Время последней записи хранится на сервере по id пользователя (так
+работают и клиенты с токеном Authorization: Bearer) - в Redis при
+CACHE_BACKEND=redis, иначе в памяти процесса - и дублируется в cookie
+сессии, которую браузер приносит в любой воркер.
+
+Таблицы проектов при включенном шардировании направляются в движок
+текущего шарда (см. sharding.py); реплика используется только для
+глобальных таблиц.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, request, session, current_app, has_request_context
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.util import find_tables
+
+from sharding import sharded_engine, shard_count
+
+REPLICA_BIND = 'replica'
+WRITE_METHODS = {'POST', 'PUT', 'DELETE', 'PATCH'}
+
+
+def _statement_tables(mapper, clause):
+    if mapper is not None:
+        return [sa.inspect(mapper).local_table]
+    if clause is not None:
+        return find_tables(clause, include_crud=True)
+    return []
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and shard_count():
+            engine = sharded_engine(self._db.engines, _statement_tables(mapper, clause))
+            if engine is not None:
+                return engine
+        if bind is None and not self._flushing and _use_replica():
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _use_replica():
+    return has_request_context() and g.get('read_only', False) and not g.get('sticky_primary', False)
+
+
+def reading_from_replica():
+    """Читает ли текущий запрос с реплики"""
+    return _use_replica() and REPLICA_BIND in current_app.config['SQLALCHEMY_BINDS']
+
+
+class LastWrites:
+    """Время последней записи пользователей в памяти процесса (не старше ttl, не больше max_users)"""
+
+    def __init__(self, ttl, max_users):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        return self.entries.get(user_id, 0)
+
+    def set(self, user_id, timestamp):
+        with self.lock:
+            self.entries[user_id] = timestamp
+            self.entries.move_to_end(user_id)
+            # Записи упорядочены по времени: устаревшие и лишние - в начале
+            while self.entries and (len(self.entries) > self.max_users
+                                    or next(iter(self.entries.values())) < timestamp - self.ttl):
+                self.entries.popitem(last=False)
+
+
+class RedisLastWrites:
+    """Время последней записи пользователей в Redis - общее для всех воркеров"""
+
+    def __init__(self, client, ttl, prefix='jira:last_write:'):
+        self.client = client
+        self.ttl = max(1, math.ceil(ttl))
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, ttl):
+        import redis
+        return cls(redis.Redis.from_url(url), ttl)
+
+    def get(self, user_id):
+        raw = self.client.get(f'{self.prefix}{user_id}')
+        return float(raw) if raw is not None else 0
+
+    def set(self, user_id, timestamp):
+        self.client.set(f'{self.prefix}{user_id}', repr(timestamp), ex=self.ttl)
+
+
+def _current_user_id():
+    return current_user.id if current_user.is_authenticated else None
+
+
+def _last_write_at():
+    last_write = session.get('last_write_at', 0)
+    user_id = _current_user_id()
+    if user_id is not None:
+        last_write = max(last_write, current_app.extensions['last_writes'].get(user_id))
+    return last_write
+
+
+def read_only(view):
+    """Пометить маршрут как только читающий"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        g.sticky_primary = time.time() - _last_write_at() < current_app.config['READ_YOUR_WRITES_SECONDS']
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_routing(app):
+    config = app.config
+    if config['CACHE_BACKEND'] == 'redis':
+        last_writes = RedisLastWrites.from_url(config['CACHE_REDIS_URL'], config['READ_YOUR_WRITES_SECONDS'])
+    else:
+        last_writes = LastWrites(config['READ_YOUR_WRITES_SECONDS'], config['READ_YOUR_WRITES_MAX_USERS'])
+    app.extensions['last_writes'] = last_writes
+
+    @app.after_request
+    def remember_last_write(response):
+        if request.method in WRITE_METHODS and response.status_code < 400 and REPLICA_BIND in config['SQLALCHEMY_BINDS']:
+            now = time.time()
+            session['last_write_at'] = now
+            user_id = _current_user_id()
+            if user_id is not None:
+                last_writes.set(user_id, now)
+        return response
@@ -1,4 +1,9 @@
-from app import app
+import os
 
+# Сервер разработки. В production используйте gunicorn (см. gunicorn.conf.py)
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
\ No newline at end of file
+    # Импорт под условием: процессы пула хеширования паролей (forkserver)
+    # импортируют этот модуль и не должны поднимать приложение
+    from app import app
+
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', port=5000)
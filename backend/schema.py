@@ -0,0 +1,55 @@
+"""Доводка схемы существующей базы до текущих моделей.
+
+db.create_all() создает только отсутствующие таблицы, поэтому колонки и
+индексы, добавленные в модели позже, досоздаются здесь: колонки через
+ALTER TABLE ADD COLUMN (новые колонки должны допускать NULL или иметь
+server_default), индексы через CREATE INDEX IF NOT EXISTS. Проверка
+индексов через отражение схемы не подходит: индексы по выражениям
+(lower(username)) SQLAlchemy не отражает. Если новую колонку нужно
+заполнить по существующим строкам, запрос лежит в COLUMN_BACKFILLS и
+выполняется сразу после ADD COLUMN.
+"""
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from models import db
+
+COLUMN_BACKFILLS = {
+    # До появления колонки id архивной строки совпадал с id карточки
+    ('archived_card', 'original_card_id'): 'UPDATE archived_card SET original_card_id = id',
+}
+
+
+def add_columns(engine, tables):
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_sql = CreateColumn(column).compile(dialect=engine.dialect)
+                    table_sql = engine.dialect.identifier_preparer.format_table(table)
+                    connection.exec_driver_sql(f'ALTER TABLE {table_sql} ADD COLUMN {column_sql}')
+                    print(f"🛠️ Added column {table.name}.{column.name}")
+                    backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                    if backfill:
+                        connection.exec_driver_sql(backfill)
+
+
+def create_indexes(engine, tables):
+    with engine.begin() as connection:
+        for table in tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def upgrade_tables(engine, tables):
+    add_columns(engine, tables)
+    create_indexes(engine, tables)
+
+
+def upgrade_schema(engine=None):
+    upgrade_tables(engine or db.engine, db.metadata.sorted_tables)
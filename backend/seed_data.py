@@ -0,0 +1,354 @@
+"""Генератор синтетических данных для нагрузочных проверок.
+
+Заполняет базу (и шарды, если они настроены) пользователями, проектами с
+участниками, досками, списками, метками, карточками с назначениями,
+метками, чеклистами, комментариями, упоминаниями и уведомлениями:
+
+    python seed_data.py --scale medium
+    python seed_data.py --users 20000 --projects 2000 --cards 2000000 --seed 7
+
+Распределения неравномерные, как у реальных клиентов: размеры проектов
+и активность пользователей - по закону Ципфа (несколько огромных
+проектов и "хвост" мелких), карточки скапливаются в последних списках,
+число комментариев - с тяжелым хвостом (распределение Парето).
+
+Строки вставляются Core INSERT пачками по --batch-size (executemany) в
+больших транзакциях (коммит каждые --commit-every строк). id выдаются
+заранее, начиная после уже занятых, поэтому внешние ключи известны без
+обращения к базе. У всех пользователей один пароль (--password): хеш
+вычисляется один раз. Запущенный сервер нужно перезапустить - его кэши
+не знают о новых строках.
+"""
+import argparse
+import os
+import random
+import time
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+os.environ.setdefault('BACKGROUND_JOBS_ENABLED', '0')
+
+from sqlalchemy import insert, select, func, text
+from werkzeug.security import generate_password_hash
+
+from app import app
+from models import (
+    db, User, Project, ProjectMember, Board, BoardList, Card, CardAssignee, CardLabel, Label,
+    Checklist, ChecklistItem, Comment, Mention, Notification, UserRole
+)
+from sharding import shard_count, shard_for_project, shard_bind_key
+
+PRESETS = {
+    'small': {'users': 200, 'projects': 20, 'cards': 10000},
+    'medium': {'users': 2000, 'projects': 200, 'cards': 200000},
+    # ~10 млн строк во всех таблицах
+    'large': {'users': 20000, 'projects': 2000, 'cards': 2000000},
+}
+
+LIST_NAMES = ['Backlog', 'To Do', 'In Progress', 'Review', 'QA', 'Blocked', 'Done']
+LABEL_COLORS = ['#DC2626', '#F59E0B', '#10B981', '#3B82F6', '#8B5CF6', '#EC4899', '#6B7280', '#14B8A6']
+WORDS = ('fix update review deploy design refactor test api board card list user project bug feature '
+         'release sprint backlog docs search cache export import mobile layout login error').split()
+
+
+class Sampler:
+    """Выбор элемента с весами Ципфа (1 / rank^s) в случайном порядке рангов"""
+
+    def __init__(self, items, rng, exponent=1.1):
+        self.items = list(items)
+        ranks = list(range(1, len(self.items) + 1))
+        rng.shuffle(ranks)
+        self.cum_weights = list(accumulate(1.0 / rank ** exponent for rank in ranks))
+
+    def pick(self, rng):
+        return self.items[bisect(self.cum_weights, rng.random() * self.cum_weights[-1])]
+
+    def sample(self, rng, count):
+        """До count разных элементов (популярные - чаще)"""
+        count = min(count, len(self.items))
+        chosen = []
+        for _ in range(count * 4):
+            item = self.pick(rng)
+            if item not in chosen:
+                chosen.append(item)
+                if len(chosen) == count:
+                    break
+        return chosen
+
+
+class TableWriter:
+    """Буфер строк одной таблицы в одной базе; id выдаются заранее"""
+
+    def __init__(self, loader, connection, table):
+        self.loader = loader
+        self.connection = connection
+        self.table = table
+        self.rows = []
+        max_id = connection.execute(select(func.max(table.c.id))).scalar() or 0
+        # AUTOINCREMENT: id удаленных строк (и начало диапазона шарда) - в sqlite_sequence
+        seq = connection.execute(
+            text('SELECT seq FROM sqlite_sequence WHERE name = :name'), {'name': table.name}
+        ).scalar() if table.dialect_options['sqlite'].get('autoincrement') else None
+        self.next_id = max(max_id, seq or 0) + 1
+
+    def add(self, **row):
+        row['id'] = self.next_id
+        self.next_id += 1
+        self.rows.append(row)
+        if len(self.rows) >= self.loader.batch_size:
+            self.flush()
+        return row['id']
+
+    def flush(self):
+        if self.rows:
+            self.connection.execute(insert(self.table), self.rows)
+            self.loader.written(self.table.name, len(self.rows))
+            self.rows = []
+
+
+class Loader:
+    """Соединения с транзакциями по базам и буферы таблиц"""
+
+    def __init__(self, batch_size, commit_every):
+        self.batch_size = batch_size
+        self.commit_every = commit_every
+        self.connections = {}
+        self.transactions = {}
+        self.writers = {}
+        self.counts = {}
+        self.uncommitted = 0
+
+    def _connection(self, engine):
+        key = id(engine)
+        if key not in self.connections:
+            connection = engine.connect()
+            # Только для этого соединения загрузки: меньше fsync и больше кэш страниц
+            connection.exec_driver_sql('PRAGMA synchronous=OFF')
+            connection.exec_driver_sql('PRAGMA cache_size=-262144')
+            self.connections[key] = connection
+            self.transactions[key] = connection.begin()
+        return self.connections[key]
+
+    def writer(self, model, shard=None):
+        engine = db.engines[shard_bind_key(shard)] if shard is not None else db.engine
+        key = (id(engine), model.__tablename__)
+        if key not in self.writers:
+            self.writers[key] = TableWriter(self, self._connection(engine), model.__table__)
+        return self.writers[key]
+
+    def written(self, table_name, count):
+        self.counts[table_name] = self.counts.get(table_name, 0) + count
+        self.uncommitted += count
+
+    def checkpoint(self, force=False):
+        """Записать буферы и закоммитить, если накопилось commit_every строк"""
+        pending = sum(len(writer.rows) for writer in self.writers.values())
+        if not force and self.uncommitted + pending < self.commit_every:
+            return
+        for writer in self.writers.values():
+            writer.flush()
+        for key, transaction in self.transactions.items():
+            transaction.commit()
+            self.transactions[key] = self.connections[key].begin()
+        self.uncommitted = 0
+
+    def close(self):
+        self.checkpoint(force=True)
+        for key, transaction in self.transactions.items():
+            transaction.commit()
+        for connection in self.connections.values():
+            connection.close()
+
+
+def _sentence(rng, low=3, high=10):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high))).capitalize()
+
+
+def _split(total, parts, rng, exponent=1.1):
+    """Разбить total на parts положительных долей с весами Ципфа"""
+    weights = [1.0 / rank ** exponent for rank in range(1, parts + 1)]
+    rng.shuffle(weights)
+    scale = total / sum(weights)
+    return [max(1, int(weight * scale)) for weight in weights]
+
+
+def seed_users(loader, count, password_hash, prefix, now, rng):
+    writer = loader.writer(User)
+    users = []
+    for _ in range(count):
+        user_id = writer.next_id
+        username = f'{prefix}{user_id}'
+        writer.add(
+            username=username,
+            email=f'{username}@example.com',
+            password_hash=password_hash,
+            created_at=now - timedelta(days=rng.uniform(0, 730)),
+            avatar_url=None
+        )
+        users.append((user_id, username))
+    loader.checkpoint()
+    return users
+
+
+def seed_project(loader, project_number, card_count, user_sampler, now, rng):
+    main = {model: loader.writer(model) for model in (Project, ProjectMember, Notification)}
+    project_id = main[Project].next_id
+    shard = shard_for_project(project_id) if shard_count() else None
+    table = {model: loader.writer(model, shard) for model in (
+        Board, BoardList, Label, Card, CardLabel, CardAssignee, Checklist, ChecklistItem, Comment, Mention
+    )}
+
+    created = now - timedelta(days=rng.uniform(30, 720))
+    member_count = min(len(user_sampler.items), 2 + int(rng.paretovariate(1.2) * 3))
+    members = user_sampler.sample(rng, member_count)
+    owner_id = members[0][0]
+    main[Project].add(
+        name=f'Project {project_number}: {_sentence(rng, 1, 3)}',
+        description=_sentence(rng),
+        created_at=created,
+        updated_at=now - timedelta(days=rng.uniform(0, 30)),
+        creator_id=owner_id
+    )
+    for index, (user_id, _) in enumerate(members):
+        role = UserRole.ADMIN if index == 0 or rng.random() < 0.05 else (
+            UserRole.VIEWER if rng.random() < 0.1 else UserRole.MEMBER
+        )
+        main[ProjectMember].add(
+            project_id=project_id, user_id=user_id, role=role,
+            joined_at=created + timedelta(days=rng.uniform(0, (now - created).days or 1))
+        )
+    member_sampler = Sampler(members, rng)
+
+    board_id = table[Board].add(
+        name=f'Project {project_number} Board', description='', project_id=project_id,
+        created_at=created, updated_at=created
+    )
+    names = LIST_NAMES[:1] + rng.sample(LIST_NAMES[1:-1], rng.randint(2, 5)) + LIST_NAMES[-1:]
+    lists = [
+        table[BoardList].add(name=name, position=position, board_id=board_id, created_at=created)
+        for position, name in enumerate(names)
+    ]
+    # Карточки скапливаются в последних списках (готовые не убирают)
+    list_weights = list(accumulate((position + 1) ** 1.5 for position in range(len(lists))))
+    labels = [
+        table[Label].add(name=rng.choice(WORDS).capitalize(), color=color, project_id=project_id, created_at=created)
+        for color in rng.sample(LABEL_COLORS, rng.randint(3, len(LABEL_COLORS)))
+    ]
+
+    positions = [0] * len(lists)
+    age_days = max((now - created).days, 1)
+    for _ in range(card_count):
+        list_index = bisect(list_weights, rng.random() * list_weights[-1])
+        positions[list_index] += 1
+        card_created = created + timedelta(days=rng.uniform(0, age_days))
+        author_id = member_sampler.pick(rng)[0]
+        card_id = table[Card].add(
+            title=_sentence(rng, 2, 6),
+            description=_sentence(rng, 5, 25) if rng.random() < 0.6 else '',
+            position=positions[list_index],
+            due_date=card_created + timedelta(days=rng.uniform(1, 60)) if rng.random() < 0.4 else None,
+            list_id=lists[list_index],
+            created_by_id=author_id,
+            created_at=card_created,
+            updated_at=card_created + (now - card_created) * rng.random()
+        )
+
+        for label_id in rng.sample(labels, rng.choices((0, 1, 2, 3), (40, 35, 18, 7))[0]):
+            table[CardLabel].add(card_id=card_id, label_id=label_id)
+
+        for user_id, _ in member_sampler.sample(rng, rng.choices((0, 1, 2, 3), (30, 50, 15, 5))[0]):
+            table[CardAssignee].add(card_id=card_id, user_id=user_id, assigned_at=card_created)
+            main[Notification].add(
+                user_id=user_id, type='card_assignment', title='Вас назначили на карточку',
+                message=None, data={'card_id': card_id, 'project_id': project_id},
+                created_at=card_created, read_at=card_created if rng.random() < 0.7 else None
+            )
+
+        if rng.random() < 0.3:
+            checklist_id = table[Checklist].add(title='Checklist', card_id=card_id, position=1, created_at=card_created)
+            done_share = (list_index + 1) / len(lists)
+            for position in range(rng.randint(2, 8)):
+                table[ChecklistItem].add(
+                    text=_sentence(rng, 2, 5), completed=rng.random() < done_share,
+                    position=position + 1, checklist_id=checklist_id, created_at=card_created
+                )
+
+        for _ in range(min(int(rng.paretovariate(1.6)) - 1, 50)):
+            comment_author, _ = member_sampler.pick(rng)
+            comment_created = card_created + (now - card_created) * rng.random()
+            mentioned = None
+            if len(members) > 1 and rng.random() < 0.2:
+                mentioned = member_sampler.pick(rng)
+            text_value = _sentence(rng, 3, 20)
+            if mentioned and mentioned[0] != comment_author:
+                text_value = f'@{mentioned[1]} {text_value}'
+            comment_id = table[Comment].add(
+                text=text_value, card_id=card_id, author_id=comment_author,
+                created_at=comment_created, updated_at=comment_created
+            )
+            if mentioned and mentioned[0] != comment_author:
+                table[Mention].add(comment_id=comment_id, mentioned_user_id=mentioned[0], created_at=comment_created)
+                main[Notification].add(
+                    user_id=mentioned[0], type='mention', title='Вас упомянули в комментарии',
+                    message=None, data={'comment_id': comment_id, 'card_id': card_id, 'project_id': project_id},
+                    created_at=comment_created, read_at=comment_created if rng.random() < 0.6 else None
+                )
+
+        loader.checkpoint()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Populate the database with synthetic data')
+    parser.add_argument('--scale', choices=sorted(PRESETS), default='small')
+    parser.add_argument('--users', type=int)
+    parser.add_argument('--projects', type=int)
+    parser.add_argument('--cards', type=int, help='total cards across all projects')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--prefix', default='seed', help='username prefix')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--batch-size', type=int, default=20000)
+    parser.add_argument('--commit-every', type=int, default=500000)
+    parser.add_argument('--no-analyze', action='store_true', help='skip ANALYZE after loading')
+    args = parser.parse_args(argv)
+    for key, value in PRESETS[args.scale].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    started = time.monotonic()
+
+    with app.app_context():
+        password_hash = generate_password_hash(args.password, app.config['PASSWORD_HASH_METHOD'])
+        loader = Loader(args.batch_size, args.commit_every)
+
+        print(f"👥 Seeding {args.users} users, {args.projects} projects, {args.cards} cards (seed {args.seed})")
+        users = seed_users(loader, args.users, password_hash, args.prefix, now, rng)
+        user_sampler = Sampler(users, rng)
+        for number, card_count in enumerate(_split(args.cards, args.projects, rng), start=1):
+            seed_project(loader, number, card_count, user_sampler, now, rng)
+            if number % 50 == 0:
+                print(f"📦 {number}/{args.projects} projects, {sum(loader.counts.values())} rows")
+        loader.close()
+
+        if not args.no_analyze:
+            # Статистика для планировщика запросов на новых объемах
+            for engine in {id(engine): engine for engine in db.engines.values()}.values():
+                with engine.begin() as connection:
+                    connection.exec_driver_sql('ANALYZE')
+
+    elapsed = time.monotonic() - started
+    total = sum(loader.counts.values())
+    for name, count in sorted(loader.counts.items()):
+        print(f"  {name}: {count}")
+    print(f"✅ Inserted {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s); "
+          f"password for all users: {args.password}")
+
+
+if __name__ == '__main__':
+    main()
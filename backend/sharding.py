@@ -0,0 +1,123 @@
+"""Шардирование данных проектов по нескольким файлам базы.
+
+Включается заданием SHARD_DATABASE_URLS. Таблицы проекта (доски, списки,
+карточки, метки, чеклисты, комментарии и т.д.) хранятся в шарде
+project_id % N; глобальные таблицы (пользователи, проекты, участники,
+приглашения, уведомления) - в основной базе-каталоге.
+
+Каждый шард выдает id из своего диапазона [k * SHARD_ID_SPAN, (k + 1) * SHARD_ID_SPAN),
+поэтому по id любой сущности (card_id, list_id, ...) сразу понятен шард.
+
+Текущий шард хранится в flask.g и выбирается по параметрам URL перед
+обработкой запроса; вне запроса (фоновые задачи) - через use_shard().
+"""
+from contextlib import contextmanager
+
+from flask import g, request, current_app, has_app_context
+from sqlalchemy import text
+
+SHARDED_TABLES = {
+    'board', 'board_list', 'card', 'card_assignee', 'card_label', 'label',
+    'checklist', 'checklist_item', 'comment', 'mention', 'archived_card', 'activity',
+}
+
+# Параметры URL, содержащие id сущности из шарда
+_SHARDED_ID_ARGS = ('board_id', 'list_id', 'card_id', 'checklist_id', 'item_id', 'label_id')
+
+
+def shard_count():
+    if not has_app_context():
+        return 0
+    return len(current_app.config['SHARD_DATABASE_URLS'])
+
+
+def shard_bind_key(shard):
+    return f'shard{shard}'
+
+
+def shard_for_project(project_id):
+    return project_id % shard_count() if shard_count() else None
+
+
+def shard_for_id(entity_id):
+    return int(entity_id) // current_app.config['SHARD_ID_SPAN'] if shard_count() else None
+
+
+def current_shard():
+    return g.get('shard')
+
+
+def select_project_shard(project_id):
+    """Выбрать шард проекта для оставшейся части запроса"""
+    g.shard = shard_for_project(project_id)
+
+
+def select_entity_shard(entity_id):
+    """Выбрать шард по id сущности проекта (карточки, комментария, ...)"""
+    g.shard = shard_for_id(entity_id)
+
+
+@contextmanager
+def use_shard(shard):
+    """Временно переключить текущий шард"""
+    previous = g.get('shard')
+    g.shard = shard
+    try:
+        yield
+    finally:
+        g.shard = previous
+
+
+def for_each_shard():
+    """Перебрать шарды (или один проход без шарда, если шардирование выключено)"""
+    count = shard_count()
+    for shard in range(count) if count else [None]:
+        with use_shard(shard):
+            yield shard
+
+
+def sharded_engine(engines, tables):
+    """Движок шарда, если среди таблиц запроса есть шардированные"""
+    if not any(table.name in SHARDED_TABLES for table in tables):
+        return None
+    shard = current_shard()
+    if shard is None:
+        names = sorted(table.name for table in tables)
+        raise RuntimeError(f'No shard selected for query on {names}')
+    return engines[shard_bind_key(shard)]
+
+
+def init_shards(db):
+    """Создать таблицы проектов в каждом шарде и задать диапазоны id"""
+    from schema import upgrade_tables
+    count = shard_count()
+    if not count:
+        return
+    span = current_app.config['SHARD_ID_SPAN']
+    tables = [table for table in db.metadata.sorted_tables if table.name in SHARDED_TABLES]
+    for shard in range(count):
+        engine = db.engines[shard_bind_key(shard)]
+        db.metadata.create_all(bind=engine, tables=tables)
+        upgrade_tables(engine, tables)
+        with engine.begin() as connection:
+            for table in tables:
+                connection.execute(text(
+                    'INSERT INTO sqlite_sequence (name, seq) '
+                    'SELECT :name, :seq WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :name)'
+                ), {'name': table.name, 'seq': shard * span})
+    print(f"🧩 Initialized {count} project shards")
+
+
+def init_sharding(app):
+    @app.before_request
+    def select_shard():
+        if not shard_count() or not request.view_args:
+            return None
+        if 'project_id' in request.view_args:
+            g.shard = shard_for_project(request.view_args['project_id'])
+        else:
+            for arg in _SHARDED_ID_ARGS:
+                if arg in request.view_args:
+                    g.shard = shard_for_id(request.view_args[arg])
+                    break
+        return None
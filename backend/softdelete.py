@@ -0,0 +1,133 @@
+"""Мягкое удаление списков и карточек.
+
+Удаление только ставит deleted_at (для списка - одним UPDATE и всем его
+карточкам), поэтому ответ мгновенный и в течение
+SOFT_DELETE_UNDO_SECONDS удаление можно отменить. Удаленные строки
+скрываются из всех ORM-запросов критерием with_loader_criteria (включая
+get_or_404 и ленивую загрузку board.lists / list.cards); увидеть их можно
+запросом с execution_options(include_deleted=True). Критерий не попадает
+в JOIN с явным условием - там deleted_at IS NULL нужно указывать самим.
+
+Физически строки удаляет фоновая задача: пачками по PURGE_BATCH_SIZE
+карточек, набором DELETE ... WHERE IN без загрузки объектов в память.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import event, select, update, delete
+from sqlalchemy.orm import with_loader_criteria
+
+from models import db, BoardList, Card, SoftDeleteMixin
+from archive import delete_card_rows
+from sharding import for_each_shard
+
+
+class UndoExpired(Exception):
+    pass
+
+
+def init_soft_delete(db):
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'do_orm_execute')
+    def hide_deleted_rows(execute_state):
+        # Ленивые загрузки тоже фильтруем: объект, найденный с include_deleted,
+        # не должен показывать удаленные дочерние строки
+        if (execute_state.is_select
+                and not execute_state.is_column_load
+                and not execute_state.execution_options.get('include_deleted', False)):
+            execute_state.statement = execute_state.statement.options(with_loader_criteria(
+                SoftDeleteMixin, lambda cls: cls.deleted_at.is_(None), include_aliases=True
+            ))
+
+
+def undo_deadline(deleted_at):
+    return deleted_at + timedelta(seconds=current_app.config['SOFT_DELETE_UNDO_SECONDS'])
+
+
+def find_deleted(model, entity_id):
+    """Удаленная строка по id (или None)"""
+    return model.query.execution_options(include_deleted=True).filter(
+        model.id == entity_id, model.deleted_at.isnot(None)
+    ).first()
+
+
+def soft_delete_list(board_list):
+    """Пометить список и его карточки удаленными (коммит - за вызывающим)"""
+    now = datetime.utcnow()
+    board_list.deleted_at = now
+    db.session.execute(
+        update(Card).where(Card.list_id == board_list.id, Card.deleted_at.is_(None))
+        .values(deleted_at=now, version=Card.version + 1).execution_options(synchronize_session=False)
+    )
+    return now
+
+
+def soft_delete_card(card):
+    card.deleted_at = datetime.utcnow()
+    return card.deleted_at
+
+
+def undelete_list(board_list):
+    """Вернуть список и карточки, удаленные вместе с ним"""
+    if datetime.utcnow() > undo_deadline(board_list.deleted_at):
+        raise UndoExpired('Undo window has expired')
+    db.session.execute(
+        update(Card).where(Card.list_id == board_list.id, Card.deleted_at == board_list.deleted_at)
+        .values(deleted_at=None, version=Card.version + 1).execution_options(synchronize_session=False)
+    )
+    board_list.deleted_at = None
+
+
+def undelete_card(card):
+    if datetime.utcnow() > undo_deadline(card.deleted_at):
+        raise UndoExpired('Undo window has expired')
+    if db.session.get(BoardList, card.list_id) is None:
+        raise ValueError('List of the card is deleted')
+    card.deleted_at = None
+
+
+def purge_deleted(batch_size=None, max_batches=None):
+    """Физически удалить строки, удаленные раньше окна отмены. Возвращает (карточек, списков)."""
+    config = current_app.config
+    batch_size = batch_size or config['PURGE_BATCH_SIZE']
+    cutoff = datetime.utcnow() - timedelta(seconds=config['SOFT_DELETE_UNDO_SECONDS'])
+    cards = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        card_ids = db.session.execute(
+            select(Card.__table__.c.id)
+            .where(Card.__table__.c.deleted_at < cutoff)
+            .order_by(Card.__table__.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not card_ids:
+            break
+        delete_card_rows(card_ids)
+        db.session.commit()
+        cards += len(card_ids)
+        batches += 1
+
+    # Список удаляется, когда в нем не осталось карточек (удаленных вместе с ним)
+    lists_table = BoardList.__table__
+    cards_table = Card.__table__
+    lists = db.session.execute(
+        delete(lists_table).where(
+            lists_table.c.deleted_at < cutoff,
+            ~select(cards_table.c.id).where(cards_table.c.list_id == lists_table.c.id).exists()
+        )
+    ).rowcount
+    db.session.commit()
+    return cards, lists
+
+
+def run_purge_job():
+    """Периодическая задача: очистка удаленных списков и карточек во всех шардах"""
+    max_batches = current_app.config['PURGE_MAX_BATCHES_PER_RUN']
+    cards = lists = 0
+    for _ in for_each_shard():
+        purged_cards, purged_lists = purge_deleted(max_batches=max_batches)
+        cards += purged_cards
+        lists += purged_lists
+    if cards or lists:
+        print(f"🧹 Purged {cards} deleted cards and {lists} deleted lists")
@@ -0,0 +1,154 @@
+"""Подписанные токены доступа (JWT, HS256) без обращения к базе.
+
+Access-токен живет JWT_ACCESS_TOKEN_EXPIRES и содержит все поля,
+нужные для current_user, поэтому проверяется только подписью.
+Refresh-токен живет JWT_REFRESH_TOKEN_EXPIRES и обменивается на новую
+пару токенов (при обмене пользователь проверяется по базе). Каждый
+refresh-токен записан в RefreshToken по jti и обменивается один раз:
+повторное предъявление уже обмененного токена означает, что его копия
+у кого-то еще, и отзывает все токены пользователя (User.token_version,
+который увеличивается и при смене пароля).
+"""
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import update, delete
+
+from identity import UserIdentity
+from models import db, RefreshToken
+
+
+class TokenError(Exception):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _secret():
+    return (current_app.config['JWT_SECRET_KEY'] or current_app.config['SECRET_KEY']).encode('utf-8')
+
+
+def encode_token(claims):
+    header = _b64encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}, separators=(',', ':')).encode('utf-8'))
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    signing_input = f'{header}.{payload}'.encode('ascii')
+    signature = _b64encode(hmac.new(_secret(), signing_input, hashlib.sha256).digest())
+    return f'{header}.{payload}.{signature}'
+
+
+def decode_token(token, expected_type):
+    try:
+        header, payload, signature = token.split('.')
+        signing_input = f'{header}.{payload}'.encode('ascii')
+        expected = _b64encode(hmac.new(_secret(), signing_input, hashlib.sha256).digest())
+        if not hmac.compare_digest(signature, expected):
+            raise TokenError('Invalid token signature')
+        if json.loads(_b64decode(header)).get('alg') != 'HS256':
+            raise TokenError('Unsupported token algorithm')
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, UnicodeError) as e:
+        raise TokenError('Malformed token') from e
+
+    if claims.get('type') != expected_type:
+        raise TokenError('Wrong token type')
+    if claims.get('exp', 0) < time.time():
+        raise TokenError('Token expired')
+    return claims
+
+
+def issue_tokens(user):
+    """Пара токенов для пользователя User (refresh-токен добавляется в сессию, коммит - за вызывающим)"""
+    config = current_app.config
+    now = int(time.time())
+    access_expires = int(config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds())
+    refresh_expires = int(config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+    jti = secrets.token_hex(16)
+    db.session.add(RefreshToken(
+        jti=jti, user_id=user.id, issued_at=datetime.utcfromtimestamp(now),
+        expires_at=datetime.utcfromtimestamp(now + refresh_expires)
+    ))
+    return {
+        'access_token': encode_token({
+            'type': 'access',
+            'sub': user.id,
+            'username': user.username,
+            'email': user.email,
+            'avatar_url': user.avatar_url,
+            'created_at': user.created_at.isoformat(),
+            'iat': now,
+            'exp': now + access_expires
+        }),
+        'refresh_token': encode_token({
+            'type': 'refresh',
+            'sub': user.id,
+            'jti': jti,
+            'ver': user.token_version or 0,
+            'iat': now,
+            'exp': now + refresh_expires
+        }),
+        'token_type': 'Bearer',
+        'expires_in': access_expires
+    }
+
+
+def redeem_refresh_token(user, claims):
+    """Отметить refresh-токен обмененным; TokenError, если он отозван или уже обменен"""
+    if claims.get('ver') != (user.token_version or 0) or not claims.get('jti'):
+        raise TokenError('Token revoked')
+    # Условный UPDATE: из двух одновременных обменов одного токена пройдет один
+    redeemed = db.session.execute(
+        update(RefreshToken.__table__)
+        .where(RefreshToken.jti == claims['jti'], RefreshToken.user_id == user.id,
+               RefreshToken.used_at.is_(None))
+        .values(used_at=datetime.utcnow())
+    ).rowcount
+    if not redeemed:
+        if db.session.get(RefreshToken, claims['jti']) is not None:
+            # Обмененный токен предъявлен повторно - отзываем все токены пользователя
+            user.revoke_tokens()
+            db.session.commit()
+            print(f"🚨 Reused refresh token for user {user.id}, all tokens revoked")
+        raise TokenError('Token revoked')
+
+
+def prune_refresh_tokens():
+    """Удалить записи истекших refresh-токенов"""
+    deleted = db.session.execute(
+        delete(RefreshToken.__table__).where(RefreshToken.expires_at < datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+def run_token_prune_job():
+    deleted = prune_refresh_tokens()
+    if deleted:
+        print(f"🧹 Pruned {deleted} expired refresh tokens")
+
+
+def identity_from_access_token(token):
+    """UserIdentity из access-токена (без запроса к базе)"""
+    claims = decode_token(token, 'access')
+    return UserIdentity(
+        claims['sub'], claims['username'], claims['email'],
+        claims['avatar_url'], datetime.fromisoformat(claims['created_at'])
+    )
+
+
+def bearer_token(request):
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return None
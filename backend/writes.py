@@ -0,0 +1,188 @@
+"""Координация записи в SQLite: очередь писателей процесса и повтор запросов.
+
+SQLite допускает одного писателя на файл базы; при конкурентной записи
+запрос ждет busy_timeout и получает "database is locked", а маршрут
+отвечал 500. Здесь:
+
+- писатели процесса выстраиваются в очередь на блокировке своей базы
+  (основной или шарда - у каждого движка своя блокировка, записи в разные
+  файлы друг друга не ждут): ее берет первая запись транзакции в эту базу
+  (flush или INSERT/UPDATE/DELETE через сессию), отпускает конец
+  транзакции (коммит или откат). Чтения и подготовка запроса (проверки,
+  хеширование пароля) идут без нее, а между потоками одного процесса
+  SQLite не конкурирует вовсе. Блокировки берутся в едином порядке; если
+  транзакции нужна база "раньше" уже взятой, ждать ее нельзя (взаимная
+  блокировка) - при занятости запрос сразу уходит на повтор;
+- ошибки блокировки базы (от других процессов) отмечаются событием
+  движка handle_error. Запрос на запись, получивший такую ошибку до
+  своего первого коммита, повторяется целиком: транзакция откатана,
+  поэтому повтор безопасен. Пауза между попытками - экспоненциальная со
+  случайным разбросом (full jitter). После WRITE_RETRY_ATTEMPTS попыток
+  или WRITE_RETRY_MAX_TOTAL_SECONDS с начала запроса (включая ожидание
+  блокировок) - 503 с Retry-After;
+- время ожидания блокировки процесса, ошибки и повторы пишутся в
+  metrics (/api/metrics): db.writer_lock_wait, db.lock_errors,
+  db.write_retries, db.write_retries_exhausted.
+"""
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import g, request, jsonify, current_app, has_app_context, has_request_context
+from sqlalchemy import event, inspect
+
+import metrics
+
+WRITE_METHODS = {'POST', 'PUT', 'DELETE', 'PATCH'}
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+class WriteLockTimeout(Exception):
+    pass
+
+
+def is_lock_error(error):
+    error = getattr(error, 'orig', error)
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def _mark_lock_error():
+    metrics.incr('db.lock_errors')
+    if has_app_context():
+        g.db_lock_error = True
+
+
+def _writer_lock(key):
+    with _writer_locks_guard:
+        lock = _writer_locks.get(key)
+        if lock is None:
+            lock = _writer_locks[key] = threading.Lock()
+        return lock
+
+
+def _lock_timeout():
+    """Ожидание блокировки: не дольше WRITE_LOCK_TIMEOUT_SECONDS и остатка бюджета запроса"""
+    timeout = current_app.config['WRITE_LOCK_TIMEOUT_SECONDS']
+    deadline = g.get('write_deadline') if has_request_context() else None
+    if deadline is not None:
+        timeout = min(timeout, deadline - time.monotonic())
+    return max(timeout, 0)
+
+
+def _acquire_writer(session, engines):
+    """Взять блокировки писателя для баз engines (уже взятые пропускаются)"""
+    if not current_app.config['WRITE_SERIALIZE']:
+        return
+    held = session.info.setdefault('writer_locks_held', [])
+    for key in sorted({str(engine.url) for engine in engines} - set(held)):
+        lock = _writer_lock(key)
+        started = time.monotonic()
+        if held and key < max(held):
+            # Не по порядку: ожидание могло бы замкнуть круг с другой транзакцией
+            acquired = lock.acquire(blocking=False)
+        else:
+            acquired = lock.acquire(timeout=_lock_timeout())
+        metrics.observe('db.writer_lock_wait', time.monotonic() - started)
+        if not acquired:
+            _mark_lock_error()
+            raise WriteLockTimeout('Timed out waiting for the writer lock')
+        held.append(key)
+
+
+def _release_writer(session):
+    for key in session.info.pop('writer_locks_held', ()):
+        _writer_lock(key).release()
+
+
+def init_engine_lock_errors(engine):
+    @event.listens_for(engine, 'handle_error')
+    def flag_lock_error(context):
+        if is_lock_error(context.original_exception):
+            _mark_lock_error()
+
+
+def init_write_coordination(app, db):
+    with app.app_context():
+        for engine in db.engines.values():
+            init_engine_lock_errors(engine)
+
+    session_class = db.session.session_factory.class_
+
+    @event.listens_for(session_class, 'before_flush')
+    def lock_before_flush(session, flush_context, instances):
+        mappers = {inspect(obj).mapper for obj in list(session.new) + list(session.dirty) + list(session.deleted)}
+        _acquire_writer(session, {session.get_bind(mapper=mapper) for mapper in mappers})
+
+    @event.listens_for(session_class, 'do_orm_execute')
+    def lock_before_dml(execute_state):
+        if execute_state.is_insert or execute_state.is_update or execute_state.is_delete:
+            session = execute_state.session
+            _acquire_writer(session, {session.get_bind(**execute_state.bind_arguments)})
+
+    @event.listens_for(session_class, 'after_commit')
+    def remember_commit(session):
+        if has_app_context():
+            g.write_committed = True
+
+    @event.listens_for(session_class, 'after_transaction_end')
+    def unlock_after_transaction(session, transaction):
+        if transaction.parent is None:
+            _release_writer(session)
+
+
+def _retry_delay(attempt, config):
+    """Пауза перед попыткой attempt (с 1): full jitter от экспоненциальной границы"""
+    bound = min(config['WRITE_RETRY_MAX_DELAY'], config['WRITE_RETRY_BASE_DELAY'] * 2 ** (attempt - 1))
+    return random.uniform(0, bound)
+
+
+def retry_on_lock(view, db):
+    """Повторять запрос на запись, упавший на блокировке базы до своего коммита"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method not in WRITE_METHODS:
+            return view(*args, **kwargs)
+        config = current_app.config
+        deadline = time.monotonic() + config['WRITE_RETRY_MAX_TOTAL_SECONDS']
+        g.write_deadline = deadline
+        attempt = 0
+        while True:
+            attempt += 1
+            g.db_lock_error = False
+            g.write_committed = False
+            try:
+                response = view(*args, **kwargs)
+                failed = g.db_lock_error
+            except Exception as e:
+                if g.write_committed or not (g.db_lock_error or isinstance(e, WriteLockTimeout) or is_lock_error(e)):
+                    raise
+                db.session.rollback()
+                response = None
+                failed = True
+
+            if not failed or g.write_committed:
+                return response
+            delay = _retry_delay(attempt, config)
+            if attempt >= config['WRITE_RETRY_ATTEMPTS'] or time.monotonic() + delay >= deadline:
+                metrics.incr('db.write_retries_exhausted')
+                db.session.rollback()
+                print(f"⏳ Database is busy, giving up {request.method} {request.path} after {attempt} attempts")
+                return jsonify({'error': 'Database is busy, try again later'}), 503, {'Retry-After': '1'}
+
+            metrics.incr('db.write_retries')
+            db.session.rollback()
+            metrics.observe('db.write_retry_delay', delay)
+            time.sleep(delay)
+    return wrapper
+
+
+def init_write_retries(app, db):
+    """Обернуть маршруты приложения повтором (вызывать после регистрации маршрутов)"""
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint != 'static':
+            app.view_functions[endpoint] = retry_on_lock(view, db)
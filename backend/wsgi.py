@@ -0,0 +1,9 @@
+"""WSGI-точка входа для production-сервера.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Для разработки по-прежнему используется run.py (встроенный сервер Flask).
+"""
+from app import app
+
+application = app
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useTranslation } from '../../hooks/useTranslation';
-import { projectsAPI, invitationsAPI, userAPI } from '../../services/api';
+import { invitationsAPI, dashboardAPI } from '../../services/api';
 import { Plus, Users, Calendar, Bell, Clock, Activity } from 'lucide-react';
 
 const Dashboard = () => {
@@ -18,16 +18,15 @@ const Dashboard = () => {
 
   const loadData = async () => {
     try {
-      const [projectsRes, invitationsRes, assignedCountRes] = await Promise.all([
-        projectsAPI.getProjects(),
-        invitationsAPI.getInvitations(),
-        userAPI.getAssignedCardsCount()
-      ]);
+      // Все данные страницы одним запросом
+      const { data } = await dashboardAPI.getDashboard({
+        sections: 'projects,invitations,assigned_count'
+      });
       
-      const projects = projectsRes.data.slice(0, 3);
+      const projects = data.projects.slice(0, 3);
       setRecentProjects(projects);
-      setInvitations(invitationsRes.data);
-      setAssignedTasksCount(assignedCountRes.data.count);
+      setInvitations(data.invitations);
+      setAssignedTasksCount(data.assigned_count);
     } catch (error) {
       console.error('Error loading data:', error);
     } finally {
@@ -112,7 +111,7 @@ const Dashboard = () => {
                     {project.name}
                   </h3>
                   <p className="text-sm text-gray-500">
-                    {project.boards?.length || 0} {t('dashboard.boards')} • {project.member_count || 0} {t('dashboard.members')}
+                    {project.board_count || 0} {t('dashboard.boards')} • {project.member_count || 0} {t('dashboard.members')}
                   </p>
                 </div>
                 <Calendar size={16} className="text-gray-400" />
@@ -3,7 +3,7 @@ import { useAuth } from '../../contexts/AuthContext';
 import { useNavigate } from 'react-router-dom';
 import { useTranslation } from '../../hooks/useTranslation';
 import { LogOut, Bell, User, Clock, X, CheckCircle, UserPlus, MessageSquare } from 'lucide-react';
-import { notificationsAPI } from '../../services/api';
+import { notificationsAPI, dashboardAPI } from '../../services/api';
 import { formatDate } from '../../utils/helpers.js';
 
 const Header = () => {
@@ -20,25 +20,22 @@ const Header = () => {
     logout();
   };
 
-  // Загрузка уведомлений
+  // Загрузка уведомлений и счетчика непрочитанных одним запросом
   const loadNotifications = async () => {
     try {
       console.log('🔄 Loading notifications...');
       
-      const notificationsRes = await notificationsAPI.getNotifications();
-      console.log('📨 Notifications response:', notificationsRes);
+      const { data } = await dashboardAPI.getDashboard({
+        sections: 'notifications,unread_count'
+      });
+      console.log('📨 Notifications response:', data);
 
-      const allNotifications = (notificationsRes.data || [])
+      const allNotifications = (data.notifications || [])
         .sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
 
       console.log('📋 All notifications:', allNotifications);
       setNotifications(allNotifications);
-
-      // Считаем непрочитанные - проверяем разные возможные поля
-      const unread = allNotifications.filter(notif => 
-        !notif.is_read && !notif.read_at
-      ).length;
-      setUnreadCount(unread);
+      setUnreadCount(data.unread_count || 0);
 
     } catch (error) {
       console.error('❌ Error loading notifications:', error);
@@ -47,19 +44,6 @@ const Header = () => {
     }
   };
 
-  const loadUnreadCount = async () => {
-    try {
-      console.log('🔄 Loading unread count...');
-      const response = await notificationsAPI.getUnreadCount();
-      console.log('🔢 Unread count:', response.data.count);
-      
-      setUnreadCount(response.data.count || 0);
-    } catch (error) {
-      console.error('❌ Error loading unread count:', error);
-      setUnreadCount(0);
-    }
-  };
-
   // Отметить уведомление как прочитанное
   const handleMarkAsRead = async (notificationId, event) => {
     if (event) event.stopPropagation();
@@ -102,18 +86,8 @@ const Header = () => {
     try {
       console.log('📝 Marking all notifications as read');
       
-      const unreadNotifications = notifications.filter(notif => 
-        !notif.is_read && !notif.read_at
-      );
-      
-      // Отмечаем все непрочитанные уведомления
-      for (const notif of unreadNotifications) {
-        try {
-          await notificationsAPI.markAsRead(notif.id);
-        } catch (error) {
-          console.error(`❌ Error marking notification ${notif.id} as read:`, error);
-        }
-      }
+      // Один запрос вместо запроса на каждое уведомление
+      await notificationsAPI.markAllAsRead();
       
       // Обновляем локальное состояние
       setNotifications(prev => prev.map(notif => ({
@@ -133,7 +107,6 @@ const Header = () => {
   // Загрузка при монтировании
   useEffect(() => {
     loadNotifications();
-    loadUnreadCount();
   }, []);
   
 
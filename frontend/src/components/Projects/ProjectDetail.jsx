@@ -946,11 +946,11 @@ const ProjectDetail = () => {
       if (!isGuestMode) {
         const [labelsRes, membersRes] = await Promise.all([
           labelsAPI.getProjectLabels(project.id),
-          usersAPI.getUsers()
+          usersAPI.getUsers({ project_id: project.id, fields: 'compact', limit: 100 })
         ]);
 
         setProjectLabels(labelsRes.data);
-        setAvailableMembers(membersRes.data);
+        setAvailableMembers(membersRes.data.users);
       }
     } catch (error) {
       console.error('Error loading card edit data:', error);
@@ -1022,7 +1022,7 @@ const ProjectDetail = () => {
   const handleSaveCard = async () => {
     try {
       // Сохраняем карточку
-      await cardsAPI.updateCard(selectedCard.id, editingCardData);
+      await cardsAPI.updateCard(selectedCard.id, editingCardData, selectedCard.version);
 
       await refreshCardData();
 
@@ -1035,6 +1035,12 @@ const ProjectDetail = () => {
       setSelectedCard(null);
 
     } catch (error) {
+      if (error.response?.status === 412) {
+        // Карточку успели изменить: показываем актуальную версию
+        console.warn('Card was changed by someone else, reloading');
+        await refreshCardData();
+        return;
+      }
       console.error('Error updating card:', error);
       // alert(t('board.failedToCreateCard'));
     }
@@ -36,16 +36,28 @@ export const projectsAPI = {
   createProject: (data) => api.post('/projects', data),
   getProject: (id) => api.get(`/projects/${id}`),
   getProjectMembers: (projectId) => api.get(`/projects/${projectId}/members`),
+  // data: { name, description }
+  cloneProject: (projectId, data) => api.post(`/projects/${projectId}/clone`, data),
+  getBoardTemplates: () => api.get('/board-templates'),
+  getActivity: (projectId, params) => api.get(`/projects/${projectId}/activity`, { params }),
 };
 
 export const usersAPI = {
-  getUsers: () => api.get('/users'),
+  // params: { q, project_id, limit, cursor, fields: 'compact' }
+  getUsers: (params) => api.get('/users', { params }),
   searchProjectUsers: (projectId, query) => 
     api.get(`/projects/${projectId}/users/search?q=${encodeURIComponent(query)}`),
 };
 
 export const userAPI = {
   getAssignedCardsCount: () => api.get('/user/assigned-cards-count'),
+  // params: { overdue, due_within, project_id, list_id, limit, cursor }
+  getAssignedCards: (params) => api.get('/user/cards', { params }),
+};
+
+export const dashboardAPI = {
+  // params: { sections: 'projects,invitations', exclude: 'mentions' }
+  getDashboard: (params) => api.get('/dashboard', { params }),
 };
 
 export const notificationsAPI = {
@@ -64,6 +76,10 @@ export const notificationsAPI = {
   // Отметить уведомление как прочитанное
   markAsRead: (notificationId) => 
     api.post(`/notifications/${notificationId}/read`),
+
+  // Отметить все уведомления как прочитанные (params: project_id, type, before)
+  markAllAsRead: (params = {}) => 
+    api.post('/notifications/read-all', params),
   
   // Получить количество непрочитанных уведомлений
   getUnreadCount: () => 
@@ -80,12 +96,18 @@ export const boardsAPI = {
   // ДОБАВЬТЕ ЭТИ МЕТОДЫ:
   createList: (boardId, listData) => api.post(`/boards/${boardId}/lists`, listData),
   deleteList: (listId) => api.delete(`/lists/${listId}`),
+  // Отмена удаления в течение окна отмены (undo_until в ответе удаления)
+  restoreList: (listId) => api.post(`/lists/${listId}/restore`),
 };
 // Добавьте эти методы в существующий файл
 export const cardsAPI = {
   createCard: (listId, data) => api.post(`/lists/${listId}/cards`, data),
-  updateCard: (cardId, data) => api.put(`/cards/${cardId}`, data),
+  // version - версия карточки, которую видел пользователь: при чужом изменении сервер вернет 412
+  updateCard: (cardId, data, version) => api.put(`/cards/${cardId}`, data,
+    version != null ? { headers: { 'If-Match': `"${version}"` } } : undefined),
   getCard: (cardId) => api.get(`/cards/${cardId}`),
+  deleteCard: (cardId) => api.delete(`/cards/${cardId}`),
+  restoreCard: (cardId) => api.post(`/cards/${cardId}/restore`),
   assignUser: (cardId, userId) => api.post(`/cards/${cardId}/assignees`, { user_id: userId }),
   removeAssignee: (cardId, userId) => api.delete(`/cards/${cardId}/assignees/${userId}`),
 };